@@ -1,12 +1,36 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, g, request, jsonify, render_template, session, stream_with_context
 from flask_cors import CORS
-from models import db, Vocabulary, LearningHistory
+from models import db, current_shard, Vocabulary, LearningHistory, PronunciationJob, User
+from migrations import run_migrations
+from sqlite_profile import init_engine_profile, engine_options
 from cambridge_api import fetch_pronunciation_data
-from offline_pronunciation import fetch_offline_pronunciation
+from enrichment import enqueue_pronunciation, pronunciation_workers
+from sampling import current_sampler
+from similarity import current_similarity
+from scheduler import due_cards, next_due_card
+from search_index import init_search_index, apply_search
+from stats import get_summary, get_monthly, get_total_words, get_word_count, DEFAULT_MONTHS
+from changes import change_feed, current_feed, current_data_version
+from bulk_import import detect_format, read_rows, import_rows, ImportFormatError
+from practice import parse_event, practice_writer, PracticeEventError, MAX_BATCH_EVENTS
+from shards import shard_pool
+from fill_blank import fallback_stats
+from compression import init_compression
+from static_assets import static_assets
+from pagination import CursorError, MAX_PER_PAGE, keyset_page, offset_page
+from serialization import FieldsError, json_response, parse_fields, rows_to_dicts, select_fields, word_to_dict
+from response_cache import cached_response, response_cache
+from catalog import Catalog
+from export import export_stream, export_window, ExportError, FORMATS as EXPORT_FORMATS, EXTENSIONS as EXPORT_EXTENSIONS
+from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
-import random
+import io
+import json
 import os
+import random
+import re
+import secrets
+import tempfile
 
 app = Flask(__name__, instance_relative_config=True)
 
@@ -18,27 +42,175 @@ except OSError:
 
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(app.instance_path, 'vocabulary.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = 'your-secret-key-here'
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options()
+# Learner accounts (multi-user mode); each learner's words are in their own shard
+app.config['SQLALCHEMY_BINDS'] = {'accounts': 'sqlite:///' + os.path.join(app.instance_path, 'accounts.db')}
 
 # Feature flags - Set DISABLE_PRONUNCIATION_FETCH=1 to skip external API calls
 DISABLE_PRONUNCIATION_FETCH = os.environ.get('DISABLE_PRONUNCIATION_FETCH', '0') == '1'
 if DISABLE_PRONUNCIATION_FETCH:
     print("⚠ Pronunciation fetching is DISABLED (server mode)")
 
+# Background pronunciation workers - set PRONUNCIATION_WORKERS=0 to disable
+PRONUNCIATION_WORKERS = int(os.environ.get('PRONUNCIATION_WORKERS', '2'))
+
+# Apply pending schema migrations on startup - set AUTO_MIGRATE=0 to run them
+# manually with `python migrations.py upgrade`
+AUTO_MIGRATE = os.environ.get('AUTO_MIGRATE', '1') == '1'
+
+# Multi-user mode - set MULTI_USER=1 for learner accounts with a database per
+# learner. SECRET_KEY signs the login cookie; without it a random key is
+# generated once and kept in instance/secret_key.
+MULTI_USER = os.environ.get('MULTI_USER', '0') == '1'
+
+def load_secret_key():
+    """SECRET_KEY from the environment, or the instance's own random key"""
+    if os.environ.get('SECRET_KEY'):
+        return os.environ['SECRET_KEY']
+    path = os.path.join(app.instance_path, 'secret_key')
+    try:
+        with open(path) as f:
+            key = f.read().strip()
+        if key:
+            return key
+    except FileNotFoundError:
+        pass
+    key = secrets.token_hex(32)
+    # Readable by the owner only; O_EXCL so concurrent workers don't overwrite each other's key
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path) as f:
+            return f.read().strip()
+    with os.fdopen(fd, 'w') as f:
+        f.write(key)
+    print(f"[Accounts] Generated a session signing key in {path}")
+    return key
+
+app.config['SECRET_KEY'] = load_secret_key()
+
 # CORS configuration for production
 CORS(app, resources={
     r"/api/*": {
         "origins": "*",
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type"]
+        "allow_headers": ["Content-Type", "If-None-Match"],
+        "expose_headers": ["ETag", "X-Export-Until"]
     }
 })
 
 db.init_app(app)
+change_feed.init_app(app)
+shard_pool.init_app(app)
+static_assets.init_app(app)
+init_compression(app)
 
 # Initialize database
 with app.app_context():
+    # WAL and tuned pragmas on every connection - SQLITE_PROFILE=0 for SQLite's defaults
+    sqlite_pragmas = init_engine_profile(db.engine)
+    init_engine_profile(db.engines['accounts'])
+    if sqlite_pragmas:
+        print(f"[SQLite] {', '.join(f'{name}={value}' for name, value in sqlite_pragmas.items())}")
     db.create_all()
+    if AUTO_MIGRATE:
+        run_migrations()
+    init_search_index()
+
+if MULTI_USER:
+    pronunciation_workers.shards = shard_pool
+    pronunciation_workers.catalog = Catalog()
+    print("✓ Multi-user mode: one database per learner")
+
+if PRONUNCIATION_WORKERS > 0:
+    pronunciation_workers.workers = PRONUNCIATION_WORKERS
+    pronunciation_workers.start(app, fetch_cambridge=not DISABLE_PRONUNCIATION_FETCH)
+
+# Game answers are group-committed by a write-behind writer thread
+practice_writer.start(app)
+
+# ==================== ACCOUNTS ====================
+
+USERNAME_PATTERN = re.compile(r'^[A-Za-z0-9_.-]{3,80}$')
+MIN_PASSWORD_LENGTH = 8
+
+@app.before_request
+def select_learner_shard():
+    """Multi-user mode: route this request's queries to the learner's shard"""
+    if not MULTI_USER or not request.path.startswith('/api/') or request.path.startswith('/api/auth/'):
+        return None
+    
+    user_id = session.get('user_id')
+    if user_id is None:
+        return jsonify({'error': 'Login required'}), 401
+    g.shard = shard_pool.acquire(user_id)
+    current_shard.set(g.shard)
+
+@app.teardown_request
+def release_learner_shard(exception=None):
+    current_shard.set(None)
+    shard = g.pop('shard', None)
+    if shard is not None:
+        shard.release()
+
+def multi_user_required():
+    if not MULTI_USER:
+        return jsonify({'error': 'Accounts are disabled (set MULTI_USER=1)'}), 404
+    return None
+
+@app.route('/api/auth/me', methods=['GET'])
+def get_current_user():
+    """Whether accounts are enabled and who is logged in"""
+    user = db.session.get(User, session['user_id']) if MULTI_USER and 'user_id' in session else None
+    return jsonify({'multi_user': MULTI_USER, 'user': user.to_dict() if user else None})
+
+@app.route('/api/auth/register', methods=['POST'])
+def register():
+    """Create a learner account and its database, and log in"""
+    disabled = multi_user_required()
+    if disabled:
+        return disabled
+    
+    data = request.get_json(silent=True) or {}
+    username = str(data.get('username', '')).strip()
+    password = str(data.get('password', ''))
+    if not USERNAME_PATTERN.match(username):
+        return jsonify({'error': 'Username must be 3-80 letters, digits, dots, dashes or underscores'}), 400
+    if len(password) < MIN_PASSWORD_LENGTH:
+        return jsonify({'error': f'Password must be at least {MIN_PASSWORD_LENGTH} characters'}), 400
+    if User.query.filter_by(username=username).first():
+        return jsonify({'error': 'Username is taken'}), 409
+    
+    user = User(username=username, password_hash=generate_password_hash(password))
+    db.session.add(user)
+    db.session.commit()
+    shard_pool.get(user.id)
+    
+    session.clear()
+    session['user_id'] = user.id
+    print(f"[Accounts] Registered '{username}' (id {user.id})")
+    return jsonify(user.to_dict()), 201
+
+@app.route('/api/auth/login', methods=['POST'])
+def login():
+    """Log in with username and password"""
+    disabled = multi_user_required()
+    if disabled:
+        return disabled
+    
+    data = request.get_json(silent=True) or {}
+    user = User.query.filter_by(username=str(data.get('username', '')).strip()).first()
+    if user is None or not check_password_hash(user.password_hash, str(data.get('password', ''))):
+        return jsonify({'error': 'Wrong username or password'}), 401
+    
+    session.clear()
+    session['user_id'] = user.id
+    return jsonify(user.to_dict())
+
+@app.route('/api/auth/logout', methods=['POST'])
+def logout():
+    session.clear()
+    return jsonify({'message': 'Logged out'})
 
 # ==================== VOCABULARY MANAGEMENT ====================
 
@@ -46,13 +218,10 @@ with app.app_context():
 def index():
     return render_template('index.html')
 
-@app.route('/api/vocabulary', methods=['GET'])
-def get_vocabulary():
-    """Get all vocabulary words with optional filtering, search, and pagination"""
+def filtered_vocabulary():
+    """Vocabulary query for the list's ?status= and ?search=; returns (query, ranked)"""
     status = request.args.get('status')  # learning, learned, or all
     search = request.args.get('search', '').strip()
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
     
     query = Vocabulary.query
     
@@ -60,27 +229,66 @@ def get_vocabulary():
     if status and status != 'all':
         query = query.filter_by(status=status)
     
-    # Search by word, definition, or translation
+    # Full-text search over word, definition, translation and example
     if search:
-        search_pattern = f"%{search}%"
-        query = query.filter(
-            db.or_(
-                Vocabulary.word.ilike(search_pattern),
-                Vocabulary.definition.ilike(search_pattern),
-                Vocabulary.translation.ilike(search_pattern),
-                Vocabulary.example.ilike(search_pattern)
-            )
-        )
+        return apply_search(query, search)
+    return query, False
+
+@app.route('/api/vocabulary', methods=['GET'])
+@cached_response
+def get_vocabulary():
+    """
+    Get vocabulary words with optional filtering and search, newest first
+    Paged by cursor: pass next_cursor or prev_cursor from the last response
+    as ?cursor=. The total is at /api/vocabulary/count. ?page= still gives
+    the older numbered pages with totals. ?fields=word,status,... returns
+    (and selects) only those fields.
+    """
+    per_page = request.args.get('per_page', 20, type=int)
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query, ranked = filtered_vocabulary()
+    # The cursor needs each row's created_at and id, requested or not
+    query = select_fields(query, fields, extra=('created_at', 'id'))
+    
+    if 'page' in request.args:
+        return get_vocabulary_page(query, ranked, per_page, fields)
+    
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    try:
+        # Search results come back by relevance, otherwise newest first
+        if ranked:
+            words, next_cursor, prev_cursor = offset_page(query, request.args.get('cursor'), per_page)
+        else:
+            words, next_cursor, prev_cursor = keyset_page(query, request.args.get('cursor'), per_page)
+    except CursorError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return json_response({
+        'words': rows_to_dicts(words, fields),
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor,
+        'has_next': next_cursor is not None,
+        'has_prev': prev_cursor is not None,
+        'per_page': per_page
+    })
+
+def get_vocabulary_page(query, ranked, per_page, fields):
+    """Numbered pages (OFFSET plus a COUNT per page)"""
+    if not ranked:
+        query = query.order_by(Vocabulary.created_at.desc())
     
-    # Paginate results
-    pagination = query.order_by(Vocabulary.created_at.desc()).paginate(
-        page=page,
+    pagination = query.paginate(
+        page=request.args.get('page', 1, type=int),
         per_page=per_page,
         error_out=False
     )
     
-    return jsonify({
-        'words': [word.to_dict() for word in pagination.items],
+    return json_response({
+        'words': rows_to_dicts(pagination.items, fields),
         'total': pagination.total,
         'pages': pagination.pages,
         'current_page': pagination.page,
@@ -89,22 +297,41 @@ def get_vocabulary():
         'has_prev': pagination.has_prev
     })
 
+@app.route('/api/vocabulary/count', methods=['GET'])
+@cached_response
+def get_vocabulary_count():
+    """Number of words matching the list's ?status= and ?search="""
+    if not request.args.get('search', '').strip():
+        return jsonify({'total': get_word_count(request.args.get('status'))})
+    
+    query, _ = filtered_vocabulary()
+    return jsonify({'total': query.order_by(None).count()})
+
 @app.route('/api/vocabulary/latest', methods=['GET'])
+@cached_response
 def get_latest_update():
-    """Get timestamp of the most recent vocabulary change"""
+    """Get the current data version and most recent vocabulary change (supports If-None-Match)"""
     latest_word = Vocabulary.query.order_by(Vocabulary.created_at.desc()).first()
     
-    if latest_word:
-        return jsonify({
-            'latest_timestamp': latest_word.created_at.isoformat(),
-            'total_count': Vocabulary.query.count()
-        })
-    
     return jsonify({
-        'latest_timestamp': None,
-        'total_count': 0
+        'version': current_data_version(),
+        'latest_timestamp': latest_word.created_at.isoformat() if latest_word else None,
+        'total_count': get_total_words()
     })
 
+@app.route('/api/vocabulary/events', methods=['GET'])
+def vocabulary_events():
+    """Server-sent events stream of vocabulary changes (resumes from Last-Event-ID)"""
+    last_version = request.headers.get('Last-Event-ID', type=int)
+    if last_version is None:
+        last_version = request.args.get('since', type=int)
+    
+    return Response(
+        current_feed().stream(last_version),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/vocabulary', methods=['POST'])
 def add_vocabulary():
     """Add a new vocabulary word"""
@@ -114,6 +341,13 @@ def add_vocabulary():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
+        # Multi-user mode: a word another learner already added can bring its definition
+        catalog = pronunciation_workers.catalog
+        if data.get('word') and not data.get('definition') and catalog is not None:
+            entry = catalog.lookup(data['word'].strip()) or {}
+            data['definition'] = entry.get('definition')
+            data.setdefault('example', entry.get('example') or '')
+        
         if not data.get('word') or not data.get('definition'):
             return jsonify({'error': 'Word and definition are required'}), 400
         
@@ -122,53 +356,22 @@ def add_vocabulary():
         if existing:
             return jsonify({'error': 'Word already exists'}), 409
         
-        # Fetch pronunciation data (try offline first, then Cambridge if available)
+        # Pronunciation is filled in by the background workers
         word_text = data['word'].strip()
-        pronunciation_data = {'ipa_us': None, 'ipa_uk': None, 'audio_us': None, 'audio_uk': None}
-        
-        # Try offline pronunciation first (always works, no internet needed for IPA)
-        try:
-            print(f"Fetching offline pronunciation for: {word_text}")
-            offline_data = fetch_offline_pronunciation(word_text)
-            if offline_data and any(offline_data.values()):
-                pronunciation_data = offline_data
-                print(f"✓ Offline pronunciation: IPA={pronunciation_data.get('ipa_us')}")
-        except Exception as e:
-            print(f"⚠ Offline pronunciation failed: {str(e)}")
-        
-        # Optionally try Cambridge Dictionary if online (better audio quality)
-        if not DISABLE_PRONUNCIATION_FETCH and not pronunciation_data.get('audio_us'):
-            try:
-                print(f"Trying Cambridge Dictionary for: {word_text}")
-                cambridge_data = fetch_pronunciation_data(word_text, skip_fetch=False)
-                if cambridge_data:
-                    # Use Cambridge audio if available (better quality)
-                    if cambridge_data.get('audio_us'):
-                        pronunciation_data['audio_us'] = cambridge_data['audio_us']
-                    if cambridge_data.get('audio_uk'):
-                        pronunciation_data['audio_uk'] = cambridge_data['audio_uk']
-                    # Use Cambridge IPA if offline didn't work
-                    if cambridge_data.get('ipa_us') and not pronunciation_data.get('ipa_us'):
-                        pronunciation_data['ipa_us'] = cambridge_data['ipa_us']
-                    if cambridge_data.get('ipa_uk') and not pronunciation_data.get('ipa_uk'):
-                        pronunciation_data['ipa_uk'] = cambridge_data['ipa_uk']
-            except Exception as e:
-                print(f"⚠ Cambridge Dictionary failed: {str(e)}")
         
         new_word = Vocabulary(
             word=word_text.lower(),
             definition=data['definition'],
             example=data.get('example', ''),
             translation=data.get('translation', ''),
-            ipa_us=pronunciation_data.get('ipa_us'),
-            ipa_uk=pronunciation_data.get('ipa_uk'),
-            audio_us=pronunciation_data.get('audio_us'),
-            audio_uk=pronunciation_data.get('audio_uk'),
             status='learning'
         )
         
         db.session.add(new_word)
+        db.session.flush()
+        enqueue_pronunciation(new_word)
         db.session.commit()
+        pronunciation_workers.notify()
         
         return jsonify(new_word.to_dict()), 201
     
@@ -177,14 +380,63 @@ def add_vocabulary():
         db.session.rollback()
         return jsonify({'error': f'Failed to add word: {str(e)}'}), 500
 
+@app.route('/api/vocabulary/bulk', methods=['POST'])
+def bulk_import_vocabulary():
+    """
+    Import many words from a streamed upload
+    Body is CSV (with a header row), JSON Lines or Anki-style TSV; choose with
+    ?format=csv|jsonl|tsv or the content type. Responds with JSON Lines: one
+    result per row (?report=all, the default), only rows that were not added
+    (?report=errors) or just the summary (?report=summary). Pronunciation is
+    fetched in the background unless ?pronunciation=0.
+    """
+    try:
+        import_format = detect_format(request.args.get('format'), request.mimetype)
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+        rows = read_rows(stream, import_format)
+    except (ImportFormatError, UnicodeDecodeError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    report = request.args.get('report', 'all')
+    fetch_pronunciation = request.args.get('pronunciation', '1') != '0'
+    
+    def generate():
+        summary = {'added': 0, 'exists': 0, 'duplicate': 0, 'invalid': 0}
+        # Hold the report until the upload has been read - most HTTP clients
+        # don't read the response while they are still sending the body
+        report_file = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode='w+', encoding='utf-8')
+        try:
+            for result in import_rows(rows, fetch_pronunciation=fetch_pronunciation):
+                summary[result['status']] += 1
+                if report == 'all' or (report == 'errors' and result['status'] != 'added'):
+                    report_file.write(json.dumps(result, ensure_ascii=False) + '\n')
+        except Exception as e:
+            # Chunks committed so far stay imported
+            print(f"Error importing vocabulary: {str(e)}")
+            db.session.rollback()
+            summary['error'] = f'Import stopped: {str(e)}'
+        
+        with report_file:
+            report_file.seek(0)
+            while True:
+                block = report_file.read(64 * 1024)
+                if not block:
+                    break
+                yield block
+        yield json.dumps({'summary': summary}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/api/vocabulary/<int:id>', methods=['PUT'])
 def update_vocabulary(id):
     """Update a vocabulary word"""
     word = Vocabulary.query.get_or_404(id)
     data = request.json
     
-    if 'word' in data:
-        word.word = data['word'].lower()
+    if 'word' in data and data['word'].strip().lower() != word.word:
+        word.word = data['word'].strip().lower()
+        # New spelling needs new pronunciation
+        enqueue_pronunciation(word)
     if 'definition' in data:
         word.definition = data['definition']
     if 'example' in data:
@@ -197,6 +449,8 @@ def update_vocabulary(id):
             word.learned_at = datetime.utcnow()
     
     db.session.commit()
+    if word.pronunciation_status == 'pending':
+        pronunciation_workers.notify()
     
     return jsonify(word.to_dict())
 
@@ -211,6 +465,7 @@ def delete_vocabulary(id):
         # Delete related learning history records first (if cascade doesn't work)
         from models import LearningHistory
         LearningHistory.query.filter_by(vocabulary_id=word_id).delete()
+        PronunciationJob.query.filter_by(vocabulary_id=word_id).delete()
         
         # Delete the vocabulary word
         db.session.delete(word)
@@ -223,188 +478,332 @@ def delete_vocabulary(id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+# ==================== GAME: CARD SELECTION ====================
+
+def excluded_card_ids():
+    """Ids from ?exclude=<id>[,<id>...]"""
+    return [int(value) for value in request.args.get('exclude', '').split(',') if value.strip().isdigit()]
+
+def select_card(require_example=False):
+    """
+    Pick the next card for a game request
+    Default mode serves the word due soonest; ?mode=random samples uniformly.
+    ?exclude=<id>[,<id>...] skips the card on screen and cards with buffered
+    answers when another is available.
+    """
+    status = request.args.get('status', 'learning')
+    
+    if request.args.get('mode') == 'random':
+        return current_sampler().choice(status, require_example=require_example)
+    
+    exclude_ids = excluded_card_ids()
+    word = next_due_card(status, require_example=require_example, exclude_ids=exclude_ids)
+    if word is None and exclude_ids:
+        word = next_due_card(status, require_example=require_example)
+    return word
+
+def select_cards(size, require_example=False):
+    """
+    Pick up to size distinct cards for a game session
+    Same modes and ?exclude= as select_card: the size words due soonest, or
+    a random sample drawn without replacement.
+    """
+    status = request.args.get('status', 'learning')
+    exclude_ids = excluded_card_ids()
+    
+    if request.args.get('mode') == 'random':
+        pick = lambda exclude: current_sampler().sample(status, require_example, size, exclude)
+    else:
+        pick = lambda exclude: due_cards(status, require_example, size, exclude)
+    
+    words = pick(exclude_ids)
+    if not words and exclude_ids:
+        words = pick(())
+    return words
+
 # ==================== GAME: FLASHCARD ====================
 
 @app.route('/api/games/flashcard/random', methods=['GET'])
 def get_random_flashcard():
-    """Get a random word for flashcard practice"""
-    status = request.args.get('status', 'learning')
-    
-    query = Vocabulary.query
-    if status != 'all':
-        query = query.filter_by(status=status)
+    """Get the next word for flashcard practice (optional: ?fields=)"""
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), 400
     
-    words = query.all()
-    if not words:
+    word = select_card()
+    if not word:
         return jsonify({'error': 'No words available'}), 404
     
-    word = random.choice(words)
-    return jsonify(word.to_dict())
+    return json_response(word_to_dict(word, fields))
 
 @app.route('/api/games/flashcard/practice', methods=['POST'])
 def practice_flashcard():
     """Record flashcard practice"""
-    data = request.json
-    vocabulary_id = data.get('vocabulary_id')
-    correct = data.get('correct', True)
-    
-    word = Vocabulary.query.get_or_404(vocabulary_id)
-    word.times_practiced += 1
-    
-    history = LearningHistory(
-        vocabulary_id=vocabulary_id,
-        activity_type='flashcard',
-        correct=correct
-    )
+    try:
+        event = parse_event(request.json, 'flashcard')
+    except PracticeEventError as e:
+        return jsonify({'error': str(e)}), 400
     
-    db.session.add(history)
-    db.session.commit()
+    result = practice_writer.submit([event], wait=True)[0]
+    if 'error' in result:
+        return jsonify(result), 404 if result['error'] == 'Word not found' else 503
     
-    return jsonify({'message': 'Practice recorded', 'times_practiced': word.times_practiced})
+    return jsonify({
+        'message': 'Practice recorded',
+        'times_practiced': result['times_practiced'],
+        'interval_days': result['interval_days'],
+        'due_at': result['due_at']
+    })
 
 # ==================== GAME: FILL IN THE BLANK ====================
 
+def fill_blank_question(word):
+    """The question for one word (the sentence is precomputed when the word is saved)"""
+    # The example doesn't contain the word in any form: ask for it by definition
+    question = word.blank_sentence or '_____ : ' + word.definition
+    
+    return {
+        'id': word.id,
+        'question': question,
+        'hint': word.definition,
+        'word': word.word,
+        'answer': word.blank_answer or word.word,
+        'audio_uk': word.audio_uk,
+        'audio_us': word.audio_us
+    }
+
 @app.route('/api/games/fill-blank/question', methods=['GET'])
 def get_fill_blank_question():
-    """Generate a fill-in-the-blank question"""
-    status = request.args.get('status', 'learning')
-    
-    query = Vocabulary.query.filter(Vocabulary.example.isnot(None), Vocabulary.example != '')
-    if status != 'all':
-        query = query.filter_by(status=status)
-    
-    words = query.all()
-    if not words:
+    """Get a fill-in-the-blank question"""
+    word = select_card(require_example=True)
+    if not word:
         return jsonify({'error': 'No words with examples available'}), 404
     
-    word = random.choice(words)
-    
-    # Create blank in the example sentence
-    example = word.example
-    word_to_blank = word.word
-    
-    # Replace the word with a blank (case insensitive)
-    import re
-    blanked_sentence = re.sub(
-        r'\b' + re.escape(word_to_blank) + r'\b',
-        '_____',
-        example,
-        flags=re.IGNORECASE
-    )
-    
-    # If word wasn't found, use the whole example
-    if blanked_sentence == example:
-        blanked_sentence = '_____ : ' + word.definition
-    
-    return jsonify({
-        'id': word.id,
-        'question': blanked_sentence,
-        'hint': word.definition,
-        'word': word.word
-    })
+    return jsonify(fill_blank_question(word))
+
+@app.route('/api/stats/fill-blank', methods=['GET'])
+@cached_response
+def get_fill_blank_stats():
+    """How many words with examples get a blanked sentence and how many fall back"""
+    return jsonify(fallback_stats())
 
 @app.route('/api/games/fill-blank/check', methods=['POST'])
 def check_fill_blank_answer():
     """Check fill-in-the-blank answer"""
     data = request.json
-    vocabulary_id = data.get('vocabulary_id')
-    user_answer = data.get('answer', '').strip().lower()
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    try:
+        event = parse_event(dict(data, answer=data.get('answer') or ''), 'fill_blank')
+    except (PracticeEventError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
     
-    word = Vocabulary.query.get_or_404(vocabulary_id)
-    correct = user_answer == word.word.lower()
+    result = practice_writer.submit([event], wait=True)[0]
+    if 'error' in result:
+        return jsonify(result), 404 if result['error'] == 'Word not found' else 503
     
-    word.times_practiced += 1
+    return jsonify({
+        'correct': result['correct'],
+        'correct_answer': result['correct_answer'],
+        'times_practiced': result['times_practiced'],
+        'interval_days': result['interval_days'],
+        'due_at': result['due_at']
+    })
+
+# ==================== GAME: MULTIPLE CHOICE ====================
+
+CHOICES = 4  # The word and three distractors
+
+def multiple_choice_questions(words):
+    """
+    Questions for some words: pick the word for its definition
+    Distractors are each word's nearest neighbours in the similarity index,
+    looked up in one query for all the words; random words fill in when a
+    word has too few neighbours.
+    """
+    index = current_similarity()
+    neighbours = {word.id: [other for _, other in index.neighbours(word.id, CHOICES - 1)] for word in words}
+    wanted = {other for others in neighbours.values() for other in others}
+    texts = dict(db.session.query(Vocabulary.id, Vocabulary.word).filter(Vocabulary.id.in_(wanted))) if wanted else {}
+    
+    questions = []
+    for word in words:
+        choices = [texts[other] for other in neighbours[word.id] if other in texts]
+        if len(choices) < CHOICES - 1:
+            exclude = [word.id] + neighbours[word.id]
+            choices += [other.word for other in current_sampler().sample('all', size=CHOICES - 1 - len(choices),
+                                                                          exclude_ids=exclude)]
+        choices.append(word.word)
+        random.shuffle(choices)
+        questions.append({
+            'id': word.id,
+            'question': word.definition,
+            'choices': choices,
+            'answer': word.word,
+            'audio_uk': word.audio_uk,
+            'audio_us': word.audio_us
+        })
+    return questions
+
+@app.route('/api/games/multiple-choice/question', methods=['GET'])
+def get_multiple_choice_question():
+    """Get a multiple-choice question with distractors that look, sound or translate alike"""
+    word = select_card()
+    if not word:
+        return jsonify({'error': 'No words available'}), 404
     
-    history = LearningHistory(
-        vocabulary_id=vocabulary_id,
-        activity_type='fill_blank',
-        correct=correct
-    )
+    return jsonify(multiple_choice_questions([word])[0])
+
+@app.route('/api/games/multiple-choice/check', methods=['POST'])
+def check_multiple_choice_answer():
+    """Check multiple-choice answer"""
+    data = request.json
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    try:
+        event = parse_event(dict(data, answer=data.get('answer') or ''), 'multiple_choice')
+    except (PracticeEventError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
     
-    db.session.add(history)
-    db.session.commit()
+    result = practice_writer.submit([event], wait=True)[0]
+    if 'error' in result:
+        return jsonify(result), 404 if result['error'] == 'Word not found' else 503
     
     return jsonify({
-        'correct': correct,
-        'correct_answer': word.word,
-        'times_practiced': word.times_practiced
+        'correct': result['correct'],
+        'correct_answer': result['correct_answer'],
+        'times_practiced': result['times_practiced'],
+        'interval_days': result['interval_days'],
+        'due_at': result['due_at']
     })
 
-# ==================== STATISTICS ====================
+@app.route('/api/stats/similarity', methods=['GET'])
+def get_similarity_stats():
+    """Size of the similarity index behind the multiple-choice game"""
+    return jsonify(current_similarity().stats())
 
-@app.route('/api/stats/summary', methods=['GET'])
-def get_stats_summary():
-    """Get learning statistics summary"""
-    # Total words
-    total_words = Vocabulary.query.count()
-    learning_words = Vocabulary.query.filter_by(status='learning').count()
-    learned_words = Vocabulary.query.filter_by(status='learned').count()
+# ==================== GAME: SESSIONS ====================
+
+SESSION_SIZE = 20
+MAX_SESSION_SIZE = 100  # Also keeps a session's answers well under MAX_BATCH_EVENTS
+
+@app.route('/api/games/<game>/session', methods=['GET'])
+def get_game_session(game):
+    """
+    Get a deck of cards for a whole game session
+    game is flashcard, fill-blank or multiple-choice.
+    ?size=N (default SESSION_SIZE, at most MAX_SESSION_SIZE) distinct cards,
+    chosen like the single-card endpoints (?status=, ?mode=random,
+    ?exclude=); flashcards also take ?fields=. "audio" lists the deck's
+    pronunciation URLs so the client can preload them. Answers go back in
+    one request to /api/games/practice/batch when the session ends.
+    """
+    if game not in ('flashcard', 'fill-blank', 'multiple-choice'):
+        return jsonify({'error': f'Unknown game: {game}'}), 404
+    
+    size = request.args.get('size', SESSION_SIZE, type=int)
+    if not 1 <= size <= MAX_SESSION_SIZE:
+        return jsonify({'error': f'size must be between 1 and {MAX_SESSION_SIZE}'}), 400
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # This month stats
+    words = select_cards(size, require_example=game == 'fill-blank')
+    if not words:
+        return jsonify({'error': 'No words available' if game == 'flashcard'
+                        else 'No words with examples available'}), 404
+    
+    if game == 'flashcard':
+        cards = [word_to_dict(word, fields) for word in words]
+    elif game == 'fill-blank':
+        cards = [fill_blank_question(word) for word in words]
+    else:
+        cards = multiple_choice_questions(words)
+    audio = [url for word in words for url in (word.audio_uk, word.audio_us) if url]
+    
+    return json_response({'game': game, 'size': len(cards), 'cards': cards, 'audio': audio})
+
+# ==================== GAME: BATCHED PRACTICE ====================
+
+@app.route('/api/games/practice/batch', methods=['POST'])
+def practice_batch():
+    """
+    Record many practice events at once
+    Body: {"events": [{"vocabulary_id", "activity_type", "correct" or "answer", "age"}, ...]}.
+    Events are queued for the write-behind writer and 202 is returned; with
+    ?wait=1 the response waits for the commit and includes per-event results.
+    """
+    data = request.get_json(silent=True)
+    items = data.get('events') if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        return jsonify({'error': 'Expected {"events": [...]}'}), 400
+    if len(items) > MAX_BATCH_EVENTS:
+        return jsonify({'error': f'At most {MAX_BATCH_EVENTS} events per request'}), 400
+    
+    events = []
+    rejected = []
     now = datetime.utcnow()
-    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    
-    words_added_this_month = Vocabulary.query.filter(
-        Vocabulary.created_at >= month_start
-    ).count()
-    
-    words_learned_this_month = Vocabulary.query.filter(
-        Vocabulary.learned_at >= month_start
-    ).count()
+    for index, item in enumerate(items):
+        try:
+            events.append(parse_event(item, now=now))
+        except PracticeEventError as e:
+            rejected.append({'index': index, 'error': str(e)})
     
-    # Practice stats this month
-    practices_this_month = LearningHistory.query.filter(
-        LearningHistory.practiced_at >= month_start
-    ).count()
+    if request.args.get('wait') == '1':
+        results = practice_writer.submit(events, wait=True)
+        return jsonify({'accepted': len(events), 'rejected': rejected, 'results': results})
     
-    return jsonify({
-        'total_words': total_words,
-        'learning_words': learning_words,
-        'learned_words': learned_words,
-        'words_added_this_month': words_added_this_month,
-        'words_learned_this_month': words_learned_this_month,
-        'practices_this_month': practices_this_month
-    })
+    practice_writer.submit(events)
+    return jsonify({'accepted': len(events), 'rejected': rejected}), 202
+
+# ==================== STATISTICS ====================
+
+@app.route('/api/stats/summary', methods=['GET'])
+@cached_response
+def get_stats_summary():
+    """Get learning statistics summary"""
+    return jsonify(get_summary())
 
 @app.route('/api/stats/monthly', methods=['GET'])
+@cached_response
 def get_monthly_stats():
-    """Get monthly statistics for the past 6 months"""
-    stats = []
-    now = datetime.utcnow()
-    
-    for i in range(6):
-        # Calculate month start and end
-        month_date = now - relativedelta(months=i)
-        month_start = month_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        next_month = month_start + relativedelta(months=1)
-        
-        # Count words added in this month
-        words_added = Vocabulary.query.filter(
-            Vocabulary.created_at >= month_start,
-            Vocabulary.created_at < next_month
-        ).count()
-        
-        # Count words learned in this month
-        words_learned = Vocabulary.query.filter(
-            Vocabulary.learned_at >= month_start,
-            Vocabulary.learned_at < next_month
-        ).count()
-        
-        # Count practices in this month
-        practices = LearningHistory.query.filter(
-            LearningHistory.practiced_at >= month_start,
-            LearningHistory.practiced_at < next_month
-        ).count()
-        
-        stats.append({
-            'month': month_start.strftime('%Y-%m'),
-            'month_name': month_start.strftime('%B %Y'),
-            'words_added': words_added,
-            'words_learned': words_learned,
-            'practices': practices
-        })
-    
-    return jsonify(stats)
+    """Get monthly statistics (optional: ?months=N, default 6)"""
+    months = request.args.get('months', DEFAULT_MONTHS, type=int)
+    return jsonify(get_monthly(months))
+
+@app.route('/api/stats/cache', methods=['GET'])
+def get_cache_stats():
+    """Response cache hit rates, per endpoint and overall"""
+    return jsonify(response_cache.stats())
+
+# ==================== EXPORT ====================
+
+@app.route('/api/export/<table>', methods=['GET'])
+def export_data(table):
+    """
+    Stream vocabulary or learning history
+    ?format=ndjson|csv|tsv (tsv is Anki-importable, vocabulary only) and
+    ?since=<ISO time> for only rows changed after that time. Pass the
+    X-Export-Until response header as since= on the next call.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    try:
+        since, until = export_window(request.args.get('since'))
+        body = export_stream(table, export_format, since, until)
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    filename = f"{table}{'-since-' + since.strftime('%Y%m%dT%H%M%S') if since else ''}.{EXPORT_EXTENSIONS[export_format]}"
+    return Response(
+        stream_with_context(body),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Export-Until': until.isoformat()
+        }
+    )
 
 # ==================== PRONUNCIATION API ====================
 
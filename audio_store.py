@@ -0,0 +1,171 @@
+"""
+Content-addressed store for synthesized audio
+Each clip is named by a stable digest of (word, voice, rate), so a word is
+rendered once no matter how often the process restarts. Clips are compressed
+to Opus or MP3 when an encoder is installed (ffmpeg, opusenc or lame) and
+kept as WAV otherwise. Files no longer referenced by any word - in the main
+database, any learner's database or the shared catalog - can be removed:
+
+    python audio_store.py gc [--dry-run]
+"""
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+
+AUDIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'audio')
+AUDIO_URL_PREFIX = '/static/audio/'
+EXTENSIONS = ('opus', 'mp3', 'wav')
+
+# Preferred output format: opus, mp3 or wav (falls back to what can be encoded)
+AUDIO_FORMAT = os.environ.get('AUDIO_FORMAT', 'opus')
+
+# Files younger than this are never collected - a word may be rendered but
+# not committed yet
+GC_MIN_AGE = 3600  # seconds
+
+
+def audio_key(word, voice, rate):
+    """Stable digest of what determines a clip's content"""
+    text = ' '.join(word.lower().split())
+    payload = '\x1f'.join([text, str(voice or ''), str(rate)])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def _encoders():
+    """Available (format, command builder) pairs in preference order"""
+    ffmpeg = shutil.which('ffmpeg')
+    opusenc = shutil.which('opusenc')
+    lame = shutil.which('lame')
+
+    found = {}
+    if opusenc:
+        found['opus'] = lambda src, dst: [opusenc, '--quiet', '--bitrate', '24', src, dst]
+    elif ffmpeg:
+        found['opus'] = lambda src, dst: [ffmpeg, '-y', '-loglevel', 'error', '-i', src,
+                                          '-c:a', 'libopus', '-b:a', '24k', '-f', 'ogg', dst]
+    if lame:
+        found['mp3'] = lambda src, dst: [lame, '--quiet', '-V', '7', src, dst]
+    elif ffmpeg:
+        found['mp3'] = lambda src, dst: [ffmpeg, '-y', '-loglevel', 'error', '-i', src,
+                                         '-c:a', 'libmp3lame', '-q:a', '7', '-f', 'mp3', dst]
+
+    order = [AUDIO_FORMAT] + [fmt for fmt in ('opus', 'mp3') if fmt != AUDIO_FORMAT]
+    return [(fmt, found[fmt]) for fmt in order if fmt in found]
+
+
+class AudioStore:
+    """Directory of audio clips named <digest>.<format>"""
+
+    def __init__(self, audio_dir=AUDIO_DIR, url_prefix=AUDIO_URL_PREFIX):
+        self.audio_dir = audio_dir
+        self.url_prefix = url_prefix
+        self.encoders = _encoders() if AUDIO_FORMAT != 'wav' else []
+        os.makedirs(audio_dir, exist_ok=True)
+
+    def url_for(self, filename):
+        return self.url_prefix + filename
+
+    def find(self, key):
+        """URL of an existing clip for key, or None"""
+        for ext in EXTENSIONS:
+            filename = f'{key}.{ext}'
+            if os.path.exists(os.path.join(self.audio_dir, filename)):
+                return self.url_for(filename)
+        return None
+
+    def scratch_path(self, key):
+        """Where the synthesizer should write the uncompressed WAV"""
+        return os.path.join(self.audio_dir, f'.{key}.tmp.wav')
+
+    def commit(self, key):
+        """
+        Compress a rendered scratch WAV into the store
+        Returns the clip URL, or None if nothing was rendered
+        """
+        scratch = self.scratch_path(key)
+        if not os.path.exists(scratch) or os.path.getsize(scratch) == 0:
+            if os.path.exists(scratch):
+                os.remove(scratch)
+            return None
+
+        for fmt, command in self.encoders:
+            filename = f'{key}.{fmt}'
+            partial = os.path.join(self.audio_dir, f'.{key}.tmp.{fmt}')
+            try:
+                subprocess.run(command(scratch, partial), check=True, timeout=60,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+                os.replace(partial, os.path.join(self.audio_dir, filename))
+                os.remove(scratch)
+                return self.url_for(filename)
+            except (subprocess.SubprocessError, OSError) as e:
+                print(f"[Audio Store] {fmt} encoding failed, trying next format: {str(e)}")
+                if os.path.exists(partial):
+                    os.remove(partial)
+
+        filename = f'{key}.wav'
+        os.replace(scratch, os.path.join(self.audio_dir, filename))
+        return self.url_for(filename)
+
+    def collect_garbage(self, referenced_urls, dry_run=False, min_age=GC_MIN_AGE):
+        """
+        Delete clips not in referenced_urls
+        Also removes leftovers from interrupted renders and audio written by
+        older versions of the app. Returns (files removed, bytes freed).
+        """
+        referenced = {url[len(self.url_prefix):] for url in referenced_urls
+                      if url and url.startswith(self.url_prefix)}
+        cutoff = time.time() - min_age
+        removed = 0
+        freed = 0
+        for entry in os.scandir(self.audio_dir):
+            if not entry.is_file() or entry.name in referenced:
+                continue
+            stat = entry.stat()
+            if stat.st_mtime > cutoff:
+                continue
+            removed += 1
+            freed += stat.st_size
+            if not dry_run:
+                os.remove(entry.path)
+        return removed, freed
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command != 'gc':
+        print(__doc__)
+        sys.exit(2)
+
+    os.environ.setdefault('AUTO_MIGRATE', '0')
+    os.environ.setdefault('PRONUNCIATION_WORKERS', '0')
+    from app import app
+    from catalog import DEFAULT_PATH as CATALOG_PATH
+    from models import db, Vocabulary
+    from shards import SHARDS_DIR
+
+    dry_run = '--dry-run' in sys.argv[2:]
+    with app.app_context():
+        referenced = set()
+        for audio_us, audio_uk in db.session.query(Vocabulary.audio_us, Vocabulary.audio_uk):
+            referenced.update((audio_us, audio_uk))
+
+    # Multi-user mode: every learner's shard and the shared catalog use clips too
+    sources = [(CATALOG_PATH, 'catalog_words')] if os.path.exists(CATALOG_PATH) else []
+    for root, _dirs, files in os.walk(SHARDS_DIR):
+        sources.extend((os.path.join(root, name), 'vocabulary') for name in files if name.endswith('.db'))
+    for path, table in sources:
+        conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        try:
+            referenced.update(url for row in conn.execute(f"SELECT audio_us, audio_uk FROM {table}") for url in row)
+        finally:
+            conn.close()
+    print(f"[Audio Store] Checked {len(sources)} database(s) besides the main one for referenced clips")
+
+    removed, freed = AudioStore().collect_garbage(referenced, dry_run=dry_run)
+    action = 'Would remove' if dry_run else 'Removed'
+    print(f"✓ {action} {removed} unreferenced audio file(s), {freed / 1024:.0f} KB")
@@ -0,0 +1,86 @@
+"""
+Benchmark offline IPA conversion
+Compares eng_to_ipa.convert() one word at a time with the batch API in
+offline_pronunciation: a cold run (one dictionary pass), a warm run (memo
+table) and, when built, the precomputed memory-mapped table. Every result is
+checked against eng_to_ipa.convert() on a sample.
+
+Usage: python benchmark_ipa.py [words] [sample]
+       (default: 50000 words, 300 checked and timed one at a time)
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+import eng_to_ipa
+from eng_to_ipa.transcribe import mode_type
+
+from offline_pronunciation import IpaResolver, IPA_TABLE_PATH, build_ipa_table
+import offline_pronunciation
+
+
+def load_words(count):
+    cursor = mode_type('sql')
+    words = [row[0] for row in cursor.execute("SELECT DISTINCT word FROM dictionary")]
+    cursor.connection.close()
+    random.seed(42)
+    words = random.sample(words, min(count, len(words)))
+    # Unknown words and phrases go through the same path
+    return words + ['xqzvbl', 'look after', "don't", 'well-known', '(run)', 'Hello, world!']
+
+
+def timed(label, func, count, baseline=None):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    speed = f"{baseline / (elapsed / count):>9.0f}x" if baseline else ''
+    print(f"{label:<36}{elapsed:>9.2f}s{elapsed / count * 1000:>10.3f}{speed}")
+    return result, elapsed / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    sample_size = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    words = load_words(count)
+    sample = words[:sample_size] + words[-6:]
+
+    scratch = tempfile.mkdtemp()
+    table_path = os.path.join(scratch, 'ipa_table.tsv')
+
+    print(f"\n{'method':<36}{'total':>10}{'ms/word':>10}{'speedup':>10}")
+    print("=" * 70)
+    expected, per_word = timed(f"convert() x {len(sample)}", lambda: {w: eng_to_ipa.convert(w) or None for w in sample}, len(sample))
+
+    resolver = IpaResolver(memo_path=os.path.join(scratch, 'memo.db'), table_path=table_path)
+    offline_pronunciation.ipa_resolver = resolver
+    batch = offline_pronunciation.get_ipa_pronunciations
+    cold, _ = timed(f"batch, cold x {len(words)}", lambda: batch(words), len(words), per_word)
+
+    resolver = IpaResolver(memo_path=os.path.join(scratch, 'memo.db'), table_path=table_path)
+    offline_pronunciation.ipa_resolver = resolver
+    warm, _ = timed(f"batch, memo table x {len(words)}", lambda: batch(words), len(words), per_word)
+    cached, _ = timed(f"batch, LRU cache x {len(words)}", lambda: batch(words), len(words), per_word)
+
+    start = time.perf_counter()
+    entries = build_ipa_table(table_path)
+    print(f"\nBuilt precomputed table: {entries} entries in {time.perf_counter() - start:.1f}s")
+    resolver = IpaResolver(memo_path=os.path.join(scratch, 'empty.db'), table_path=table_path)
+    offline_pronunciation.ipa_resolver = resolver
+    mapped, _ = timed(f"batch, mmap table x {len(words)}", lambda: batch(words), len(words), per_word)
+    print(f"Resolver counters: {resolver.stats()}")
+
+    mismatches = [w for w in sample if len({str(expected[w]), str(cold[w]), str(warm[w]), str(cached[w]), str(mapped[w])}) > 1]
+    mismatches += [w for w in words if len({str(cold[w]), str(warm[w]), str(cached[w]), str(mapped[w])}) > 1]
+    for word in mismatches[:10]:
+        print(f"  ✗ {word!r}: convert={expected.get(word)!r} cold={cold[word]!r} memo={warm[word]!r} mmap={mapped[word]!r}")
+    if mismatches:
+        print(f"\n✗ {len(mismatches)} mismatch(es)")
+        sys.exit(1)
+    print(f"\n✓ Batch results match eng_to_ipa.convert() (default table path: {IPA_TABLE_PATH})")
+
+
+if __name__ == '__main__':
+    main()
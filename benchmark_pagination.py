@@ -0,0 +1,104 @@
+"""
+Benchmark vocabulary list paging: OFFSET + COUNT vs keyset cursors
+Fills a throwaway database through the app's schema and migrations, then
+times fetching page 1, 100, 1000 and 5000 (20 words each) the old way
+(paginate(): OFFSET plus a COUNT) and by cursor (keyset_page). The cursor
+for a deep page is built from the row before it, as the previous page's
+response would have.
+
+Usage: python benchmark_pagination.py [words]   (default: 200000)
+"""
+
+from datetime import datetime, timedelta
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy import insert
+
+from benchmark_sqlite import make_app
+from models import db, Vocabulary
+from pagination import encode_cursor, keyset_page
+from sqlite_profile import engine_options, engine_pragmas
+
+PAGES = [1, 100, 1000, 5000]
+PER_PAGE = 20
+RUNS = 5
+
+
+def seed(app, count):
+    start = datetime(2020, 1, 1)
+    with app.app_context():
+        for first in range(0, count, 10000):
+            db.session.execute(insert(Vocabulary), [
+                {
+                    'word': f'word{i}',
+                    'definition': f'definition of word {i}',
+                    # Every fifth word shares a timestamp with the next, so ties are paged by id
+                    'created_at': start + timedelta(seconds=i - i % 5 // 4),
+                    'status': 'learning',
+                }
+                for i in range(first, min(first + 10000, count))
+            ])
+        db.session.commit()
+
+
+def timed(function):
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = function()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), result
+
+
+def offset_page(page):
+    pagination = Vocabulary.query.order_by(Vocabulary.created_at.desc(), Vocabulary.id.desc()).paginate(
+        page=page, per_page=PER_PAGE, error_out=False
+    )
+    return [word.id for word in pagination.items]
+
+
+def cursor_for(page):
+    """The cursor the previous page's response carries"""
+    if page == 1:
+        return None
+    before = Vocabulary.query.order_by(Vocabulary.created_at.desc(), Vocabulary.id.desc()).offset(
+        (page - 1) * PER_PAGE - 1
+    ).first()
+    return encode_cursor('next', (before.created_at.isoformat(), before.id))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    if count < PAGES[-1] * PER_PAGE:
+        print(f"Need at least {PAGES[-1] * PER_PAGE} words for page {PAGES[-1]}")
+        sys.exit(2)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'pages.db'), engine_options(), engine_pragmas())
+        print(f"Seeding {count:,} words...")
+        seed(app, count)
+
+        print(f"\n{'page':>6}{'offset ms':>12}{'cursor ms':>12}{'speedup':>10}  same rows")
+        print("=" * 52)
+        failed = False
+        with app.app_context():
+            for page in PAGES:
+                offset_ms, expected = timed(lambda: offset_page(page))
+                cursor = cursor_for(page)
+                cursor_ms, (words, _, _) = timed(lambda: keyset_page(Vocabulary.query, cursor, PER_PAGE))
+                same = [word.id for word in words] == expected
+                failed = failed or not same
+                print(f"{page:>6}{offset_ms:>12.2f}{cursor_ms:>12.2f}{offset_ms / cursor_ms:>9.1f}x  {'✓' if same else '✗'}")
+            db.engine.dispose()
+
+    if failed:
+        print("✗ Cursor pages differ from offset pages")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark Cambridge page parsing over saved fixture pages
+Compares the original full-tree parse with the targeted parser in
+cambridge_api (SoupStrainer, html.parser and lxml when installed) and checks
+that every variant extracts the same pronunciation
+
+Usage: python benchmark_parsing.py [fixture_dir] [iterations]
+       (default: fixtures/cambridge, 20 iterations)
+"""
+
+import glob
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from cambridge_api import parse_cambridge_page, CAMBRIDGE_BASE_URL, HTML_PARSER
+
+FIELDS = ('ipa_us', 'ipa_uk', 'audio_us', 'audio_uk')
+
+
+def parse_reference(content, base_url=CAMBRIDGE_BASE_URL):
+    """The original parser: full html.parser tree, first pos-header only"""
+    soup = BeautifulSoup(content, 'html.parser')
+    result = {field: None for field in FIELDS}
+
+    pos_header = soup.find('div', class_='pos-header')
+    if not pos_header:
+        return None
+
+    for region in ('uk', 'us'):
+        pron = pos_header.find('span', class_=region)
+        if not pron:
+            continue
+        ipa = pron.find('span', class_='ipa')
+        if ipa:
+            result[f'ipa_{region}'] = ipa.get_text(strip=True)
+        audio = pron.find('source', attrs={'type': 'audio/mpeg'})
+        if audio and audio.get('src'):
+            audio_url = audio.get('src')
+            if audio_url.startswith('//'):
+                audio_url = 'https:' + audio_url
+            elif audio_url.startswith('/'):
+                audio_url = base_url + audio_url
+            result[f'audio_{region}'] = audio_url
+
+    return result if any(result.values()) else None
+
+
+def _top_level(result):
+    return None if result is None else {field: result[field] for field in FIELDS}
+
+
+def time_parse(func, pages, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for content in pages.values():
+            func(content)
+    return (time.perf_counter() - start) * 1000 / (iterations * len(pages))
+
+
+def main():
+    fixture_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), 'fixtures', 'cambridge')
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(fixture_dir, '*.html'))):
+        with open(path, 'rb') as f:
+            pages[os.path.basename(path)] = f.read()
+    if not pages:
+        print(f"No fixture pages found in {fixture_dir}")
+        sys.exit(1)
+
+    variants = [('reference (full tree)', parse_reference)]
+    variants.append(('targeted, html.parser', lambda content: parse_cambridge_page(content, parser='html.parser')))
+    if HTML_PARSER == 'lxml':
+        variants.append(('targeted, lxml', lambda content: parse_cambridge_page(content, parser='lxml')))
+    else:
+        print("lxml not installed - skipping the lxml variant")
+
+    # Output check: every variant must agree with the reference on the first
+    # part of speech, and the targeted variants must agree with each other
+    mismatches = 0
+    print(f"\n{'page':<20}{'KB':>8}  parts of speech")
+    print("=" * 70)
+    for name, content in pages.items():
+        expected = parse_reference(content)
+        targeted = [func(content) for label, func in variants[1:]]
+        for label, result in zip([label for label, _func in variants[1:]], targeted):
+            if _top_level(result) != expected:
+                print(f"  ✗ {label} differs from reference on {name}: {result} != {expected}")
+                mismatches += 1
+            if result != targeted[0]:
+                print(f"  ✗ {label} differs from {variants[1][0]} on {name}")
+                mismatches += 1
+        parts = targeted[0]['parts_of_speech'] if targeted[0] else []
+        summary = ', '.join(f"{p['pos']} /{p['ipa_uk']}/" for p in parts) or '(not found)'
+        print(f"{name:<20}{len(content) / 1024:>8.0f}  {summary}")
+
+    print(f"\n{'parser':<28}{'ms/page':>10}{'speedup':>10}")
+    print("=" * 70)
+    baseline = None
+    for label, func in variants:
+        ms = time_parse(func, pages, iterations)
+        baseline = baseline or ms
+        print(f"{label:<28}{ms:>10.2f}{baseline / ms:>9.1f}x")
+
+    if mismatches:
+        print(f"\n✗ {mismatches} output mismatch(es)")
+        sys.exit(1)
+    print("\n✓ All parsers produced identical pronunciation data")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark vocabulary search: LIKE scan vs the FTS5 index
+Builds throwaway SQLite databases of synthetic words and times the search
+plus the pagination COUNT for each approach
+
+Usage: python benchmark_search.py [rows ...]   (default: 10000 100000 1000000)
+"""
+
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from search_index import SCHEMA_STATEMENTS, build_match_query, _RANK_WEIGHTS
+
+SYLLABLES = ['ac', 'ce', 'ment', 'pro', 'ver', 'sta', 'tion', 'able', 'con', 'de',
+             'in', 'ter', 'ly', 'ous', 'ex', 'pre', 'ful', 'ness', 'ro', 'ma']
+VIETNAMESE = ['Hoàn thành', 'đạt được', 'Lợi thế', 'ưu điểm', 'Cách tiếp cận', 'phương pháp',
+              'Thách thức', 'Kết hợp', 'Đóng góp', 'Hiệu quả', 'Mở rộng', 'Duy trì', 'đường']
+FILLER = ['the', 'a', 'way', 'of', 'to', 'make', 'something', 'that', 'is', 'very',
+          'good', 'people', 'time', 'work', 'new', 'show', 'clearly', 'help', 'keep', 'find']
+
+QUERIES = ['pro', 'station', 'dat duoc', 'Hoàn', 'clearly help', 'zzzz']
+RUNS = 5
+PER_PAGE = 20
+
+CREATE_VOCABULARY = """
+CREATE TABLE vocabulary (
+    id INTEGER PRIMARY KEY,
+    word VARCHAR(100) NOT NULL UNIQUE,
+    definition TEXT NOT NULL,
+    example TEXT,
+    translation VARCHAR(200),
+    created_at DATETIME
+)
+"""
+
+
+def make_rows(count, rng):
+    seen = set()
+    while len(seen) < count:
+        word = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word in seen:
+            word += str(len(seen))
+        seen.add(word)
+        yield (
+            word,
+            ' '.join(rng.choice(FILLER) for _ in range(8)),
+            ' '.join(rng.choice(FILLER) for _ in range(6)) + f' {word}.',
+            f'{rng.choice(VIETNAMESE)}, {rng.choice(VIETNAMESE)}',
+            f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 12:00:00'
+        )
+
+
+def build_database(path, count):
+    conn = sqlite3.connect(path)
+    conn.execute(CREATE_VOCABULARY)
+    conn.execute('CREATE INDEX ix_vocabulary_created_at ON vocabulary (created_at)')
+    for statement in SCHEMA_STATEMENTS:
+        conn.execute(statement)
+    conn.executemany(
+        'INSERT INTO vocabulary (word, definition, example, translation, created_at) VALUES (?, ?, ?, ?, ?)',
+        make_rows(count, random.Random(42))
+    )
+    conn.commit()
+    return conn
+
+
+def search_like(conn, search):
+    pattern = f'%{search}%'
+    where = 'word LIKE ? OR definition LIKE ? OR translation LIKE ? OR example LIKE ?'
+    params = (pattern,) * 4
+    total = conn.execute(f'SELECT COUNT(*) FROM vocabulary WHERE {where}', params).fetchone()[0]
+    rows = conn.execute(
+        f'SELECT * FROM vocabulary WHERE {where} ORDER BY created_at DESC LIMIT ?',
+        params + (PER_PAGE,)
+    ).fetchall()
+    return total, rows
+
+
+def search_fts(conn, search):
+    match = build_match_query(search)
+    weights = ', '.join(str(weight) for weight in _RANK_WEIGHTS)
+    total = conn.execute(
+        'SELECT COUNT(*) FROM vocabulary_fts WHERE vocabulary_fts MATCH ?', (match,)
+    ).fetchone()[0]
+    rows = conn.execute(
+        f'SELECT v.* FROM vocabulary v JOIN ('
+        f'  SELECT rowid, bm25(vocabulary_fts, {weights}) AS rank'
+        f'  FROM vocabulary_fts WHERE vocabulary_fts MATCH ?'
+        f') m ON m.rowid = v.id ORDER BY m.rank LIMIT ?',
+        (match, PER_PAGE)
+    ).fetchall()
+    return total, rows
+
+
+def time_search(func, conn, search):
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        total, _rows = func(conn, search)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), total
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in sizes:
+            print(f"\n{count:,} rows")
+            print("=" * 70)
+            start = time.perf_counter()
+            conn = build_database(os.path.join(tmp, f'bench_{count}.db'), count)
+            print(f"Built in {time.perf_counter() - start:.1f}s")
+            print(f"{'query':<16}{'LIKE ms':>10}{'hits':>10}{'FTS5 ms':>10}{'hits':>10}{'speedup':>10}")
+
+            for search in QUERIES:
+                like_ms, like_total = time_search(search_like, conn, search)
+                fts_ms, fts_total = time_search(search_fts, conn, search)
+                speedup = like_ms / fts_ms if fts_ms else float('inf')
+                print(f"{search:<16}{like_ms:>10.2f}{like_total:>10}{fts_ms:>10.2f}{fts_total:>10}{speedup:>9.1f}x")
+
+            conn.close()
+
+    print("\nNote: hit counts differ by design - LIKE matches substrings and is")
+    print("accent-sensitive, FTS5 matches word prefixes and ignores diacritics.")
+
+
+if __name__ == '__main__':
+    main()
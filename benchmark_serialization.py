@@ -0,0 +1,113 @@
+"""
+Benchmark vocabulary list serialization for a 1,000-row page
+Compares the old path (load model instances, to_dict(), jsonify) with
+column-tuple serialization, with every field and with the fields the list
+view and flashcards request, encoded with the standard library and (when
+installed) orjson. Times cover the query, building the rows and encoding;
+sizes are the response body.
+
+Usage: python benchmark_serialization.py [rows] [runs]   (default: 1000 rows, 20 runs)
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from flask import jsonify
+from sqlalchemy import insert
+
+import serialization
+from benchmark_sqlite import make_app
+from models import db, Vocabulary
+from serialization import VOCABULARY_FIELDS, json_response, parse_fields, rows_to_dicts, select_fields
+from sqlite_profile import engine_options, engine_pragmas
+
+FIELD_SETS = [
+    ('all fields', VOCABULARY_FIELDS),
+    ('list view', parse_fields(
+        'word,definition,example,translation,ipa_us,ipa_uk,audio_us,audio_uk,pronunciation_status,status,times_practiced'
+    )),
+    ('flashcard', parse_fields('word,definition,example,translation,ipa_us,ipa_uk,audio_us,audio_uk')),
+    ('word + status', parse_fields('word,status')),
+]
+
+
+def seed(app, count):
+    with app.app_context():
+        db.session.execute(insert(Vocabulary), [
+            {
+                'word': f'word{i}',
+                'definition': f'A fairly long definition of word {i}, the way dictionaries phrase them, '
+                              'with a clause or two of explanation.',
+                'example': f'Here is an example sentence that uses word{i} in a natural context.',
+                'translation': f'bản dịch tiếng Việt số {i}',
+                'ipa_us': 'ˈwɝːd', 'ipa_uk': 'ˈwɜːd',
+                'audio_us': f'https://dictionary.cambridge.org/media/english/us_pron/w/wor/word{i}.mp3',
+                'audio_uk': f'https://dictionary.cambridge.org/media/english/uk_pron/w/wor/word{i}.mp3',
+                'status': 'learning',
+                'pronunciation_status': 'ready',
+            }
+            for i in range(count)
+        ])
+        db.session.commit()
+
+
+def page_query(count):
+    return Vocabulary.query.order_by(Vocabulary.created_at.desc(), Vocabulary.id.desc()).limit(count)
+
+
+def old_path(count):
+    return jsonify({'words': [word.to_dict() for word in page_query(count)]})
+
+
+def tuple_path(count, fields):
+    return json_response({'words': rows_to_dicts(select_fields(page_query(count), fields).all(), fields)})
+
+
+def measure(function, runs):
+    function()  # Warm up
+    times = []
+    for _ in range(runs):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        response = function()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), len(response.get_data())
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    encoders = [('stdlib', None)]
+    if serialization.orjson is not None:
+        encoders.append(('orjson', serialization.orjson))
+    else:
+        print("orjson is not installed (pip install orjson); timing the standard library encoder only")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'serialize.db'), engine_options(), engine_pragmas())
+        seed(app, count)
+
+        results = []
+        with app.test_request_context():
+            baseline_ms, baseline_bytes = measure(lambda: old_path(count), runs)
+            results.append(('to_dict + jsonify', 'all fields', baseline_ms, baseline_bytes))
+            for encoder, module in encoders:
+                serialization.orjson = module
+                for label, fields in FIELD_SETS:
+                    ms, size = measure(lambda: tuple_path(count, fields), runs)
+                    results.append((f'tuples + {encoder}', label, ms, size))
+            db.engine.dispose()
+
+    print(f"\n{count:,}-row page, median of {runs} runs")
+    print(f"{'serializer':<20}{'fields':<16}{'ms':>9}{'speedup':>10}{'KiB':>10}{'size':>8}")
+    print("=" * 73)
+    for serializer, label, ms, size in results:
+        print(f"{serializer:<20}{label:<16}{ms:>9.2f}{baseline_ms / ms:>9.1f}x"
+              f"{size / 1024:>10.1f}{size / baseline_bytes:>7.0%}")
+
+
+if __name__ == '__main__':
+    main()
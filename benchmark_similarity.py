@@ -0,0 +1,122 @@
+"""
+Benchmark multiple-choice distractor lookup: full scan vs similarity index
+Fills a throwaway database with made-up words (random syllables, with an
+IPA-like transcription and a Vietnamese-like translation), then times
+finding a word's top-k neighbours by scoring every other word (what a
+per-request search would do) and with the n-gram similarity index, after
+building the index and after adding words to it incrementally.
+
+Usage: python benchmark_similarity.py [words]   (default: 100000)
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy import insert
+
+from benchmark_sqlite import make_app
+from models import db, Vocabulary
+from similarity import SimilarityIndex, WEIGHTS, edit_distance, sound_grams, translation_grams
+from sqlite_profile import engine_options, engine_pragmas
+
+K = 3
+QUERIES = 50
+SCAN_QUERIES = 3
+ONSETS = ['', 'b', 'c', 'd', 'f', 'g', 'l', 'm', 'n', 'p', 'r', 's', 't', 'v', 'br', 'cl', 'pr', 'st', 'tr']
+VOWELS = ['a', 'e', 'i', 'o', 'u', 'ou', 'ea', 'ai']
+CODAS = ['', 'n', 'r', 's', 't', 'l', 'm', 'nt', 'st', 'ct']
+PHONES = {'a': 'æ', 'e': 'e', 'i': 'ɪ', 'o': 'ɒ', 'u': 'ʌ', 'ou': 'aʊ', 'ea': 'iː', 'ai': 'eɪ', 'c': 'k'}
+SYLLABLES = ['sự', 'người', 'làm', 'cho', 'không', 'tính', 'đi', 'được', 'mới', 'biến', 'chấp', 'nhận',
+             'quan', 'tâm', 'ngọn', 'lửa', 'kịch', 'phân', 'biệt', 'đối', 'xử', 'chứa', 'đựng', 'nước']
+
+
+def make_word(rng):
+    parts = [(rng.choice(ONSETS), rng.choice(VOWELS), rng.choice(CODAS)) for _ in range(rng.randint(1, 4))]
+    word = ''.join(''.join(part) for part in parts)
+    ipa = 'ˈ' + '.'.join(''.join(PHONES.get(sound, sound) for sound in part) for part in parts)
+    return word, ipa, ' '.join(rng.sample(SYLLABLES, rng.randint(1, 3)))
+
+
+def seed(app, count, rng):
+    words = {}
+    while len(words) < count:
+        word, ipa, translation = make_word(rng)
+        words[word] = (ipa, translation)
+    rows = [{'word': word, 'definition': f'definition of {word}', 'ipa_us': ipa, 'translation': translation,
+             'status': 'learning'} for word, (ipa, translation) in words.items()]
+    with app.app_context():
+        for first in range(0, count, 10000):
+            db.session.execute(insert(Vocabulary), rows[first:first + 10000])
+        db.session.commit()
+
+
+def scan_neighbours(rows, target, k):
+    """Score the target against every word, as a per-request search would"""
+    _, word, ipa, translation = target
+    sound = sound_grams(ipa)
+    meaning = translation_grams(translation)
+    scores = []
+    for other_id, other_word, other_ipa, other_translation in rows:
+        if other_word == word:
+            continue
+        other_sound = sound_grams(other_ipa)
+        other_meaning = translation_grams(other_translation)
+        score = WEIGHTS['spelling'] * (1 - edit_distance(word, other_word) / max(len(word), len(other_word)))
+        score += WEIGHTS['sound'] * 2 * len(sound & other_sound) / (len(sound) + len(other_sound))
+        score += WEIGHTS['translation'] * 2 * len(meaning & other_meaning) / (len(meaning) + len(other_meaning))
+        scores.append((score, other_id))
+    return sorted(scores, reverse=True)[:k]
+
+
+def median_ms(function, targets):
+    times = []
+    for target in targets:
+        start = time.perf_counter()
+        function(target)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = random.Random(7)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'similarity.db'), engine_options(), engine_pragmas())
+        seed(app, count, rng)
+
+        with app.app_context():
+            rows = db.session.query(Vocabulary.id, Vocabulary.word, Vocabulary.ipa_us, Vocabulary.translation).all()
+            targets = rng.sample(rows, QUERIES)
+
+            scan_ms = median_ms(lambda target: scan_neighbours(rows, target, K), targets[:SCAN_QUERIES])
+
+            index = SimilarityIndex()
+            start = time.perf_counter()
+            index.neighbours(targets[0][0], K)
+            build_s = time.perf_counter() - start
+            index_ms = median_ms(lambda target: index.neighbours(target[0], K), targets)
+
+            # Incremental upkeep: what the ORM events do when words are added
+            added = [make_word(rng) for _ in range(1000)]
+            start = time.perf_counter()
+            for offset, (word, ipa, translation) in enumerate(added):
+                index.add(count + offset + 1, word, ipa, translation)
+            add_us = (time.perf_counter() - start) / len(added) * 1e6
+            db.engine.dispose()
+
+    print(f"\n{count:,} words, top {K} neighbours by spelling, sound and translation")
+    print(f"{'full scan':<36}{scan_ms:>10.1f} ms per lookup (median of {SCAN_QUERIES})")
+    print(f"{'similarity index':<36}{index_ms:>10.2f} ms per lookup (median of {QUERIES}), "
+          f"{scan_ms / index_ms:.0f}x faster")
+    print(f"{'building the index':<36}{build_s:>10.1f} s, once per database")
+    print(f"{'adding a word':<36}{add_us:>10.0f} µs")
+    print(f"Index: {index.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""
+Multi-threaded load test of the SQLite engine profile
+Runs the app's own queries from reader threads (vocabulary list page, due
+card, stats summary) while writer threads record practice answers and edit
+words, first with SQLite's defaults and then with the engine profile from
+sqlite_profile. Each run uses a fresh throwaway database. Reports throughput,
+latency and errors, and fails if any thread is still running after the run
+ends (a deadlock).
+
+Usage: python benchmark_sqlite.py [seconds] [readers] [writers] [words]
+       (default: 5 seconds, 8 readers, 2 writers, 20000 words)
+
+With more than 15 threads the default run also shows writers starved by
+SQLAlchemy's default pool (5 + 10 overflow connections).
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from flask import Flask
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+
+from migrations import run_migrations
+from models import db, Vocabulary
+from practice import parse_event, write_events
+from scheduler import next_due_card
+from search_index import init_search_index
+from sqlite_profile import init_engine_profile, engine_options, engine_pragmas
+from stats import get_summary
+
+JOIN_GRACE = 30  # seconds a thread may overrun the run before it counts as deadlocked
+PER_PAGE = 20
+
+
+def make_app(path, options, pragmas):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + path
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    db.init_app(app)
+    with app.app_context():
+        init_engine_profile(db.engine, pragmas)
+        db.create_all(bind_key=None)
+        run_migrations()
+        init_search_index()
+    return app
+
+
+def seed(app, count, rng):
+    rows = [
+        {
+            'word': f'word{i}',
+            'definition': f'definition of word {i}',
+            'example': f'An example sentence with word{i} in it.',
+            'translation': f'bản dịch {i}',
+            'status': 'learning' if rng.random() < 0.8 else 'learned',
+            'pronunciation_status': 'ready',
+        }
+        for i in range(count)
+    ]
+    with app.app_context():
+        db.session.execute(insert(Vocabulary), rows)
+        db.session.commit()
+
+
+def read_once(rng, count):
+    choice = rng.random()
+    if choice < 0.5:
+        offset = rng.randrange(0, max(1, count - PER_PAGE))
+        Vocabulary.query.order_by(Vocabulary.created_at.desc()).offset(offset).limit(PER_PAGE).all()
+    elif choice < 0.8:
+        next_due_card('learning')
+    else:
+        get_summary()
+
+
+def write_once(rng, count):
+    vocabulary_id = rng.randint(1, count)
+    if rng.random() < 0.9:
+        write_events([parse_event({'vocabulary_id': vocabulary_id, 'correct': rng.random() < 0.7})])
+    else:
+        word = db.session.get(Vocabulary, vocabulary_id)
+        word.definition = f'edited definition {rng.random():.6f}'
+        db.session.commit()
+
+
+def worker(app, operation, deadline, count, seed_value, stats):
+    rng = random.Random(seed_value)
+    with app.app_context():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                operation(rng, count)
+                stats['latencies'].append((time.perf_counter() - start) * 1000)
+            except OperationalError as e:
+                message = str(e.orig)
+                stats['errors'][message] = stats['errors'].get(message, 0) + 1
+            finally:
+                # Like the end of a request: hand the connection back to the pool
+                db.session.remove()
+
+
+def run(label, options, pragmas, seconds, readers, writers, count, tmp):
+    path = os.path.join(tmp, f'load_{label}.db')
+    app = make_app(path, options, pragmas)
+    seed(app, count, random.Random(42))
+
+    results = {'read': [], 'write': []}
+    threads = []
+    deadline = time.perf_counter() + seconds
+    for kind, operation, number in (('read', read_once, readers), ('write', write_once, writers)):
+        for i in range(number):
+            stats = {'latencies': [], 'errors': {}}
+            results[kind].append(stats)
+            thread = threading.Thread(
+                target=worker, args=(app, operation, deadline, count, f'{kind}{i}', stats),
+                name=f'{label}-{kind}-{i}', daemon=True
+            )
+            threads.append(thread)
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join(max(0, deadline - time.perf_counter()) + JOIN_GRACE)
+    stuck = [thread.name for thread in threads if thread.is_alive()]
+
+    with app.app_context():
+        db.engine.dispose()
+
+    summary = {'stuck': stuck}
+    for kind, thread_stats in results.items():
+        latencies = sorted(ms for stats in thread_stats for ms in stats['latencies'])
+        errors = {}
+        for stats in thread_stats:
+            for message, n in stats['errors'].items():
+                errors[message] = errors.get(message, 0) + n
+        summary[kind] = {
+            'ops': len(latencies) / seconds,
+            'p50': statistics.median(latencies) if latencies else 0,
+            'p95': latencies[int(len(latencies) * 0.95)] if latencies else 0,
+            'max': latencies[-1] if latencies else 0,
+            'errors': errors,
+        }
+    return summary
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    writers = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    count = int(sys.argv[4]) if len(sys.argv) > 4 else 20000
+
+    profiles = [('defaults', {}, {}), ('profile', engine_options(enabled=True), engine_pragmas(enabled=True))]
+    print(f"{readers} reader(s), {writers} writer(s), {seconds:g}s per run, {count:,} words")
+    settings = dict(profiles[1][1], **profiles[1][2])
+    print("profile: " + ', '.join(f'{name}={value}' for name, value in settings.items()))
+
+    summaries = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, options, pragmas in profiles:
+            summaries[label] = run(label, options, pragmas, seconds, readers, writers, count, tmp)
+
+    print(f"\n{'run':<12}{'kind':<8}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'errors':>8}")
+    print("=" * 70)
+    for label, summary in summaries.items():
+        for kind in ('read', 'write'):
+            s = summary[kind]
+            print(f"{label:<12}{kind:<8}{s['ops']:>10.0f}{s['p50']:>10.2f}{s['p95']:>10.2f}"
+                  f"{s['max']:>10.1f}{sum(s['errors'].values()):>8}")
+
+    print()
+    for kind in ('read', 'write'):
+        before = summaries['defaults'][kind]['ops']
+        after = summaries['profile'][kind]['ops']
+        if before:
+            print(f"{kind} throughput: {after / before:.1f}x")
+
+    failed = False
+    for label, summary in summaries.items():
+        for kind in ('read', 'write'):
+            for message, n in summary[kind]['errors'].items():
+                print(f"  {label} {kind}: {n} x {message}")
+        if summary['stuck']:
+            print(f"✗ {label}: {len(summary['stuck'])} thread(s) still running - deadlock: {', '.join(summary['stuck'])}")
+            failed = True
+    if summaries['profile']['read']['errors'] or summaries['profile']['write']['errors']:
+        failed = True
+
+    if failed:
+        sys.exit(1)
+    print("✓ No deadlocks and no errors with the engine profile")
+
+
+if __name__ == '__main__':
+    main()
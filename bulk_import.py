@@ -0,0 +1,181 @@
+"""
+Bulk vocabulary import
+Rows are parsed from the upload as it streams in (CSV, JSON Lines or
+Anki-style TSV) and handled in chunks: one query finds the words that already
+exist, one multi-row INSERT ... ON CONFLICT DO NOTHING adds the rest, and
+pronunciation is queued for the background workers. Each chunk is committed
+on its own, so memory use depends on the chunk size, not the upload size.
+"""
+
+import csv
+import json
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+
+from enrichment import pronunciation_workers
+from fill_blank import blank_columns
+from models import db, Vocabulary, PronunciationJob
+from sampling import current_sampler
+from similarity import current_similarity
+
+CHUNK_SIZE = 1000
+FIELDS = ('word', 'definition', 'example', 'translation')
+
+# Formats by request content type (?format= takes precedence)
+CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'jsonl',
+    'application/jsonl': 'jsonl',
+    'application/json-lines': 'jsonl',
+    'text/tab-separated-values': 'tsv',
+    'text/plain': 'tsv',
+}
+
+
+class ImportFormatError(ValueError):
+    """The upload can't be read in the requested format"""
+
+
+def detect_format(requested, content_type):
+    """Pick csv, jsonl or tsv from ?format= or the request content type"""
+    if requested:
+        if requested not in ('csv', 'jsonl', 'tsv'):
+            raise ImportFormatError(f"Unknown format '{requested}' (use csv, jsonl or tsv)")
+        return requested
+    if content_type in CONTENT_TYPES:
+        return CONTENT_TYPES[content_type]
+    raise ImportFormatError('Set ?format=csv|jsonl|tsv or a text/csv, application/x-ndjson or '
+                            'text/tab-separated-values content type')
+
+
+# ==================== PARSERS ====================
+# Each yields (row number, fields dict or None, error or None)
+
+def _read_csv(reader, columns):
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        yield reader.line_num, dict(zip(columns, values)), None
+
+
+def _read_jsonl(stream):
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield line_number, None, 'Invalid JSON'
+            continue
+        if not isinstance(data, dict):
+            yield line_number, None, 'Expected a JSON object'
+            continue
+        yield line_number, data, None
+
+
+def _read_tsv(stream):
+    """Anki text export: word, definition, example, translation; '#' lines are file headers"""
+    for line_number, line in enumerate(stream, 1):
+        line = line.rstrip('\r\n')
+        if not line.strip() or line.startswith('#'):
+            continue
+        yield line_number, dict(zip(FIELDS, line.split('\t'))), None
+
+
+def read_rows(stream, import_format):
+    """
+    Return a row iterator over a text stream
+    CSV headers are checked up front so a bad file fails before any import.
+    """
+    if import_format == 'jsonl':
+        return _read_jsonl(stream)
+    if import_format == 'tsv':
+        return _read_tsv(stream)
+
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    columns = [name.strip().lower() for name in header or []]
+    if 'word' not in columns or 'definition' not in columns:
+        raise ImportFormatError('CSV header must include word and definition columns')
+    return _read_csv(reader, columns)
+
+
+# ==================== IMPORT ====================
+
+def _clean(data):
+    values = {}
+    for field in FIELDS:
+        value = data.get(field)
+        if value is not None and not isinstance(value, str):
+            return None, f'{field} must be a string'
+        values[field] = value.strip() if value is not None else ''
+    values['word'] = values['word'].lower()
+    if not values['word'] or not values['definition']:
+        return None, 'Word and definition are required'
+    return values, None
+
+
+def _import_chunk(chunk, fetch_pronunciation):
+    results = [None] * len(chunk)
+    candidates = {}
+    for index, (row_number, data, error) in enumerate(chunk):
+        values = None
+        if error is None:
+            values, error = _clean(data)
+        if error:
+            results[index] = {'row': row_number, 'status': 'invalid', 'error': error}
+        elif values['word'] in candidates:
+            results[index] = {'row': row_number, 'word': values['word'], 'status': 'duplicate'}
+        else:
+            candidates[values['word']] = (index, row_number, values)
+
+    # One lookup for the whole chunk instead of one per word
+    existing = dict(db.session.execute(
+        select(Vocabulary.word, Vocabulary.id).where(Vocabulary.word.in_(list(candidates)))
+    ).all()) if candidates else {}
+
+    # Core inserts skip the ORM events, so the fill-in-the-blank sentence is added here
+    new_rows = [
+        dict(values, status='learning', pronunciation_status='pending' if fetch_pronunciation else 'ready',
+             **blank_columns(values))
+        for word, (_index, _row, values) in candidates.items() if word not in existing
+    ]
+    inserted = {}
+    if new_rows:
+        # ON CONFLICT covers words added by someone else since the lookup
+        statement = insert(Vocabulary).on_conflict_do_nothing(index_elements=['word']).returning(
+            Vocabulary.id, Vocabulary.word
+        )
+        inserted = {word: vocabulary_id for vocabulary_id, word in db.session.execute(statement, new_rows)}
+        if fetch_pronunciation and inserted:
+            db.session.execute(insert(PronunciationJob), [{'vocabulary_id': vocabulary_id} for vocabulary_id in inserted.values()])
+    db.session.commit()
+
+    for word, (index, row_number, values) in candidates.items():
+        if word in inserted:
+            current_sampler().add(inserted[word], 'learning', values['example'])
+            current_similarity().add(inserted[word], word, None, values['translation'])
+            results[index] = {'row': row_number, 'word': word, 'status': 'added', 'id': inserted[word]}
+        else:
+            results[index] = {'row': row_number, 'word': word, 'status': 'exists', 'id': existing.get(word)}
+
+    if fetch_pronunciation and inserted:
+        pronunciation_workers.notify()
+    return results
+
+
+def import_rows(rows, fetch_pronunciation=True, chunk_size=CHUNK_SIZE):
+    """
+    Import parsed rows, yielding one result per row in input order
+    status is 'added', 'exists' (already in the database), 'duplicate'
+    (repeated earlier in this chunk of the upload) or 'invalid'.
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield from _import_chunk(chunk, fetch_pronunciation)
+            chunk = []
+    if chunk:
+        yield from _import_chunk(chunk, fetch_pronunciation)
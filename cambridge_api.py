@@ -2,94 +2,327 @@
 Cambridge Dictionary API scraper to fetch IPA pronunciation and audio URLs
 """
 
-import requests
-from bs4 import BeautifulSoup
-import re
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import quote
+import json
 import os
+import re
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
+
+from lookup_cache import LookupCache
+
+CAMBRIDGE_BASE_URL = "https://dictionary.cambridge.org"
+
+# lxml is an optional, faster parser backend
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Only the pronunciation headers are turned into tree nodes. The strainer sees
+# the raw class attribute ("pos-header dpos-h"), so match one of its words
+POS_HEADER_STRAINER = SoupStrainer('div', class_=lambda value: value is not None and 'pos-header' in value.split())
+POS_HEADER_TAG = re.compile(r'<div\s[^>]*class="(?:[^"]*\s)?pos-header[\s"]')
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
+
+# Parsed lookups are cached on disk - set CAMBRIDGE_CACHE=0 to always hit the network
+CACHE_ENABLED = os.environ.get('CAMBRIDGE_CACHE', '1') == '1'
+# Keep-alive connections kept open to Cambridge; set CAMBRIDGE_POOL_SIZE for more concurrent fetches
+POOL_SIZE = int(os.environ.get('CAMBRIDGE_POOL_SIZE', '10'))
+
+_session = None
+_session_lock = threading.Lock()
+_cache = None
 
-def fetch_cambridge_data(word):
+
+class CambridgeFetchError(Exception):
+    """A lookup failed for a reason worth retrying (network error, 429, 5xx)"""
+
+
+def get_session():
     """
-    Fetch pronunciation (IPA) and audio URLs from Cambridge Dictionary
-    Returns: dict with ipa_us, ipa_uk, audio_us, audio_uk
+    Shared keep-alive session for all Cambridge requests
+    Reuses connections instead of opening a new one per word.
     """
-    # Cambridge Dictionary URL
-    url = f"https://dictionary.cambridge.org/dictionary/english/{word.lower().strip()}"
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            session.trust_env = False  # Ignore system proxy settings
+            session.headers.update(HEADERS)
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+def get_cache():
+    """Shared lookup cache, or None when caching is disabled"""
+    global _cache
+    with _session_lock:
+        if _cache is None and CACHE_ENABLED:
+            _cache = LookupCache()
+        return _cache
+
+
+def _cache_key(word, base_url):
+    # Keep results from other hosts (e.g. a local stub server) apart
+    if base_url and base_url != CAMBRIDGE_BASE_URL:
+        return f"{base_url} {word}"
+    return word
+
+
+def _cached(word, base_url):
+    cache = get_cache()
+    if cache is None:
+        return False, None
+    return cache.get(_cache_key(word, base_url))
+
+
+def _store(word, base_url, data):
+    cache = get_cache()
+    if cache is not None:
+        cache.set(_cache_key(word, base_url), data)
+
+
+def _absolute_audio_url(audio_url, base_url):
+    if audio_url.startswith('//'):
+        return 'https:' + audio_url
+    if audio_url.startswith('/'):
+        return base_url + audio_url
+    return audio_url
+
+
+def _extract_pronunciation(pron, base_url):
+    ipa = pron.find('span', class_='ipa')
+    audio = pron.find('source', attrs={'type': 'audio/mpeg'})
+    return (
+        ipa.get_text(strip=True) if ipa else None,
+        _absolute_audio_url(audio.get('src'), base_url) if audio and audio.get('src') else None
+    )
+
+
+def parse_cambridge_page(content, base_url=CAMBRIDGE_BASE_URL, parser=None):
+    """
+    Extract pronunciation from a Cambridge dictionary page
+    Only the pos-header blocks are built into a tree (SoupStrainer), parsing
+    starts at the first of them, and lxml is used when installed.
+    Returns: dict with ipa_us, ipa_uk, audio_us, audio_uk taken from the first
+    part of speech, plus 'parts_of_speech' listing every one - or None
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', errors='replace')
     
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-    }
+    # Skip the <head>, scripts and navigation before the first entry
+    first = POS_HEADER_TAG.search(content)
+    if first is not None:
+        content = content[first.start():]
     
-    # Clear environment proxy settings to prevent interference
-    session = requests.Session()
-    session.trust_env = False  # Ignore system proxy settings
+    soup = BeautifulSoup(content, parser or HTML_PARSER, parse_only=POS_HEADER_STRAINER)
     
-    try:
-        response = session.get(url, headers=headers, timeout=10)
-        
-        if response.status_code != 200:
-            print(f"[Cambridge API] HTTP {response.status_code} for '{word}'")
-            return None
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        result = {
+    parts_of_speech = []
+    for pos_header in soup.find_all('div', class_='pos-header'):
+        pos = pos_header.find('span', class_='pos')
+        entry = {
+            'pos': pos.get_text(strip=True) if pos else None,
             'ipa_us': None,
             'ipa_uk': None,
             'audio_us': None,
             'audio_uk': None
         }
-        
-        # Find pronunciation sections
-        pos_header = soup.find('div', class_='pos-header')
-        if not pos_header:
-            return None
-        
-        # Get UK pronunciation
-        uk_pron = pos_header.find('span', class_='uk')
-        if uk_pron:
-            ipa_uk = uk_pron.find('span', class_='ipa')
-            if ipa_uk:
-                result['ipa_uk'] = ipa_uk.get_text(strip=True)
-            
-            # Get UK audio
-            audio_uk = uk_pron.find('source', attrs={'type': 'audio/mpeg'})
-            if audio_uk and audio_uk.get('src'):
-                audio_url = audio_uk.get('src')
-                if audio_url.startswith('//'):
-                    audio_url = 'https:' + audio_url
-                elif audio_url.startswith('/'):
-                    audio_url = 'https://dictionary.cambridge.org' + audio_url
-                result['audio_uk'] = audio_url
-        
-        # Get US pronunciation
-        us_pron = pos_header.find('span', class_='us')
-        if us_pron:
-            ipa_us = us_pron.find('span', class_='ipa')
-            if ipa_us:
-                result['ipa_us'] = ipa_us.get_text(strip=True)
-            
-            # Get US audio
-            audio_us = us_pron.find('source', attrs={'type': 'audio/mpeg'})
-            if audio_us and audio_us.get('src'):
-                audio_url = audio_us.get('src')
-                if audio_url.startswith('//'):
-                    audio_url = 'https:' + audio_url
-                elif audio_url.startswith('/'):
-                    audio_url = 'https://dictionary.cambridge.org' + audio_url
-                result['audio_us'] = audio_url
-        
-        # Return result if at least one field is populated
-        if any(result.values()):
-            return result
-        
+        for region in ('uk', 'us'):
+            pron = pos_header.find('span', class_=region)
+            if pron:
+                entry[f'ipa_{region}'], entry[f'audio_{region}'] = _extract_pronunciation(pron, base_url)
+        parts_of_speech.append(entry)
+    
+    if not parts_of_speech:
         return None
-        
+    
+    first_entry = parts_of_speech[0]
+    result = {
+        'ipa_us': first_entry['ipa_us'],
+        'ipa_uk': first_entry['ipa_uk'],
+        'audio_us': first_entry['audio_us'],
+        'audio_uk': first_entry['audio_uk']
+    }
+    
+    # Return result if at least one field is populated
+    if not any(result.values()):
+        return None
+    
+    result['parts_of_speech'] = parts_of_speech
+    return result
+
+
+def _fetch_cambridge(word, base_url=None):
+    """
+    Fetch and parse one word
+    Returns None when the word has no entry; raises CambridgeFetchError for
+    failures that may succeed on retry.
+    """
+    base_url = base_url or CAMBRIDGE_BASE_URL
+    url = f"{base_url}/dictionary/english/{quote(word.lower().strip())}"
+    
+    try:
+        response = get_session().get(url, timeout=10)
     except requests.exceptions.RequestException as e:
-        print(f"[Cambridge API] Network error for '{word}': {str(e)}")
+        raise CambridgeFetchError(f"Network error: {str(e)}")
+    
+    if response.status_code == 429 or response.status_code >= 500:
+        raise CambridgeFetchError(f"HTTP {response.status_code}")
+    if response.status_code != 200:
+        print(f"[Cambridge API] HTTP {response.status_code} for '{word}'")
+        return None
+    
+    return parse_cambridge_page(response.content, base_url)
+
+
+def fetch_cambridge_data(word, base_url=None):
+    """
+    Fetch pronunciation (IPA) and audio URLs from Cambridge Dictionary
+    Served from the lookup cache when possible; "not found" is cached too.
+    Returns: dict with ipa_us, ipa_uk, audio_us, audio_uk
+    """
+    hit, data = _cached(word, base_url)
+    if hit:
+        return data
+    
+    try:
+        data = _fetch_cambridge(word, base_url)
+    except CambridgeFetchError as e:
+        print(f"[Cambridge API] {str(e)} for '{word}'")
         return None
     except Exception as e:
         print(f"[Cambridge API] Unexpected error for '{word}': {str(e)}")
         return None
+    
+    _store(word, base_url, data)
+    return data
+
+
+# ==================== BATCH FETCHING ====================
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by all fetch threads
+    Allows bursts of up to `capacity` requests, then `rate` per second.
+    """
+    
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def _load_progress(progress_path):
+    done = {}
+    if progress_path and os.path.exists(progress_path):
+        with open(progress_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Partial line from an interrupted run
+                done[entry['word']] = entry['data']
+    return done
+
+
+def fetch_batch(words, concurrency=4, rate=2.0, burst=None, retries=3,
+                progress_path=None, base_url=None):
+    """
+    Fetch pronunciation for many words concurrently
+    Yields (word, data) in completion order; data is None when nothing was
+    found. At most `concurrency` requests are in flight and at most `rate`
+    start per second. With progress_path, results are appended to a JSON
+    Lines file and words already in it are yielded again without refetching,
+    so an interrupted run can resume. Words that keep failing are yielded
+    with None but not recorded, so the next run retries them.
+    """
+    done = _load_progress(progress_path)
+    if concurrency > POOL_SIZE:
+        print(f"[Cambridge API] {concurrency} concurrent fetches but CAMBRIDGE_POOL_SIZE={POOL_SIZE}: "
+              f"connections beyond the pool are not reused")
+    limiter = TokenBucket(rate, burst)
+    
+    pending = []
+    for word in words:
+        if word in done:
+            yield word, done[word]
+        else:
+            pending.append(word)
+    
+    def fetch(word):
+        # Cache hits skip the network and the rate limiter
+        hit, data = _cached(word, base_url)
+        if hit:
+            return word, data, True
+        
+        for attempt in range(retries + 1):
+            limiter.acquire()
+            try:
+                data = _fetch_cambridge(word, base_url)
+                _store(word, base_url, data)
+                return word, data, True
+            except CambridgeFetchError as e:
+                if attempt == retries:
+                    print(f"[Cambridge API] Giving up on '{word}': {str(e)}")
+                    return word, None, False
+                time.sleep(2 ** attempt)
+            except Exception as e:
+                print(f"[Cambridge API] Unexpected error for '{word}': {str(e)}")
+                return word, None, False
+    
+    progress_file = open(progress_path, 'a', encoding='utf-8') if progress_path else None
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            # Keep a bounded window of submitted work rather than queueing every word
+            remaining = iter(pending)
+            in_flight = set()
+            for word in remaining:
+                in_flight.add(executor.submit(fetch, word))
+                if len(in_flight) >= concurrency * 2:
+                    break
+            
+            while in_flight:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    word, data, completed = future.result()
+                    if completed and progress_file:
+                        progress_file.write(json.dumps({'word': word, 'data': data}, ensure_ascii=False) + '\n')
+                        progress_file.flush()
+                    yield word, data
+                    
+                    next_word = next(remaining, None)
+                    if next_word is not None:
+                        in_flight.add(executor.submit(fetch, next_word))
+    finally:
+        if progress_file:
+            progress_file.close()
 
 
 def fetch_pronunciation_data(word, skip_fetch=False):
@@ -0,0 +1,98 @@
+"""
+Shared word catalog (multi-user mode)
+One SQLite file holds a reference definition and example and the
+pronunciation of words, shared by every learner: a word's IPA lookup,
+dictionary fetch and audio rendering happen once, not once per learner.
+Requests read it through read-only connections; only the pronunciation
+workers and the seed command write to it.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from lookup_cache import normalize_key
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'catalog.db')
+FIELDS = ('definition', 'example', 'ipa_us', 'ipa_uk', 'audio_us', 'audio_uk')
+PRONUNCIATION_FIELDS = ('ipa_us', 'ipa_uk', 'audio_us', 'audio_uk')
+SUGGESTION_FIELDS = ('definition', 'example')  # Kept once set; pronunciation is refreshed
+
+
+class Catalog:
+    """Read-mostly SQLite table of words, safe to share between threads"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._writer = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.execute("PRAGMA synchronous=NORMAL")
+        self._writer.execute(f"""
+            CREATE TABLE IF NOT EXISTS catalog_words (
+                word TEXT PRIMARY KEY,
+                {', '.join(f'{field} TEXT' for field in FIELDS)},
+                updated_at REAL NOT NULL
+            )
+        """)
+
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, word):
+        """Catalog entry for a word as a dict, or None"""
+        row = self._reader().execute(
+            f"SELECT {', '.join(FIELDS)} FROM catalog_words WHERE word = ?", (normalize_key(word),)
+        ).fetchone()
+        return dict(zip(FIELDS, row)) if row else None
+
+    def lookup_pronunciation(self, word):
+        """Pronunciation fields for a word, or None if the catalog has none"""
+        entry = self.lookup(word)
+        if entry is None or not any(entry[field] for field in PRONUNCIATION_FIELDS):
+            return None
+        return {field: entry[field] for field in PRONUNCIATION_FIELDS}
+
+    def store(self, entries):
+        """
+        Add or update words from (word, {field: value}) pairs
+        Only the fields given (and not None) are changed on existing words,
+        and a definition or example is only filled in where there is none:
+        the first learner's stays the suggestion for everyone else.
+        """
+        now = time.time()
+        columns = ', '.join(FIELDS)
+        updates = ', '.join(
+            f'{field} = COALESCE({field}, excluded.{field})' if field in SUGGESTION_FIELDS
+            else f'{field} = COALESCE(excluded.{field}, {field})'
+            for field in FIELDS
+        )
+        rows = [
+            (normalize_key(word),) + tuple(values.get(field) or None for field in FIELDS) + (now,)
+            for word, values in entries
+        ]
+        with self._write_lock:
+            self._writer.execute("BEGIN")
+            try:
+                self._writer.executemany(
+                    f"INSERT INTO catalog_words (word, {columns}, updated_at) "
+                    f"VALUES ({', '.join('?' * (len(FIELDS) + 2))}) "
+                    f"ON CONFLICT(word) DO UPDATE SET {updates}, updated_at = excluded.updated_at",
+                    rows
+                )
+                self._writer.execute("COMMIT")
+            except Exception:
+                self._writer.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def count(self):
+        return self._reader().execute("SELECT COUNT(*) FROM catalog_words").fetchone()[0]
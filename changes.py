@@ -0,0 +1,159 @@
+"""
+Change notifications for open browser tabs
+Every add, update, delete and practice appends a row to change_log (via
+triggers), and its autoincrement id is the data version. One watcher thread
+per process follows the log and pushes new events to server-sent event
+streams, so idle tabs cost nothing but a held connection.
+"""
+
+from collections import deque
+import json
+import threading
+
+from sqlalchemy import event
+
+from models import db, current_shard, use_shard
+
+
+def current_data_version():
+    """The id of the newest change - a rowid lookup, not a scan"""
+    return db.session.execute(db.text("SELECT IFNULL(MAX(id), 0) FROM change_log")).scalar()
+
+
+class ChangeFeed:
+    """
+    Fan out change_log events to server-sent event streams
+    A single watcher thread reads the log while anyone is listening; commits
+    made in this process wake it immediately, commits from other processes
+    are picked up within poll_interval seconds.
+    """
+
+    def __init__(self, poll_interval=1.0, heartbeat_interval=15.0, backlog=1000, shard=None):
+        self.poll_interval = poll_interval
+        self.shard = shard
+        self.heartbeat_interval = heartbeat_interval
+        self.app = None
+        self._events = deque(maxlen=backlog)
+        self._version = None
+        self._listeners = 0
+        self._condition = threading.Condition()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+
+    @property
+    def listeners(self):
+        with self._condition:
+            return self._listeners
+
+    def _fetch_since(self, version, limit=500):
+        with self.app.app_context(), use_shard(self.shard):
+            rows = db.session.execute(
+                db.text(
+                    "SELECT id, entity_id, action, changed_at FROM change_log "
+                    "WHERE id > :version ORDER BY id LIMIT :limit"
+                ),
+                {'version': version, 'limit': limit}
+            ).all()
+            return [
+                {'version': row[0], 'id': row[1], 'action': row[2], 'changed_at': str(row[3])}
+                for row in rows
+            ]
+
+    def _load_version(self):
+        with self.app.app_context(), use_shard(self.shard):
+            return current_data_version()
+
+    def _start_watcher(self):
+        with self._condition:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._watch, name='change-feed', daemon=True)
+                self._thread.start()
+
+    def _watch(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            with self._condition:
+                if self._listeners == 0:
+                    # Nobody listening - the next stream starts a new watcher
+                    self._thread = None
+                    return
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[Changes] Error reading change log: {str(e)}")
+
+    def poke(self):
+        """Ask the watcher to read the log now"""
+        self._wakeup.set()
+
+    def refresh(self):
+        """Read new change_log rows and wake every waiting stream"""
+        with self._condition:
+            version = self._version
+        events = self._fetch_since(version)
+        if not events:
+            return
+        with self._condition:
+            self._events.extend(events)
+            self._version = events[-1]['version']
+            self._condition.notify_all()
+
+    def _events_after(self, version):
+        with self._condition:
+            if self._events and self._events[0]['version'] <= version + 1:
+                return [e for e in self._events if e['version'] > version]
+        return self._fetch_since(version)
+
+    def stream(self, last_version=None):
+        """
+        Generate a text/event-stream body
+        Starts after last_version (from the Last-Event-ID header on reconnect)
+        or at the current version for a new client.
+        """
+        with self._condition:
+            if self._version is None:
+                self._version = self._load_version()
+            self._listeners += 1
+            version = self._version if last_version is None else last_version
+        self._start_watcher()
+
+        try:
+            yield f"event: hello\nid: {version}\ndata: {json.dumps({'version': version})}\n\n"
+            while True:
+                with self._condition:
+                    if self._version <= version:
+                        self._condition.wait(self.heartbeat_interval)
+                    latest = self._version
+
+                if latest <= version:
+                    yield ": keepalive\n\n"
+                    continue
+
+                changes = self._events_after(version)
+                if not changes:
+                    # Pruned from the log - nothing left to replay
+                    version = latest
+                for change in changes:
+                    version = change['version']
+                    yield f"event: change\nid: {version}\ndata: {json.dumps(change)}\n\n"
+        finally:
+            with self._condition:
+                self._listeners -= 1
+
+
+change_feed = ChangeFeed()
+
+
+def current_feed():
+    """The change feed for the current shard, or the main database's"""
+    shard = current_shard.get()
+    return shard.feed if shard is not None else change_feed
+
+
+@event.listens_for(db.session, 'after_commit')
+def _wake_change_feed(session):
+    current_feed().poke()
@@ -0,0 +1,72 @@
+"""
+gzip/brotli response compression
+API and page responses are compressed after the view runs when the client
+accepts it and the body is text worth compressing. brotli is used when the
+brotli package is installed (pip install brotli) and the client prefers or
+allows it, gzip otherwise. Streamed responses (exports, event streams,
+import progress) and audio are left alone.
+"""
+
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_SIZE = 512  # bytes; smaller bodies don't shrink enough to bother
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'text/html', 'text/css', 'text/javascript',
+    'text/plain', 'text/csv', 'image/svg+xml',
+}
+# Per-request compression favours speed; static files are compressed once at the highest levels
+DYNAMIC_LEVELS = {'br': 4, 'gzip': 6}
+STATIC_LEVELS = {'br': 11, 'gzip': 9}
+
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encodings, encodings=None):
+    """The best of our encodings the client accepts (from request.accept_encodings), or None"""
+    best = None
+    best_quality = 0
+    for encoding in encodings or available_encodings():
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body, encoding, levels=DYNAMIC_LEVELS):
+    if encoding == 'br':
+        return brotli.compress(body, quality=levels['br'])
+    return gzip.compress(body, compresslevel=levels['gzip'], mtime=0)
+
+
+def compress_response(response):
+    """after_request hook: compress the body if the client accepts it"""
+    response.vary.add('Accept-Encoding')
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+
+    encoding = negotiate_encoding(request.accept_encodings)
+    body = response.get_data()
+    if encoding is None or len(body) < MIN_SIZE:
+        return response
+
+    response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    # Same content, different bytes: a weak validator still matches If-None-Match
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
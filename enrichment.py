@@ -0,0 +1,259 @@
+"""
+Background pronunciation enrichment
+New words are stored right away with pronunciation_status 'pending' and a row
+in pronunciation_jobs. A small pool of worker threads claims jobs from that
+table, fills in IPA and audio, and retries failures with backoff. Because
+the queue lives in the database, pending work survives a restart. A result
+is written only if the worker still holds the job's lease and the word
+still has the spelling that was looked up.
+
+In multi-user mode each learner's shard has its own job table; the accounts
+database records which learners have jobs due, and pronunciations are
+looked up in (and added to) the shared catalog first.
+"""
+
+from datetime import datetime, timedelta
+import threading
+
+from cambridge_api import fetch_pronunciation_data
+from models import db, current_engine, current_shard, use_shard, Vocabulary, PronunciationJob
+from offline_pronunciation import fetch_offline_pronunciation
+
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 30  # seconds, doubled after each failed attempt
+LEASE_SECONDS = 300  # a claimed job is handed out again if not finished by then
+
+
+def enqueue_pronunciation(word):
+    """Mark a word pending and queue it for enrichment (caller commits)"""
+    catalog = pronunciation_workers.catalog
+    known = catalog.lookup_pronunciation(word.word) if catalog is not None else None
+    job = db.session.get(PronunciationJob, word.id)
+    if known:
+        # Another learner's word already has it
+        for field, value in known.items():
+            setattr(word, field, value)
+        word.pronunciation_status = 'ready'
+        if job is not None:
+            db.session.delete(job)
+        return
+
+    word.pronunciation_status = 'pending'
+    if job is None:
+        db.session.add(PronunciationJob(vocabulary_id=word.id))
+    else:
+        job.attempts = 0
+        job.next_attempt_at = datetime.utcnow()
+        job.locked_at = None
+        job.last_error = None
+
+
+def fetch_word_pronunciation_data(word_text, fetch_cambridge=True):
+    """
+    Look up pronunciation for a word
+    Offline IPA and audio first, then Cambridge Dictionary for better audio
+    and any missing IPA.
+    """
+    pronunciation_data = {'ipa_us': None, 'ipa_uk': None, 'audio_us': None, 'audio_uk': None}
+
+    # Try offline pronunciation first (always works, no internet needed for IPA)
+    try:
+        offline_data = fetch_offline_pronunciation(word_text)
+        if offline_data and any(offline_data.values()):
+            pronunciation_data = offline_data
+    except Exception as e:
+        print(f"[Enrichment] Offline pronunciation failed for '{word_text}': {str(e)}")
+
+    # Optionally try Cambridge Dictionary if online (better audio quality)
+    if fetch_cambridge and not pronunciation_data.get('audio_us'):
+        cambridge_data = fetch_pronunciation_data(word_text, skip_fetch=False)
+        if cambridge_data:
+            # Use Cambridge audio if available (better quality)
+            if cambridge_data.get('audio_us'):
+                pronunciation_data['audio_us'] = cambridge_data['audio_us']
+            if cambridge_data.get('audio_uk'):
+                pronunciation_data['audio_uk'] = cambridge_data['audio_uk']
+            # Use Cambridge IPA if offline didn't work
+            if cambridge_data.get('ipa_us') and not pronunciation_data.get('ipa_us'):
+                pronunciation_data['ipa_us'] = cambridge_data['ipa_us']
+            if cambridge_data.get('ipa_uk') and not pronunciation_data.get('ipa_uk'):
+                pronunciation_data['ipa_uk'] = cambridge_data['ipa_uk']
+
+    return pronunciation_data
+
+
+class EnrichmentWorkerPool:
+    """Worker threads that drain the pronunciation_jobs table"""
+
+    def __init__(self, workers=2, poll_interval=2.0):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.fetch_cambridge = True
+        self.app = None
+        self.shards = None  # ShardPool in multi-user mode
+        self.catalog = None  # Shared Catalog in multi-user mode
+        self._wakeup = threading.Event()
+        self._threads = []
+
+    def start(self, app, fetch_cambridge=True):
+        self.app = app
+        self.fetch_cambridge = fetch_cambridge
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'enrichment-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"[Enrichment] Started {self.workers} pronunciation worker(s)")
+
+    def notify(self):
+        """Wake idle workers after new jobs are committed"""
+        shard = current_shard.get()
+        if shard is not None and self.shards is not None:
+            self.shards.mark_pronunciation_due(shard.user_id)
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    worked = self.run_once() if self.shards is None else self.run_due_shard()
+            except Exception as e:
+                print(f"[Enrichment] Worker error: {str(e)}")
+                worked = False
+
+            if not worked:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _claim(self):
+        now = datetime.utcnow()
+        with current_engine().begin() as conn:
+            row = conn.execute(
+                db.text("""
+                    UPDATE pronunciation_jobs
+                    SET locked_at = :now, attempts = attempts + 1
+                    WHERE vocabulary_id = (
+                        SELECT vocabulary_id FROM pronunciation_jobs
+                        WHERE next_attempt_at <= :now
+                          AND (locked_at IS NULL OR locked_at < :stale)
+                        ORDER BY next_attempt_at
+                        LIMIT 1
+                    )
+                    RETURNING vocabulary_id, attempts, locked_at
+                """),
+                {'now': now, 'stale': now - timedelta(seconds=LEASE_SECONDS)}
+            ).first()
+        return row
+
+    def run_due_shard(self):
+        """Multi-user mode: drain one learner's due jobs; returns False if nobody has any"""
+        claimed = self.shards.claim_pronunciation_due()
+        if claimed is None:
+            return False
+
+        # If this fails the lease runs out and the learner is picked up again
+        user_id, lease = claimed
+        shard = self.shards.acquire(user_id)
+        try:
+            with use_shard(shard):
+                while self.run_once():
+                    pass
+                next_due = db.session.query(db.func.min(PronunciationJob.next_attempt_at)).scalar()
+        finally:
+            shard.release()
+        self.shards.release_pronunciation_due(user_id, lease, next_due)
+        return True
+
+    def _release(self, vocabulary_id, lease):
+        """
+        Clear a claimed job's lease, which also takes the write lock
+        Returns False if this worker no longer holds the job: the lease ran
+        out and another worker claimed it, or the word was changed and
+        queued again, or deleted.
+        """
+        result = db.session.execute(
+            db.text(
+                "UPDATE pronunciation_jobs SET locked_at = NULL "
+                "WHERE vocabulary_id = :vocabulary_id AND locked_at = :lease"
+            ),
+            {'vocabulary_id': vocabulary_id, 'lease': lease}
+        )
+        return result.rowcount == 1
+
+    def run_once(self):
+        """Claim and process one job; returns False when the queue is empty"""
+        claimed = self._claim()
+        if claimed is None:
+            return False
+
+        vocabulary_id, attempts, lease = claimed
+        word = db.session.get(Vocabulary, vocabulary_id)
+
+        if word is None:
+            # Word was deleted while queued
+            job = db.session.get(PronunciationJob, vocabulary_id)
+            if job is not None:
+                db.session.delete(job)
+                db.session.commit()
+            return True
+
+        spelling, definition, example = word.word, word.definition, word.example
+        # Don't hold a read transaction open during the fetch
+        db.session.rollback()
+
+        try:
+            pronunciation_data = self.catalog.lookup_pronunciation(spelling) if self.catalog else None
+            if pronunciation_data is None:
+                pronunciation_data = fetch_word_pronunciation_data(spelling, self.fetch_cambridge)
+                if not any(pronunciation_data.values()):
+                    raise ValueError('no pronunciation data found')
+                if self.catalog is not None:
+                    # The first learner's definition becomes the suggestion for the others
+                    self.catalog.store([(spelling, dict(
+                        pronunciation_data, definition=definition, example=example
+                    ))])
+        except Exception as e:
+            db.session.rollback()
+            self._record_failure(vocabulary_id, attempts, lease, str(e))
+            return True
+
+        # Only write if the job is still ours and the word still has the spelling fetched
+        word = db.session.get(Vocabulary, vocabulary_id) if self._release(vocabulary_id, lease) else None
+        if word is None or word.word != spelling:
+            db.session.rollback()
+            print(f"[Enrichment] Dropped pronunciation for '{spelling}': the word or its job changed meanwhile")
+            return True
+
+        word.ipa_us = pronunciation_data.get('ipa_us')
+        word.ipa_uk = pronunciation_data.get('ipa_uk')
+        word.audio_us = pronunciation_data.get('audio_us')
+        word.audio_uk = pronunciation_data.get('audio_uk')
+        word.pronunciation_status = 'ready'
+        job = db.session.get(PronunciationJob, vocabulary_id)
+        if job is not None:
+            db.session.delete(job)
+        db.session.commit()
+        print(f"[Enrichment] Pronunciation ready for '{word.word}'")
+        return True
+
+    def _record_failure(self, vocabulary_id, attempts, lease, error):
+        if not self._release(vocabulary_id, lease):
+            db.session.rollback()
+            return
+        job = db.session.get(PronunciationJob, vocabulary_id)
+        word = db.session.get(Vocabulary, vocabulary_id)
+        if job is None or word is None:
+            db.session.rollback()
+            return
+
+        job.last_error = error[:500]
+        if attempts >= MAX_ATTEMPTS:
+            word.pronunciation_status = 'failed'
+            db.session.delete(job)
+            print(f"[Enrichment] Giving up on '{word.word}' after {attempts} attempts: {error}")
+        else:
+            delay = RETRY_BASE_DELAY * (2 ** (attempts - 1))
+            job.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+            print(f"[Enrichment] Attempt {attempts} failed for '{word.word}', retrying in {delay}s: {error}")
+        db.session.commit()
+
+pronunciation_workers = EnrichmentWorkerPool()
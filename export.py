@@ -0,0 +1,193 @@
+"""
+Streaming export of vocabulary and learning history
+Rows are read with a server-side cursor (yield_per) and written out in small
+blocks as NDJSON, CSV or Anki-importable TSV, so memory use stays the same
+however large the tables are. With since=, only rows added or changed after
+that time are exported; each response carries the time to pass as since=
+next (X-Export-Until).
+
+Learning history is windowed on recorded_at, when the row was written, not
+on practiced_at: answers are sent late (the web app holds a game session's
+answers until the deck ends, and batches carry an age of up to a day), so
+a row's practiced_at is often earlier than an until that an export already
+returned, and it would never be exported. practiced_at is exported as data.
+"""
+
+import csv
+from datetime import datetime, timedelta, timezone
+import io
+import itertools
+import json
+
+from sqlalchemy import select
+
+from models import db, Vocabulary, LearningHistory
+
+EXPORT_BATCH = 1000  # Rows fetched per cursor round trip
+# An export covers changes up to this many seconds ago, leaving time for
+# writes that were in progress to commit before the next export picks up
+EXPORT_SETTLE_SECONDS = 2
+BLOCK_ROWS = 500  # Rows per chunk of the response body
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'tsv': 'text/tab-separated-values',
+}
+EXTENSIONS = {'ndjson': 'ndjson', 'csv': 'csv', 'tsv': 'txt'}
+
+VOCABULARY_COLUMNS = [
+    'id', 'word', 'definition', 'example', 'translation', 'ipa_us', 'ipa_uk', 'audio_us', 'audio_uk',
+    'status', 'created_at', 'updated_at', 'learned_at', 'times_practiced',
+    'ease_factor', 'interval_days', 'repetitions', 'due_at',
+]
+HISTORY_COLUMNS = ['id', 'vocabulary_id', 'word', 'activity_type', 'correct', 'practiced_at']
+
+# Same column order as the bulk import TSV reader, so an export re-imports as is
+ANKI_COLUMNS = ['word', 'definition', 'example', 'translation', 'ipa_us', 'status']
+
+
+class ExportError(ValueError):
+    """Bad export parameters"""
+
+
+def export_window(since_value):
+    """Parse ?since= and pick the end of the window; returns (since, until)"""
+    return parse_since(since_value), datetime.utcnow() - timedelta(seconds=EXPORT_SETTLE_SECONDS)
+
+
+def parse_since(value):
+    """?since= as naive UTC; times with an offset are converted, times without one are UTC"""
+    if not value:
+        return None
+    try:
+        since = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ExportError(f"Invalid since '{value}' (use an ISO 8601 time, e.g. 2025-01-31T12:00:00; "
+                          "write a + offset as %2B in the URL)")
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since
+
+
+def _value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _vocabulary_query(since, until):
+    query = select(*[getattr(Vocabulary, column) for column in VOCABULARY_COLUMNS])
+    if since is None:
+        return query.order_by(Vocabulary.id)
+    return query.where(
+        Vocabulary.updated_at > since, Vocabulary.updated_at <= until
+    ).order_by(Vocabulary.updated_at, Vocabulary.id)
+
+
+def _history_query(since, until):
+    query = select(
+        LearningHistory.id, LearningHistory.vocabulary_id, Vocabulary.word,
+        LearningHistory.activity_type, LearningHistory.correct, LearningHistory.practiced_at
+    ).outerjoin(Vocabulary, Vocabulary.id == LearningHistory.vocabulary_id)  # Keeps history as the driving table
+    if since is None:
+        return query.order_by(LearningHistory.id)
+    return query.where(
+        LearningHistory.recorded_at > since, LearningHistory.recorded_at <= until
+    ).order_by(LearningHistory.recorded_at, LearningHistory.id)
+
+
+def _rows(query):
+    """Stream result rows through a server-side cursor"""
+    result = db.session.execute(query.execution_options(yield_per=EXPORT_BATCH))
+    try:
+        for partition in result.partitions():
+            yield from partition
+    finally:
+        result.close()
+
+
+def _deleted(since, until):
+    """
+    Tombstones for words deleted in the window, from the change log
+    change_log keeps whole seconds, so the window is widened to whole seconds
+    - a delete may be reported twice, never missed (within the log's
+    retention).
+    """
+    rows = db.session.execute(
+        db.text(
+            "SELECT entity_id, changed_at FROM change_log "
+            "WHERE action = 'delete' AND changed_at >= :since AND changed_at <= :until "
+            "ORDER BY changed_at"
+        ),
+        {'since': since.strftime('%Y-%m-%d %H:%M:%S'), 'until': until.strftime('%Y-%m-%d %H:%M:%S')}
+    )
+    for entity_id, changed_at in rows:
+        yield json.dumps({'id': entity_id, 'deleted': True, 'deleted_at': str(changed_at).replace(' ', 'T')}) + '\n'
+
+
+def _blocks(lines):
+    """Group output lines into response chunks"""
+    block = []
+    for line in lines:
+        block.append(line)
+        if len(block) >= BLOCK_ROWS:
+            yield ''.join(block)
+            block = []
+    if block:
+        yield ''.join(block)
+
+
+def _ndjson(rows, columns):
+    for row in rows:
+        yield json.dumps({column: _value(value) for column, value in zip(columns, row)}, ensure_ascii=False) + '\n'
+
+
+def _csv(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_value(value) for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _anki(rows, columns):
+    # Anki file headers: https://docs.ankiweb.net/importing/text-files.html#file-headers
+    yield '#separator:tab\n#html:false\n'
+    yield '#columns:' + '\t'.join(ANKI_COLUMNS[:-1] + ['tags']) + '\n'
+    yield f'#tags column:{len(ANKI_COLUMNS)}\n'
+    indexes = [columns.index(column) for column in ANKI_COLUMNS]
+    for row in rows:
+        fields = [' '.join(str(row[index] or '').split()) for index in indexes]
+        yield '\t'.join(fields) + '\n'
+
+
+def export_stream(table, export_format, since=None, until=None):
+    """
+    Generate an export body in blocks
+    table is 'vocabulary' or 'history'; export_format is ndjson, csv or tsv
+    (vocabulary only). Rows changed after since and up to until are
+    included, or every row when since is None. Incremental NDJSON exports
+    of vocabulary end with {"id": ..., "deleted": true} lines for words
+    deleted in the window.
+    """
+    if export_format not in FORMATS:
+        raise ExportError(f"Unknown format '{export_format}' (use {', '.join(FORMATS)})")
+    if table == 'vocabulary':
+        query, columns = _vocabulary_query(since, until), VOCABULARY_COLUMNS
+    elif table == 'history':
+        if export_format == 'tsv':
+            raise ExportError('History can be exported as ndjson or csv')
+        query, columns = _history_query(since, until), HISTORY_COLUMNS
+    else:
+        raise ExportError(f"Unknown export '{table}'")
+
+    writer = {'ndjson': _ndjson, 'csv': _csv, 'tsv': _anki}[export_format]
+    lines = writer(_rows(query), columns)
+    if table == 'vocabulary' and export_format == 'ndjson' and since is not None:
+        lines = itertools.chain(lines, _deleted(since, until))
+    return _blocks(lines)
@@ -0,0 +1,265 @@
+"""
+Precomputed fill-in-the-blank sentences
+When a word or its example is written, the example is searched for the word
+in any inflected form - "accomplished" for "accomplish", "utilities" for
+"utility", "went" for "go" - and stored with that form blanked out, so
+serving a question is a plain row read. Forms come from English spelling
+rules plus a table of irregular forms, with a suffix-stripping stemmer as
+a last resort. Words whose example still doesn't contain them are left
+without a sentence and fall back to the definition; count them with
+fallback_stats() or `python fill_blank.py`.
+
+    python fill_blank.py            # fallback rate and the words that fall back
+    python fill_blank.py rebuild    # recompute every sentence (after changing the rules)
+"""
+
+import re
+import sys
+
+from sqlalchemy import event, inspect
+
+from models import db, current_engine, Vocabulary
+
+BLANK = '_____'
+VOWELS = set('aeiou')
+
+# Irregular forms by lemma: verbs (past, participles, 3rd person), nouns, adjectives
+IRREGULAR = {
+    'arise': ['arose', 'arisen'], 'be': ['am', 'is', 'are', 'was', 'were', 'been', 'being'],
+    'bear': ['bore', 'borne', 'born'], 'beat': ['beaten'], 'become': ['became'], 'begin': ['began', 'begun'],
+    'bend': ['bent'], 'bind': ['bound'], 'bite': ['bit', 'bitten'], 'bleed': ['bled'], 'blow': ['blew', 'blown'],
+    'break': ['broke', 'broken'], 'breed': ['bred'], 'bring': ['brought'], 'build': ['built'],
+    'burn': ['burnt'], 'buy': ['bought'], 'catch': ['caught'], 'choose': ['chose', 'chosen'],
+    'cling': ['clung'], 'come': ['came'], 'creep': ['crept'], 'deal': ['dealt'], 'dig': ['dug'],
+    'do': ['did', 'done', 'does'], 'draw': ['drew', 'drawn'], 'dream': ['dreamt'], 'drink': ['drank', 'drunk'],
+    'drive': ['drove', 'driven'], 'eat': ['ate', 'eaten'], 'fall': ['fell', 'fallen'], 'feed': ['fed'],
+    'feel': ['felt'], 'fight': ['fought'], 'find': ['found'], 'flee': ['fled'], 'fly': ['flew', 'flown'],
+    'forbid': ['forbade', 'forbidden'], 'forecast': ['forecast'], 'foresee': ['foresaw', 'foreseen'],
+    'forget': ['forgot', 'forgotten'], 'forgive': ['forgave', 'forgiven'], 'freeze': ['froze', 'frozen'],
+    'get': ['got', 'gotten'], 'give': ['gave', 'given'], 'go': ['went', 'gone', 'goes'],
+    'grind': ['ground'], 'grow': ['grew', 'grown'], 'hang': ['hung'], 'have': ['has', 'had', 'having'],
+    'hear': ['heard'], 'hide': ['hid', 'hidden'], 'hold': ['held'], 'keep': ['kept'], 'kneel': ['knelt'],
+    'know': ['knew', 'known'], 'lay': ['laid'], 'lead': ['led'], 'lean': ['leant'], 'leap': ['leapt'],
+    'learn': ['learnt'], 'leave': ['left'], 'lend': ['lent'], 'lie': ['lay', 'lain', 'lying'],
+    'light': ['lit'], 'lose': ['lost'], 'make': ['made'], 'mean': ['meant'], 'meet': ['met'],
+    'mislead': ['misled'], 'mistake': ['mistook', 'mistaken'], 'misunderstand': ['misunderstood'],
+    'overcome': ['overcame'], 'overtake': ['overtook', 'overtaken'], 'pay': ['paid'],
+    'prove': ['proven'], 'ride': ['rode', 'ridden'], 'ring': ['rang', 'rung'], 'rise': ['rose', 'risen'],
+    'run': ['ran'], 'say': ['said'], 'see': ['saw', 'seen'], 'seek': ['sought'], 'sell': ['sold'],
+    'send': ['sent'], 'sew': ['sewn'], 'shake': ['shook', 'shaken'], 'shine': ['shone'], 'shoot': ['shot'],
+    'show': ['shown'], 'shrink': ['shrank', 'shrunk'], 'sing': ['sang', 'sung'], 'sink': ['sank', 'sunk'],
+    'sit': ['sat'], 'sleep': ['slept'], 'slide': ['slid'], 'speak': ['spoke', 'spoken'],
+    'speed': ['sped'], 'spend': ['spent'], 'spin': ['spun'], 'spring': ['sprang', 'sprung'],
+    'stand': ['stood'], 'steal': ['stole', 'stolen'], 'stick': ['stuck'], 'sting': ['stung'],
+    'strike': ['struck', 'stricken'], 'strive': ['strove', 'striven'], 'swear': ['swore', 'sworn'],
+    'sweep': ['swept'], 'swim': ['swam', 'swum'], 'swing': ['swung'], 'take': ['took', 'taken'],
+    'teach': ['taught'], 'tear': ['tore', 'torn'], 'tell': ['told'], 'think': ['thought'],
+    'throw': ['threw', 'thrown'], 'undergo': ['underwent', 'undergone'], 'understand': ['understood'],
+    'undertake': ['undertook', 'undertaken'], 'wake': ['woke', 'woken'], 'wear': ['wore', 'worn'],
+    'weave': ['wove', 'woven'], 'weep': ['wept'], 'win': ['won'], 'wind': ['wound'],
+    'withdraw': ['withdrew', 'withdrawn'], 'withhold': ['withheld'], 'withstand': ['withstood'],
+    'write': ['wrote', 'written'],
+    'analysis': ['analyses'], 'child': ['children'], 'crisis': ['crises'], 'criterion': ['criteria'],
+    'foot': ['feet'], 'goose': ['geese'], 'hypothesis': ['hypotheses'], 'man': ['men'], 'mouse': ['mice'],
+    'phenomenon': ['phenomena'], 'person': ['people'], 'tooth': ['teeth'], 'woman': ['women'],
+    'bad': ['worse', 'worst'], 'far': ['further', 'furthest', 'farther', 'farthest'],
+    'good': ['better', 'best'], 'little': ['less', 'least'], 'many': ['more', 'most'],
+}
+
+# Suffixes the stemmer strips, longest first
+_SUFFIXES = ('ations', 'ation', 'ingly', 'ments', 'ment', 'iness', 'ness', 'ings', 'ing', 'ied', 'ies',
+             'ily', 'edly', 'ed', 'es', 'ly', 'er', 'est', 's')
+_TOKEN = re.compile(r"[A-Za-z]+(?:['’][A-Za-z]+)*")
+
+
+def _doubles_final_consonant(word):
+    # stop -> stopped, refer -> referred (a short final consonant-vowel-consonant)
+    return (len(word) >= 3 and word[-1] not in VOWELS and word[-1] not in 'wxy'
+            and word[-2] in VOWELS and word[-3] not in VOWELS)
+
+
+def inflections(lemma):
+    """Spellings the lemma can take in a sentence, including itself"""
+    forms = {lemma}
+    forms.update(IRREGULAR.get(lemma, []))
+
+    # Plurals and 3rd person
+    if lemma.endswith(('s', 'x', 'z', 'ch', 'sh', 'o')):
+        forms.add(lemma + 'es')
+    if lemma.endswith('y') and lemma[-2:-1] not in VOWELS:
+        forms.add(lemma[:-1] + 'ies')
+    elif lemma.endswith('f'):
+        forms.add(lemma[:-1] + 'ves')
+    elif lemma.endswith('fe'):
+        forms.add(lemma[:-2] + 'ves')
+    forms.add(lemma + 's')
+
+    # Past tense and -ing. Comparatives and adverbs (-er, -est, -ly) are
+    # left to the stemmer: without the part of speech they would turn
+    # "compute" into "computer" and "bank" into "banker"
+    if lemma.endswith('e'):
+        forms.update([lemma + 'd', lemma[:-1] + 'ing'])
+        if lemma.endswith('ie'):
+            forms.add(lemma[:-2] + 'ying')
+    elif lemma.endswith('y') and lemma[-2:-1] not in VOWELS:
+        forms.update([lemma[:-1] + 'ied', lemma + 'ing'])
+    else:
+        forms.update([lemma + 'ed', lemma + 'ing'])
+        if _doubles_final_consonant(lemma) or lemma.endswith('l'):
+            doubled = lemma + lemma[-1]
+            forms.update([doubled + 'ed', doubled + 'ing'])
+        if lemma.endswith('c'):
+            forms.update([lemma + 'ked', lemma + 'king'])
+    return forms
+
+
+def stem(token):
+    """Crude suffix-stripping stem, for forms the rules above don't produce"""
+    token = token.lower().replace('’', "'").split("'")[0]
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)]
+            break
+    if len(token) > 3 and token[-1] == token[-2] and token[-1] not in VOWELS:
+        token = token[:-1]  # stopp -> stop
+    if len(token) > 3 and token[-1] in 'ei':
+        token = token[:-1]  # relocate -> relocat, happi -> happ
+    return token
+
+
+def _phrase_pattern(lemma):
+    """Regex for the lemma in any form; in a phrase the first and last words inflect"""
+    words = lemma.split()
+    if len(words) == 1:
+        alternatives = [re.escape(form) for form in sorted(inflections(lemma), key=len, reverse=True)]
+        return re.compile(r'(?<!\w)(?:' + '|'.join(alternatives) + r')(?!\w)', re.IGNORECASE)
+
+    first = sorted(inflections(words[0]), key=len, reverse=True)
+    last = sorted(inflections(words[-1]), key=len, reverse=True) if len(words) > 2 else None
+    parts = ['(?:' + '|'.join(map(re.escape, first)) + ')']
+    if last:
+        parts += [re.escape(word) for word in words[1:-1]]
+        parts.append('(?:' + '|'.join(map(re.escape, last)) + ')')
+    else:
+        parts.append('(?:' + '|'.join(map(re.escape, sorted(inflections(words[1]), key=len, reverse=True))) + ')')
+    return re.compile(r'(?<!\w)' + r'\s+'.join(parts) + r'(?!\w)', re.IGNORECASE)
+
+
+def blank_example(word, example):
+    """
+    The example with every occurrence of the word blanked out
+    Returns (sentence, form) - form is the text that was blanked, as written
+    the first time - or (None, None) when the example doesn't contain it.
+    """
+    word = (word or '').strip().lower()
+    if not word or not example:
+        return None, None
+
+    pattern = _phrase_pattern(word)
+    # The answer is the lemma itself wherever it appears, else the first form found
+    match = re.search(r'(?<!\w)' + re.escape(word) + r'(?!\w)', example, re.IGNORECASE) or pattern.search(example)
+    if match is None and ' ' not in word:
+        # Last resort: a token with the same stem (e.g. "occurred" for "occur" is
+        # covered by the rules; this catches the rest, comparatives included)
+        target = stem(word)
+        if len(target) >= 4:
+            for token in _TOKEN.finditer(example):
+                if stem(token.group()) == target and token.group().lower()[:len(target)] == target:
+                    pattern = re.compile(r'(?<!\w)' + re.escape(token.group()) + r'(?!\w)')
+                    match = token
+                    break
+    if match is None:
+        return None, None
+    return pattern.sub(BLANK, example), match.group()
+
+
+def apply_blank(word):
+    """Set a Vocabulary's blank_sentence and blank_answer from its word and example"""
+    word.blank_sentence, word.blank_answer = blank_example(word.word, word.example)
+
+
+def blank_columns(values):
+    """blank_sentence and blank_answer for a row dict with word and example (bulk inserts)"""
+    sentence, form = blank_example(values.get('word'), values.get('example'))
+    return {'blank_sentence': sentence, 'blank_answer': form}
+
+
+@event.listens_for(Vocabulary, 'before_insert')
+def _blank_new_word(mapper, connection, target):
+    apply_blank(target)
+
+
+@event.listens_for(Vocabulary, 'before_update')
+def _blank_updated_word(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.word.history.has_changes() or state.attrs.example.history.has_changes():
+        apply_blank(target)
+
+
+# ==================== BACKFILL AND REPORTING ====================
+
+def fill_blanks(conn, batch_size=1000):
+    """Compute the sentence for every word (schema migration, rebuild); returns the count"""
+    last_id = 0
+    total = 0
+    while True:
+        rows = conn.execute(
+            db.text("SELECT id, word, example FROM vocabulary WHERE id > :last_id ORDER BY id LIMIT :limit"),
+            {'last_id': last_id, 'limit': batch_size}
+        ).all()
+        if not rows:
+            return total
+        updates = []
+        for vocabulary_id, word, example in rows:
+            sentence, form = blank_example(word, example)
+            updates.append({'id': vocabulary_id, 'sentence': sentence, 'form': form})
+        conn.execute(
+            db.text("UPDATE vocabulary SET blank_sentence = :sentence, blank_answer = :form WHERE id = :id"),
+            updates
+        )
+        last_id = rows[-1][0]
+        total += len(rows)
+
+
+def fallback_stats():
+    """How many words with an example have a blanked sentence, and how many fall back"""
+    counts = dict(db.session.execute(db.text(
+        "SELECT blank_sentence IS NULL, COUNT(*) FROM vocabulary WHERE example != '' GROUP BY blank_sentence IS NULL"
+    )).all())
+    fallback = counts.get(1, 0)
+    with_example = fallback + counts.get(0, 0)
+    return {
+        'with_example': with_example,
+        'blanked': with_example - fallback,
+        'fallback': fallback,
+        'fallback_rate': round(fallback / with_example, 4) if with_example else None,
+    }
+
+
+def fallback_words(limit=50):
+    """Words whose example doesn't contain them, to fix the example"""
+    return db.session.execute(db.text(
+        "SELECT word, example FROM vocabulary WHERE example != '' AND blank_sentence IS NULL LIMIT :limit"
+    ), {'limit': limit}).all()
+
+
+if __name__ == '__main__':
+    import os
+    os.environ.setdefault('PRONUNCIATION_WORKERS', '0')
+    from app import app
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'report'
+    if command not in ('report', 'rebuild'):
+        print(__doc__)
+        sys.exit(2)
+
+    with app.app_context():
+        if command == 'rebuild':
+            with current_engine().begin() as conn:
+                print(f"✓ Recomputed {fill_blanks(conn)} sentence(s)")
+        stats = fallback_stats()
+        print(f"Words with examples: {stats['with_example']}")
+        print(f"Blanked: {stats['blanked']}, falling back to the definition: {stats['fallback']}"
+              + (f" ({stats['fallback_rate']:.1%})" if stats['fallback_rate'] is not None else ''))
+        for word, example in fallback_words():
+            print(f"  {word}: {example}")
@@ -0,0 +1,128 @@
+"""
+Persistent on-disk cache for dictionary lookups
+Parsed results are stored in a small SQLite file keyed by normalized word,
+with a TTL, negative caching for words that were not found, a size cap with
+least-recently-used eviction, and hit/miss counters
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), 'instance', 'cambridge_cache.db')
+DEFAULT_TTL = 30 * 24 * 3600  # Found words: 30 days
+DEFAULT_NEGATIVE_TTL = 7 * 24 * 3600  # Not-found words: 7 days
+DEFAULT_MAX_ENTRIES = 100000
+
+# Check the size cap every this many writes rather than on each one
+EVICTION_CHECK_INTERVAL = 100
+
+
+def normalize_key(word):
+    """Lowercase and collapse whitespace so 'Run ', 'run' and 'RUN' share an entry"""
+    return ' '.join(word.lower().split())
+
+
+class LookupCache:
+    """Thread-safe SQLite-backed cache of parsed lookups"""
+
+    def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.counters = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'expired': 0, 'stores': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS lookups (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                found INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_lookups_last_used ON lookups (last_used)")
+
+    def get(self, word):
+        """
+        Look up a word
+        Returns (True, value) on a hit - value is None for a cached "not found" -
+        or (False, None) on a miss or expired entry.
+        """
+        key = normalize_key(word)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, found, fetched_at FROM lookups WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.counters['misses'] += 1
+                return False, None
+
+            value, found, fetched_at = row
+            ttl = self.ttl if found else self.negative_ttl
+            if now - fetched_at > ttl:
+                self._conn.execute("DELETE FROM lookups WHERE key = ?", (key,))
+                self.counters['expired'] += 1
+                self.counters['misses'] += 1
+                return False, None
+
+            self._conn.execute("UPDATE lookups SET last_used = ? WHERE key = ?", (now, key))
+            if found:
+                self.counters['hits'] += 1
+                return True, json.loads(value)
+            self.counters['negative_hits'] += 1
+            return True, None
+
+    def set(self, word, value):
+        """Store a lookup result; None records the word as not found"""
+        key = normalize_key(word)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO lookups (key, value, found, fetched_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False) if value is not None else None,
+                 1 if value is not None else 0, now, now)
+            )
+            self.counters['stores'] += 1
+            self._writes += 1
+            if self._writes % EVICTION_CHECK_INTERVAL == 0:
+                self._evict()
+
+    def _evict(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM lookups").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM lookups WHERE key IN (SELECT key FROM lookups ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            self.counters['evictions'] += excess
+
+    def invalidate(self, word):
+        with self._lock:
+            self._conn.execute("DELETE FROM lookups WHERE key = ?", (normalize_key(word),))
+
+    def stats(self):
+        """Counters plus current size and hit rate"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM lookups").fetchone()[0]
+            counters = dict(self.counters)
+        lookups = counters['hits'] + counters['negative_hits'] + counters['misses']
+        counters['entries'] = entries
+        counters['hit_rate'] = round((counters['hits'] + counters['negative_hits']) / lookups, 3) if lookups else 0.0
+        return counters
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,569 @@
+"""
+Versioned schema migrations
+Each migration runs once, in order, inside its own transaction, and is
+recorded in the schema_migrations table. They are applied on app startup
+(set AUTO_MIGRATE=0 to disable) or from the command line:
+
+    python migrations.py                # show current version and pending steps
+    python migrations.py upgrade        # apply pending migrations
+    python migrations.py check-plans    # EXPLAIN QUERY PLAN for the app's queries
+"""
+
+from datetime import datetime
+import os
+import sqlite3
+import sys
+import tempfile
+
+from fill_blank import fill_blanks
+from models import db, current_engine, use_shard
+
+MIGRATIONS = []
+
+
+def migration(version, name, backfill=None):
+    """
+    Register a migration step
+    A step's schema changes and SQL backfills are written out in full, so a
+    migration does the same thing whenever it runs. backfill is for data
+    only the app's code can compute (e.g. fill-in-the-blank sentences): it
+    runs in the same transaction with the current rules, so backfilled rows
+    match rows written since, and must not change the schema.
+    """
+    def register(func):
+        MIGRATIONS.append((version, name, func, backfill))
+        MIGRATIONS.sort(key=lambda step: step[0])
+        return func
+    return register
+
+
+def _add_missing_columns(conn, table, columns):
+    existing = {row[1] for row in conn.execute(db.text(f"PRAGMA table_info({table})"))}
+    for name, ddl in columns:
+        if name not in existing:
+            conn.execute(db.text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+            print(f"  ✓ Added column: {table}.{name}")
+
+
+def _execute_all(conn, statements):
+    for statement in statements:
+        conn.execute(db.text(statement))
+
+
+# ==================== MIGRATIONS ====================
+
+@migration(1, 'add pronunciation columns')
+def add_pronunciation_columns(conn):
+    _add_missing_columns(conn, 'vocabulary', [
+        ('ipa_us', 'VARCHAR(100)'),
+        ('ipa_uk', 'VARCHAR(100)'),
+        ('audio_us', 'VARCHAR(500)'),
+        ('audio_uk', 'VARCHAR(500)'),
+    ])
+
+
+@migration(2, 'add spaced repetition scheduling')
+def add_spaced_repetition(conn):
+    _add_missing_columns(conn, 'vocabulary', [
+        ('ease_factor', 'FLOAT DEFAULT 2.5'),
+        ('interval_days', 'INTEGER DEFAULT 0'),
+        ('repetitions', 'INTEGER DEFAULT 0'),
+        ('due_at', 'DATETIME'),
+    ])
+    conn.execute(db.text("CREATE INDEX IF NOT EXISTS ix_vocabulary_due_at ON vocabulary (due_at)"))
+    conn.execute(db.text(
+        "CREATE INDEX IF NOT EXISTS ix_vocabulary_status_due_at ON vocabulary (status, due_at)"
+    ))
+
+
+@migration(3, 'add full-text search index')
+def add_search_index(conn):
+    # Skipped with a warning when this SQLite build has no FTS5; search then uses LIKE
+    try:
+        conn.execute(db.text("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS vocabulary_fts USING fts5(
+                word, definition, translation, example,
+                tokenize = "unicode61 remove_diacritics 2"
+            )
+        """))
+    except Exception as e:
+        print(f"[Search] FTS5 unavailable, falling back to LIKE search: {str(e)}")
+        return
+
+    # unicode61 does not fold Vietnamese 'đ' to 'd', so the triggers do
+    folded = lambda row: ', '.join(f"replace(replace({row}.{column}, 'đ', 'd'), 'Đ', 'D')"
+                                   for column in ('word', 'definition', 'translation', 'example'))
+    _execute_all(conn, [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS vocabulary_fts_ai AFTER INSERT ON vocabulary BEGIN
+            INSERT INTO vocabulary_fts(rowid, word, definition, translation, example)
+            VALUES (new.id, {folded('new')});
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS vocabulary_fts_ad AFTER DELETE ON vocabulary BEGIN
+            DELETE FROM vocabulary_fts WHERE rowid = old.id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS vocabulary_fts_au
+        AFTER UPDATE OF word, definition, translation, example ON vocabulary BEGIN
+            DELETE FROM vocabulary_fts WHERE rowid = old.id;
+            INSERT INTO vocabulary_fts(rowid, word, definition, translation, example)
+            VALUES (new.id, {folded('new')});
+        END
+        """,
+        "DELETE FROM vocabulary_fts",
+        f"""
+        INSERT INTO vocabulary_fts(rowid, word, definition, translation, example)
+        SELECT v.id, {folded('v')} FROM vocabulary v
+        """,
+    ])
+
+
+@migration(4, 'add statistics rollups')
+def add_stats_rollups(conn):
+    def bump_month(column, counter, delta):
+        return f"""
+            INSERT INTO stats_monthly (month, {counter})
+            SELECT strftime('%Y-%m', {column}), {delta} WHERE {column} IS NOT NULL
+            ON CONFLICT(month) DO UPDATE SET {counter} = {counter} + excluded.{counter};"""
+
+    def vocabulary_changes(row, delta):
+        return (
+            bump_month(f'{row}.created_at', 'words_added', delta)
+            + bump_month(f'{row}.learned_at', 'words_learned', delta)
+            + f"""
+            INSERT INTO stats_status (status, words) VALUES (IFNULL({row}.status, ''), {delta})
+            ON CONFLICT(status) DO UPDATE SET words = words + excluded.words;"""
+        )
+
+    _execute_all(conn, [
+        """
+        CREATE TABLE IF NOT EXISTS stats_monthly (
+            month VARCHAR(7) PRIMARY KEY,
+            words_added INTEGER NOT NULL DEFAULT 0,
+            words_learned INTEGER NOT NULL DEFAULT 0,
+            practices INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS stats_status (
+            status VARCHAR(20) PRIMARY KEY,
+            words INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS stats_vocabulary_ai AFTER INSERT ON vocabulary BEGIN
+            {vocabulary_changes('new', 1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS stats_vocabulary_ad AFTER DELETE ON vocabulary BEGIN
+            {vocabulary_changes('old', -1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS stats_vocabulary_au
+        AFTER UPDATE OF status, created_at, learned_at ON vocabulary BEGIN
+            {vocabulary_changes('old', -1)}
+            {vocabulary_changes('new', 1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS stats_history_ai AFTER INSERT ON learning_history BEGIN
+            {bump_month('new.practiced_at', 'practices', 1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS stats_history_ad AFTER DELETE ON learning_history BEGIN
+            {bump_month('old.practiced_at', 'practices', -1)}
+        END
+        """,
+        # Fill the rollups from the existing rows
+        """
+        INSERT INTO stats_monthly (month, words_added, words_learned, practices)
+        SELECT month, SUM(added), SUM(learned), SUM(practiced) FROM (
+            SELECT strftime('%Y-%m', created_at) AS month, 1 AS added, 0 AS learned, 0 AS practiced
+            FROM vocabulary WHERE created_at IS NOT NULL
+            UNION ALL
+            SELECT strftime('%Y-%m', learned_at), 0, 1, 0
+            FROM vocabulary WHERE learned_at IS NOT NULL
+            UNION ALL
+            SELECT strftime('%Y-%m', practiced_at), 0, 0, 1
+            FROM learning_history WHERE practiced_at IS NOT NULL
+        ) GROUP BY month
+        """,
+        """
+        INSERT INTO stats_status (status, words)
+        SELECT IFNULL(status, ''), COUNT(*) FROM vocabulary GROUP BY IFNULL(status, '')
+        """,
+    ])
+
+
+@migration(5, 'add query indexes')
+def add_query_indexes(conn):
+    statements = [
+        # Vocabulary list: status filter, newest first
+        "CREATE INDEX IF NOT EXISTS ix_vocabulary_status_created_at ON vocabulary (status, created_at)",
+        # Vocabulary list without a filter, latest-change check
+        "CREATE INDEX IF NOT EXISTS ix_vocabulary_created_at ON vocabulary (created_at)",
+        # Words learned per period
+        "CREATE INDEX IF NOT EXISTS ix_vocabulary_learned_at ON vocabulary (learned_at)",
+        # Per-word history and cascade deletes
+        "CREATE INDEX IF NOT EXISTS ix_learning_history_vocabulary_id_practiced_at "
+        "ON learning_history (vocabulary_id, practiced_at)",
+        # Practice activity per period
+        "CREATE INDEX IF NOT EXISTS ix_learning_history_practiced_at ON learning_history (practiced_at)",
+    ]
+    for statement in statements:
+        conn.execute(db.text(statement))
+    conn.execute(db.text("ANALYZE"))
+
+
+@migration(6, 'add change log')
+def add_change_log(conn):
+    _execute_all(conn, [
+        """
+        CREATE TABLE IF NOT EXISTS change_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            entity_id INTEGER,
+            action VARCHAR(20) NOT NULL,
+            changed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS change_log_vocabulary_ai AFTER INSERT ON vocabulary BEGIN
+            INSERT INTO change_log (entity_id, action) VALUES (new.id, 'add');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS change_log_vocabulary_au
+        AFTER UPDATE OF word, definition, example, translation, status, ipa_us, ipa_uk, audio_us, audio_uk
+        ON vocabulary BEGIN
+            INSERT INTO change_log (entity_id, action) VALUES (new.id, 'update');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS change_log_vocabulary_ad AFTER DELETE ON vocabulary BEGIN
+            INSERT INTO change_log (entity_id, action) VALUES (old.id, 'delete');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS change_log_history_ai AFTER INSERT ON learning_history BEGIN
+            INSERT INTO change_log (entity_id, action) VALUES (new.vocabulary_id, 'practice');
+        END
+        """,
+        # Keep the newest 10,000 changes for reconnecting clients
+        """
+        CREATE TRIGGER IF NOT EXISTS change_log_prune AFTER INSERT ON change_log BEGIN
+            DELETE FROM change_log WHERE id <= new.id - 10000;
+        END
+        """,
+    ])
+
+
+@migration(7, 'add background pronunciation status')
+def add_pronunciation_status(conn):
+    _add_missing_columns(conn, 'vocabulary', [
+        ('pronunciation_status', "VARCHAR(20) DEFAULT 'ready'"),
+    ])
+    # Report pronunciation_status changes in the change log too
+    _execute_all(conn, [
+        "DROP TRIGGER IF EXISTS change_log_vocabulary_au",
+        """
+        CREATE TRIGGER change_log_vocabulary_au
+        AFTER UPDATE OF word, definition, example, translation, status,
+            ipa_us, ipa_uk, audio_us, audio_uk, pronunciation_status
+        ON vocabulary BEGIN
+            INSERT INTO change_log (entity_id, action) VALUES (new.id, 'update');
+        END
+        """,
+    ])
+
+
+@migration(8, 'track vocabulary updates for incremental export')
+def add_updated_at(conn):
+    _add_missing_columns(conn, 'vocabulary', [
+        ('updated_at', 'DATETIME'),
+    ])
+    # Microsecond text, the same format SQLAlchemy writes for DateTime columns
+    now = "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+    _execute_all(conn, [
+        f"UPDATE vocabulary SET updated_at = COALESCE(created_at, {now}) WHERE updated_at IS NULL",
+        "CREATE INDEX IF NOT EXISTS ix_vocabulary_updated_at ON vocabulary (updated_at)",
+        "CREATE INDEX IF NOT EXISTS ix_change_log_action_changed_at ON change_log (action, changed_at)",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS vocabulary_touch_updated_at
+        AFTER UPDATE OF word, definition, example, translation, ipa_us, ipa_uk, audio_us, audio_uk,
+            pronunciation_status, status, learned_at, times_practiced,
+            ease_factor, interval_days, repetitions, due_at
+        ON vocabulary BEGIN
+            UPDATE vocabulary SET updated_at = {now} WHERE id = new.id;
+        END
+        """,
+    ])
+
+
+@migration(9, 'precompute fill-in-the-blank sentences', backfill=fill_blanks)
+def add_blank_sentences(conn):
+    _add_missing_columns(conn, 'vocabulary', [
+        ('blank_sentence', 'TEXT'),
+        ('blank_answer', 'VARCHAR(100)'),
+    ])
+    # Fallback rate and the words that fall back
+    conn.execute(db.text(
+        "CREATE INDEX IF NOT EXISTS ix_vocabulary_fill_blank ON vocabulary (blank_sentence IS NULL) WHERE example != ''"
+    ))
+
+
+@migration(10, 'record when practice is written for incremental export')
+def add_recorded_at(conn):
+    _add_missing_columns(conn, 'learning_history', [
+        ('recorded_at', 'DATETIME'),
+    ])
+    now = "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+    _execute_all(conn, [
+        # Earlier exports followed practiced_at, so existing rows keep that position
+        f"UPDATE learning_history SET recorded_at = COALESCE(practiced_at, {now}) WHERE recorded_at IS NULL",
+        "CREATE INDEX IF NOT EXISTS ix_learning_history_recorded_at ON learning_history (recorded_at)",
+        # Rows inserted without it (other scripts, raw SQL)
+        f"""
+        CREATE TRIGGER IF NOT EXISTS learning_history_recorded_at
+        AFTER INSERT ON learning_history WHEN new.recorded_at IS NULL BEGIN
+            UPDATE learning_history SET recorded_at = {now} WHERE id = new.id;
+        END
+        """,
+    ])
+
+
+# ==================== RUNNER ====================
+
+def _ensure_version_table(conn):
+    conn.execute(db.text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(200) NOT NULL,
+            applied_at DATETIME NOT NULL
+        )
+    """))
+
+
+def applied_versions():
+    """Return the set of migration versions already applied"""
+    with current_engine().begin() as conn:
+        _ensure_version_table(conn)
+        return {row[0] for row in conn.execute(db.text("SELECT version FROM schema_migrations"))}
+
+
+def current_version():
+    applied = applied_versions()
+    return max(applied) if applied else 0
+
+
+def pending_migrations():
+    applied = applied_versions()
+    return [step for step in MIGRATIONS if step[0] not in applied]
+
+
+def run_migrations():
+    """Apply every pending migration in version order"""
+    pending = pending_migrations()
+    for version, name, func, backfill in pending:
+        print(f"[Migrations] Applying {version}: {name}")
+        with current_engine().begin() as conn:
+            func(conn)
+            if backfill is not None:
+                backfill(conn)
+            conn.execute(
+                db.text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                {'version': version, 'name': name, 'applied_at': datetime.utcnow()}
+            )
+    return len(pending)
+
+
+# ==================== QUERY PLAN CHECKS ====================
+
+# Requests (or background job steps) whose SQL is checked; each is called with
+# a test client and the id of a word added for the checks
+PLAN_CHECKS = [
+    ('vocabulary list (status filter)', lambda client, word_id: client.get('/api/vocabulary?status=learning')),
+    ('vocabulary list page (status filter)',
+     lambda client, word_id: client.get('/api/vocabulary?status=learning&page=1')),
+    ('vocabulary list (all)', lambda client, word_id: client.get('/api/vocabulary')),
+    ('vocabulary list cursor page (status filter)',
+     lambda client, word_id: client.get(f'/api/vocabulary?status=learning&cursor={_cursor("next")}')),
+    ('vocabulary list cursor page (all)',
+     lambda client, word_id: client.get(f'/api/vocabulary?cursor={_cursor("next")}')),
+    ('vocabulary list previous cursor page (all)',
+     lambda client, word_id: client.get(f'/api/vocabulary?cursor={_cursor("prev")}')),
+    ('vocabulary count (status filter)', lambda client, word_id: client.get('/api/vocabulary/count?status=learning')),
+    ('latest vocabulary change', lambda client, word_id: client.get('/api/vocabulary/latest')),
+    ('game due queue (status filter)',
+     lambda client, word_id: client.get('/api/games/flashcard/random?status=learning')),
+    ('game due queue (excluding buffered answers)',
+     lambda client, word_id: client.get('/api/games/flashcard/random?status=learning&exclude=1,2,3')),
+    ('game due queue (all)', lambda client, word_id: client.get('/api/games/flashcard/random?status=all')),
+    ('game session', lambda client, word_id: client.get('/api/games/flashcard/session?status=learning')),
+    ('game sampler pool',
+     lambda client, word_id: client.get('/api/games/flashcard/random?status=learning&mode=random')),
+    ('fill-in-the-blank question', lambda client, word_id: client.get('/api/games/fill-blank/question')),
+    ('practice group commit', lambda client, word_id: client.post('/api/games/practice/batch?wait=1', json={
+        'events': [{'vocabulary_id': word_id, 'activity_type': 'flashcard', 'correct': True}]
+    })),
+    ('change feed', lambda client, word_id: _current_feed()._fetch_since(0)),
+    ('next pronunciation job', lambda client, word_id: _pronunciation_workers()._claim()),
+    ('export vocabulary (since)', lambda client, word_id: client.get('/api/export/vocabulary?since=2025-01-01')),
+    ('export history (since)', lambda client, word_id: client.get('/api/export/history?since=2025-01-01')),
+    ('fill-in-the-blank fallback rate', lambda client, word_id: client.get('/api/stats/fill-blank')),
+    ('stats summary', lambda client, word_id: client.get('/api/stats/summary')),
+    ('stats monthly', lambda client, word_id: client.get('/api/stats/monthly')),
+    ('delete word', lambda client, word_id: client.delete(f'/api/vocabulary/{word_id}')),
+]
+
+# Statements that aren't queries
+_SKIPPED = ('PRAGMA', 'BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE')
+
+
+def _cursor(direction):
+    from pagination import encode_cursor
+    return encode_cursor(direction, ('2025-01-01T00:00:00', 1))
+
+
+def _current_feed():
+    from changes import current_feed
+    return current_feed()
+
+
+def _pronunciation_workers():
+    from app import pronunciation_workers
+    return pronunciation_workers
+
+
+# Rollup tables hold one row per month or status, so scanning them is O(months)
+ROLLUP_TABLES = ('stats_monthly', 'stats_status')
+
+
+def _plan_uses_index(details):
+    for detail in details:
+        if detail.startswith('SCAN') and 'USING' not in detail:
+            if detail.split()[1] not in ROLLUP_TABLES:
+                return False
+        if 'USE TEMP B-TREE' in detail:
+            return False
+    return True
+
+
+def _explain(engine, name, statements):
+    """EXPLAIN QUERY PLAN for each distinct recorded statement, with its first parameters"""
+    queries = {}
+    for sql, params in statements:
+        queries.setdefault(sql, params)
+    results = []
+    with engine.connect() as conn:
+        for sql, params in queries.items():
+            details = [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params)]
+            results.append((name, ' '.join(sql.split()), _plan_uses_index(details), details))
+    return results
+
+
+def check_query_plans():
+    """
+    Run EXPLAIN QUERY PLAN for the SQL the app's endpoints send
+    Each check makes real requests (or runs a background job step) against
+    a scratch copy of the database, recording every statement that reaches
+    it, so the plans are those of the queries the code actually builds.
+    The checks add one word first and delete it last. Returns a list of
+    (name, sql, ok, plan details); a plan fails if it scans a table (other
+    than a rollup) without an index or sorts with a temporary B-tree.
+    """
+    from flask import current_app
+    from sqlalchemy import create_engine, event
+
+    from response_cache import response_cache
+    from shards import Shard
+    from sqlite_profile import init_engine_profile
+
+    results = []
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        path = os.path.join(scratch_dir, 'plans.db')
+        source = current_engine().raw_connection()
+        try:
+            with sqlite3.connect(path) as target:
+                source.driver_connection.backup(target)
+        finally:
+            source.close()
+
+        engine = create_engine('sqlite:///' + path)
+        init_engine_profile(engine)
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.split(None, 1)[0].upper() not in _SKIPPED:
+                statements.append((statement, parameters[0] if executemany else parameters))
+
+        event.listen(engine, 'before_cursor_execute', record)
+        cache_enabled, response_cache.enabled = response_cache.enabled, False
+        try:
+            # A request's teardown clears the shard, so it's selected for each check
+            shard = Shard(0, engine, current_app)
+            client = current_app.test_client()
+            with use_shard(shard):
+                response = client.post('/api/vocabulary', json={
+                    'word': 'plan-check', 'definition': 'A word added by check-plans',
+                    'example': 'This plan-check sentence is only used here.'
+                })
+            results.extend(_explain(engine, 'add word', statements))
+            word_id = response.get_json()['id']
+            for name, run in PLAN_CHECKS:
+                del statements[:]
+                with use_shard(shard):
+                    response = run(client, word_id)
+                    if hasattr(response, 'get_data'):
+                        response.get_data()  # Streamed bodies run their queries here
+                results.extend(_explain(engine, name, statements))
+        finally:
+            response_cache.enabled = cache_enabled
+            event.remove(engine, 'before_cursor_execute', record)
+            engine.dispose()
+    return results
+
+
+if __name__ == '__main__':
+    # Migrate explicitly below instead of on import
+    os.environ.setdefault('AUTO_MIGRATE', '0')
+    os.environ.setdefault('PRONUNCIATION_WORKERS', '0')
+    if sys.argv[1:2] == ['check-plans']:
+        # The checks call the endpoints without logging in
+        os.environ['MULTI_USER'] = '0'
+    from app import app
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+
+    with app.app_context():
+        if command == 'upgrade':
+            count = run_migrations()
+            print(f"✓ Applied {count} migration(s), schema version {current_version()}")
+        elif command == 'status':
+            print(f"Schema version: {current_version()}")
+            pending = pending_migrations()
+            if pending:
+                print("Pending migrations:")
+                for version, name, _func, _backfill in pending:
+                    print(f"  {version}: {name}")
+            else:
+                print("Up to date")
+        elif command == 'check-plans':
+            if pending_migrations():
+                print("✗ Schema is not up to date - run `python migrations.py upgrade` first")
+                sys.exit(1)
+            failed = 0
+            for name, sql, ok, details in check_query_plans():
+                print(f"{'✓' if ok else '✗'} {name}: {sql}")
+                for detail in details:
+                    print(f"    {detail}")
+                failed += 0 if ok else 1
+            sys.exit(1 if failed else 0)
+        else:
+            print(__doc__)
+            sys.exit(2)
@@ -1,7 +1,42 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
 
-db = SQLAlchemy()
+# The learner shard (see shards.py) used by the current request or job;
+# None means the main database
+current_shard = ContextVar('current_shard', default=None)
+
+
+@contextmanager
+def use_shard(shard):
+    """Route db.session queries to a shard for the duration of the block"""
+    token = current_shard.set(shard)
+    try:
+        yield shard
+    finally:
+        current_shard.reset(token)
+
+
+def current_engine():
+    """Engine of the current shard, or the main database"""
+    shard = current_shard.get()
+    return shard.engine if shard is not None else db.engine
+
+
+class ShardSession(Session):
+    """Session that sends queries for the default bind to the current shard"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        shard = current_shard.get()
+        if shard is not None and bind is None and engine is self._db.engines.get(None):
+            return shard.engine
+        return engine
+
+
+db = SQLAlchemy(session_options={'class_': ShardSession})
 
 class Vocabulary(db.Model):
     """Store vocabulary words with their definitions and examples"""
@@ -16,11 +51,28 @@ class Vocabulary(db.Model):
     ipa_uk = db.Column(db.String(100))  # UK pronunciation (IPA)
     audio_us = db.Column(db.String(500))  # US audio URL
     audio_uk = db.Column(db.String(500))  # UK audio URL
+    pronunciation_status = db.Column(db.String(20), default='ready')  # pending, ready, failed
     status = db.Column(db.String(20), default='learning')  # learning, learned
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    learned_at = db.Column(db.DateTime)  # When marked as learned
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # Maintained by a trigger on update
+    learned_at = db.Column(db.DateTime, index=True)  # When marked as learned
     times_practiced = db.Column(db.Integer, default=0)
     
+    # Spaced repetition (SM-2) scheduling state
+    ease_factor = db.Column(db.Float, default=2.5)
+    interval_days = db.Column(db.Integer, default=0)
+    repetitions = db.Column(db.Integer, default=0)
+    due_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # When the word is next due for review
+    
+    # Fill-in-the-blank question, computed from word and example when either is written
+    blank_sentence = db.Column(db.Text)  # Example with the word blanked out, NULL if it doesn't appear
+    blank_answer = db.Column(db.String(100))  # The form that was blanked (e.g. "accomplished")
+    
+    __table_args__ = (
+        db.Index('ix_vocabulary_status_created_at', 'status', 'created_at'),  # Filtered list, newest first
+        db.Index('ix_vocabulary_status_due_at', 'status', 'due_at'),  # Game due queue
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -32,10 +84,13 @@ class Vocabulary(db.Model):
             'ipa_uk': self.ipa_uk,
             'audio_us': self.audio_us,
             'audio_uk': self.audio_uk,
+            'pronunciation_status': self.pronunciation_status,
             'status': self.status,
             'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'learned_at': self.learned_at.isoformat() if self.learned_at else None,
-            'times_practiced': self.times_practiced
+            'times_practiced': self.times_practiced,
+            'due_at': self.due_at.isoformat() if self.due_at else None
         }
 
 class LearningHistory(db.Model):
@@ -44,9 +99,14 @@ class LearningHistory(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     vocabulary_id = db.Column(db.Integer, db.ForeignKey('vocabulary.id', ondelete='CASCADE'), nullable=False)
-    activity_type = db.Column(db.String(50))  # flashcard, fill_blank, review
+    activity_type = db.Column(db.String(50))  # flashcard, fill_blank, multiple_choice, review
     correct = db.Column(db.Boolean)
-    practiced_at = db.Column(db.DateTime, default=datetime.utcnow)
+    practiced_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    recorded_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # When the row was written
+    
+    __table_args__ = (
+        db.Index('ix_learning_history_vocabulary_id_practiced_at', 'vocabulary_id', 'practiced_at'),
+    )
     
     vocabulary = db.relationship('Vocabulary', backref=db.backref('history', cascade='all, delete-orphan'))
     
@@ -58,3 +118,34 @@ class LearningHistory(db.Model):
             'correct': self.correct,
             'practiced_at': self.practiced_at.isoformat() if self.practiced_at else None
         }
+
+
+class PronunciationJob(db.Model):
+    """Persistent queue of words waiting for pronunciation enrichment"""
+    __tablename__ = 'pronunciation_jobs'
+    
+    vocabulary_id = db.Column(db.Integer, db.ForeignKey('vocabulary.id', ondelete='CASCADE'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    locked_at = db.Column(db.DateTime)  # Set while a worker holds the job
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class User(db.Model):
+    """Learner account (multi-user mode) - the learner's words live in their own shard"""
+    __bind_key__ = 'accounts'
+    __tablename__ = 'users'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), nullable=False, unique=True)
+    password_hash = db.Column(db.String(256), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    pronunciation_due_at = db.Column(db.DateTime, index=True)  # When the shard next has pronunciation jobs due
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'username': self.username,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
@@ -1,67 +1,240 @@
 """
 Offline pronunciation fetcher using eng_to_ipa and pyttsx3
 Works 100% offline without internet connection
+Audio is rendered by the synthesis worker process in tts.py
+
+IPA is resolved in batches, token by token: an in-process LRU cache, then an
+optional precomputed table of the whole dictionary (memory-mapped), then a
+persistent memo table, and finally a single pass over eng_to_ipa's bundled
+CMU dictionary for whatever is left. Build the precomputed table with:
+
+    python offline_pronunciation.py build-ipa-table
 """
-import eng_to_ipa as ipa
-import pyttsx3
+from collections import OrderedDict, defaultdict
+import json
+import mmap
 import os
+import sqlite3
+import sys
+import threading
+
+from eng_to_ipa.transcribe import mode_type, preserve_punc, cmu_to_ipa, get_top
+from tts import synthesis_worker
+
+INSTANCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
+IPA_MEMO_PATH = os.path.join(INSTANCE_DIR, 'ipa_memo.db')
+IPA_TABLE_PATH = os.path.join(INSTANCE_DIR, 'ipa_table.tsv')
+IPA_CACHE_SIZE = 50000  # Tokens kept in memory
+
+def _token_ipa(token, phonemes):
+    """IPA for one token from its CMU phonemes - the same result as ipa.convert(token)"""
+    cmu = [phonemes] if phonemes else [['__IGNORE__' + token]]
+    return get_top(cmu_to_ipa(cmu, stress_marking='both'))
+
+class IpaResolver:
+    """Thread-safe token -> IPA lookup with caching at each level"""
+    
+    def __init__(self, memo_path=IPA_MEMO_PATH, table_path=IPA_TABLE_PATH, cache_size=IPA_CACHE_SIZE):
+        self.memo_path = memo_path
+        self.table_path = table_path
+        self.cache_size = cache_size
+        self.counters = {'cache': 0, 'table': 0, 'memo': 0, 'dictionary': 0}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._memo = None
+        self._table = None
+        self._table_checked = False
+    
+    def _open_memo(self):
+        if self._memo is None:
+            os.makedirs(os.path.dirname(self.memo_path), exist_ok=True)
+            self._memo = sqlite3.connect(self.memo_path, check_same_thread=False, isolation_level=None)
+            self._memo.execute("PRAGMA journal_mode=WAL")
+            self._memo.execute("CREATE TABLE IF NOT EXISTS ipa_memo (token TEXT PRIMARY KEY, ipa TEXT NOT NULL)")
+        return self._memo
+    
+    def _open_table(self):
+        if not self._table_checked:
+            self._table_checked = True
+            if os.path.exists(self.table_path) and os.path.getsize(self.table_path) > 0:
+                with open(self.table_path, 'rb') as f:
+                    self._table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._table
+    
+    def _table_lookup(self, table, token):
+        """Binary search over the sorted token<TAB>ipa lines"""
+        key = token.encode('utf-8')
+        lo, hi = 0, len(table)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = table.rfind(b'\n', lo, mid) + 1 or lo
+            end = table.find(b'\n', start)
+            if end == -1:
+                end = len(table)
+            line_token, _, line_ipa = table[start:end].partition(b'\t')
+            if line_token == key:
+                return line_ipa.decode('utf-8')
+            if line_token < key:
+                lo = end + 1
+            else:
+                hi = start
+        return None
+    
+    def _dictionary_pass(self, tokens):
+        """Look up every token with one query over the CMU dictionary"""
+        phonemes = defaultdict(list)
+        cursor = mode_type('sql')
+        try:
+            rows = cursor.execute(
+                "SELECT word, phonemes FROM dictionary WHERE word IN (SELECT value FROM json_each(?))",
+                (json.dumps(sorted(tokens)),)
+            )
+            for word, word_phonemes in rows:
+                phonemes[word].append(word_phonemes)
+        finally:
+            cursor.connection.close()
+        return {token: _token_ipa(token, phonemes.get(token)) for token in tokens}
+    
+    def resolve(self, tokens):
+        """Returns dict of token -> IPA for a collection of tokens"""
+        found = {}
+        with self._lock:
+            missing = []
+            for token in set(tokens):
+                if token in self._cache:
+                    self._cache.move_to_end(token)
+                    found[token] = self._cache[token]
+                    self.counters['cache'] += 1
+                else:
+                    missing.append(token)
+            
+            table = self._open_table() if missing else None
+            if table is not None:
+                still_missing = []
+                for token in missing:
+                    value = self._table_lookup(table, token)
+                    if value is None:
+                        still_missing.append(token)
+                    else:
+                        found[token] = value
+                        self.counters['table'] += 1
+                new = {token: found[token] for token in missing if token in found}
+                missing = still_missing
+            else:
+                new = {}
+            
+            if missing:
+                memo = self._open_memo()
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    rows = memo.execute(
+                        f"SELECT token, ipa FROM ipa_memo WHERE token IN ({', '.join('?' * len(chunk))})", chunk
+                    )
+                    for token, value in rows:
+                        found[token] = new[token] = value
+                        self.counters['memo'] += 1
+                missing = [token for token in missing if token not in found]
+        
+        # The dictionary pass reads its own database, so run it outside the lock
+        if missing:
+            converted = self._dictionary_pass(missing)
+            found.update(converted)
+        
+        with self._lock:
+            if missing:
+                self.counters['dictionary'] += len(missing)
+                memo = self._open_memo()
+                memo.execute("BEGIN")
+                memo.executemany("INSERT OR IGNORE INTO ipa_memo (token, ipa) VALUES (?, ?)", converted.items())
+                memo.execute("COMMIT")
+                new.update(converted)
+            for token, value in new.items():
+                self._cache[token] = value
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return found
+    
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        counters['cached'] = len(self._cache)
+        counters['table_loaded'] = self._table is not None
+        return counters
+
+ipa_resolver = IpaResolver()
+
+def build_ipa_table(path=IPA_TABLE_PATH):
+    """
+    Precompute IPA for every word in the CMU dictionary
+    Writes sorted token<TAB>ipa lines; returns the number of entries
+    """
+    phonemes = defaultdict(list)
+    cursor = mode_type('sql')
+    try:
+        for word, word_phonemes in cursor.execute("SELECT word, phonemes FROM dictionary"):
+            phonemes[word].append(word_phonemes)
+    finally:
+        cursor.connection.close()
+    
+    lines = sorted(
+        (word.encode('utf-8'), _token_ipa(word, word_phonemes).encode('utf-8'))
+        for word, word_phonemes in phonemes.items()
+        if '\t' not in word and '\n' not in word
+    )
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = path + '.tmp'
+    with open(partial, 'wb') as f:
+        for word, word_ipa in lines:
+            f.write(word + b'\t' + word_ipa + b'\n')
+    os.replace(partial, path)
+    return len(lines)
+
+def get_ipa_pronunciations(words):
+    """
+    Get IPA pronunciation for many words or phrases at once
+    Returns dict of word -> US IPA (None if it could not be converted)
+    """
+    try:
+        split = {
+            word: [preserve_punc(part.lower())[0] for part in word.split()]
+            for word in set(words) if word
+        }
+        token_ipa = ipa_resolver.resolve({token for parts in split.values() for _before, token, _after in parts})
+        
+        result = {word: None for word in words}
+        for word, parts in split.items():
+            # Same output as ipa.convert(word), surrounding punctuation included
+            ipa_text = ' '.join(before + token_ipa[token] + after for before, token, after in parts)
+            result[word] = ipa_text if ipa_text else None
+        return result
+    except Exception as e:
+        print(f"[IPA] Error converting {len(words)} word(s): {str(e)}")
+        return {word: None for word in words}
 
 def get_ipa_pronunciation(word):
     """
     Get IPA pronunciation using offline library
     Returns US IPA format
     """
-    try:
-        # Convert to IPA (American English)
-        ipa_text = ipa.convert(word)
-        return ipa_text if ipa_text else None
-    except Exception as e:
-        print(f"[IPA] Error converting '{word}': {str(e)}")
-        return None
+    return get_ipa_pronunciations([word]).get(word)
 
 def generate_audio_url(word):
     """
     Generate audio using pyttsx3 (100% offline, no internet needed)
-    Saves to static folder and returns URL path
+    Rendered by the shared synthesis worker; returns the URL path
+    """
+    return generate_audio_urls([word]).get(word)
+
+def generate_audio_urls(words):
+    """
+    Generate audio for many words in one batch
+    Returns dict of word -> URL path (None where synthesis failed)
     """
     try:
-        # Create static/audio directory if not exists
-        audio_dir = os.path.join(os.path.dirname(__file__), 'static', 'audio')
-        os.makedirs(audio_dir, exist_ok=True)
-        
-        # Create filename from word (sanitize)
-        safe_word = "".join(c for c in word if c.isalnum() or c in (' ', '-', '_')).strip()
-        audio_filename = f"{safe_word}_{hash(word) % 10000}.wav"
-        audio_path = os.path.join(audio_dir, audio_filename)
-        
-        # Check if audio already exists
-        if os.path.exists(audio_path):
-            return f"/static/audio/{audio_filename}"
-        
-        # Initialize pyttsx3 engine (offline TTS)
-        engine = pyttsx3.init()
-        
-        # Set properties for US English voice
-        engine.setProperty('rate', 150)  # Speed of speech
-        engine.setProperty('volume', 1.0)  # Volume (0.0 to 1.0)
-        
-        # Try to set US English voice if available
-        voices = engine.getProperty('voices')
-        for voice in voices:
-            if 'english' in voice.name.lower() and 'us' in voice.name.lower():
-                engine.setProperty('voice', voice.id)
-                break
-        
-        # Save audio to file in static/audio directory
-        engine.save_to_file(word, audio_path)
-        engine.runAndWait()
-        
-        # Return URL path (WAV format - widely supported)
-        return f"/static/audio/{audio_filename}"
-    
+        return synthesis_worker.synthesize(words)
     except Exception as e:
-        print(f"[Audio] Error generating audio for '{word}': {str(e)}")
-        return None
+        print(f"[Audio] Error generating audio for {len(words)} word(s): {str(e)}")
+        return {word: None for word in words}
 
 def fetch_offline_pronunciation(word):
     """
@@ -95,3 +268,11 @@ def fetch_offline_pronunciation(word):
         print(f"[Offline Pronunciation] Audio generation failed: {str(e)}")
     
     return result
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'build-ipa-table':
+        count = build_ipa_table()
+        print(f"✓ Wrote {count} entries to {IPA_TABLE_PATH}")
+    else:
+        print(__doc__)
+        sys.exit(2)
@@ -0,0 +1,102 @@
+"""
+Cursor pagination for the vocabulary list
+Newest-first lists are paged by keyset on (created_at, id): each page
+starts right after the last row of the previous one, found through the
+created_at index (whose entries end with the rowid), so page 5,000 costs
+the same as page 1 and no COUNT runs per page. Search results are ordered
+by relevance instead, which has no stable key to seek to, so their cursors
+carry an offset. Cursors are opaque to clients.
+"""
+
+import base64
+from datetime import datetime
+import json
+
+from sqlalchemy import tuple_
+
+from models import Vocabulary
+
+MAX_PER_PAGE = 100
+
+
+class CursorError(ValueError):
+    """A cursor that wasn't issued by this server"""
+
+
+def encode_cursor(direction, key):
+    raw = json.dumps([direction] + list(key), separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Returns (direction, key) - direction is 'next' or 'prev'"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, *key = json.loads(raw)
+    except (ValueError, TypeError):
+        raise CursorError('Invalid cursor')
+    if direction not in ('next', 'prev') or len(key) not in (1, 2):
+        raise CursorError('Invalid cursor')
+    return direction, key
+
+
+def _row_key(word):
+    return (word.created_at.isoformat(), word.id)
+
+
+def keyset_page(query, cursor, per_page):
+    """
+    One page of a Vocabulary query, newest first
+    Returns (words, next_cursor, prev_cursor); a cursor is None at that end.
+    """
+    order = tuple_(Vocabulary.created_at, Vocabulary.id)
+    direction = 'next'
+    if cursor:
+        direction, key = decode_cursor(cursor)
+        if len(key) != 2:
+            raise CursorError('Invalid cursor')
+        try:
+            position = tuple_(datetime.fromisoformat(key[0]), int(key[1]))
+        except (TypeError, ValueError):
+            raise CursorError('Invalid cursor')
+        query = query.filter(order < position if direction == 'next' else order > position)
+
+    if direction == 'next':
+        query = query.order_by(Vocabulary.created_at.desc(), Vocabulary.id.desc())
+    else:
+        query = query.order_by(Vocabulary.created_at, Vocabulary.id)
+
+    # One extra row tells whether there's another page
+    words = query.limit(per_page + 1).all()
+    more = len(words) > per_page
+    words = words[:per_page]
+    if direction == 'prev':
+        words.reverse()
+    if not words:
+        return words, None, None
+
+    has_next = more if direction == 'next' else True
+    has_prev = bool(cursor) if direction == 'next' else more
+    return (
+        words,
+        encode_cursor('next', _row_key(words[-1])) if has_next else None,
+        encode_cursor('prev', _row_key(words[0])) if has_prev else None,
+    )
+
+
+def offset_page(query, cursor, per_page):
+    """Like keyset_page for queries with their own order (search results)"""
+    offset = 0
+    if cursor:
+        direction, key = decode_cursor(cursor)
+        if len(key) != 1 or not isinstance(key[0], int) or key[0] < 0:
+            raise CursorError('Invalid cursor')
+        offset = key[0]
+
+    words = query.offset(offset).limit(per_page + 1).all()
+    more = len(words) > per_page
+    return (
+        words[:per_page],
+        encode_cursor('next', [offset + per_page]) if more else None,
+        encode_cursor('prev', [max(0, offset - per_page)]) if offset > 0 else None,
+    )
@@ -77,14 +77,18 @@ def populate_database():
         print("Adding vocabulary words to database...")
         print("=" * 60)
         
+        # Find words already in the database with one set-based lookup
+        existing = {
+            row[0] for row in db.session.query(Vocabulary.word).filter(
+                Vocabulary.word.in_([word_data['word'].lower() for words in vocabulary_data.values() for word_data in words])
+            )
+        }
+        
         for level, words in vocabulary_data.items():
             print(f"\nAdding {level} level words...")
             
             for word_data in words:
-                # Check if word already exists
-                existing = Vocabulary.query.filter_by(word=word_data['word'].lower()).first()
-                
-                if existing:
+                if word_data['word'].lower() in existing:
                     print(f"  ⊘ Skipped: '{word_data['word']}' (already exists)")
                     skipped_count += 1
                     continue
@@ -100,6 +104,7 @@ def populate_database():
                 )
                 
                 db.session.add(new_word)
+                existing.add(new_word.word)
                 print(f"  ✓ Added: '{word_data['word']}'")
                 added_count += 1
         
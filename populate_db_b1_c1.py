@@ -5,10 +5,17 @@ Run this script to add 200+ intermediate to advanced English words
 
 from app import app, db
 from models import Vocabulary
-from cambridge_api import fetch_pronunciation_data
+from cambridge_api import fetch_batch
+from offline_pronunciation import generate_audio_urls
 from datetime import datetime, timedelta
+import os
 import random
-import time
+
+# Batch fetch settings - stay polite to the server
+CONCURRENCY = 4  # Requests in flight at once
+RATE_PER_SECOND = 2.0  # New requests started per second
+COMMIT_EVERY = 50  # Words per database commit
+PROGRESS_FILE = os.path.join(app.instance_path, 'populate_b1_c1.progress.jsonl')
 
 # Comprehensive vocabulary words organized by CEFR levels (B1-C1)
 vocabulary_data = {
@@ -206,62 +213,82 @@ def populate_database():
         
         added_count = 0
         skipped_count = 0
+        added_words = []
         
         print("\nAdding B1-C1 vocabulary words with Vietnamese translations...")
         print("=" * 70)
         
-        for level, words in vocabulary_data.items():
-            print(f"\n{level} Level: Adding {len(words)} words...")
+        # Skip words already in the database with one set-based lookup
+        all_words = [word_data for words in vocabulary_data.values() for word_data in words]
+        existing = {
+            row[0] for row in db.session.query(Vocabulary.word).filter(
+                Vocabulary.word.in_([word_data['word'].lower() for word_data in all_words])
+            )
+        }
+        new_words = {}
+        for word_data in all_words:
+            if word_data['word'].lower() in existing:
+                print(f"  ⊘ Skipped: '{word_data['word']}' (already exists)")
+                skipped_count += 1
+            else:
+                new_words[word_data['word']] = word_data
+        
+        # Fetch pronunciation data from Cambridge Dictionary concurrently
+        print(f"\nFetching pronunciation for {len(new_words)} words...")
+        results = fetch_batch(
+            list(new_words),
+            concurrency=CONCURRENCY,
+            rate=RATE_PER_SECOND,
+            progress_path=PROGRESS_FILE
+        )
+        
+        for word_text, pronunciation_data in results:
+            word_data = new_words[word_text]
+            pronunciation_data = pronunciation_data or {}
+            
+            ipa_info = []
+            if pronunciation_data.get('ipa_uk'):
+                ipa_info.append(f"UK: /{pronunciation_data.get('ipa_uk')}/")
+            if pronunciation_data.get('ipa_us'):
+                ipa_info.append(f"US: /{pronunciation_data.get('ipa_us')}/")
             
-            for word_data in words:
-                # Check if word already exists
-                existing = Vocabulary.query.filter_by(word=word_data['word'].lower()).first()
-                
-                if existing:
-                    print(f"  ⊘ Skipped: '{word_data['word']}' (already exists)")
-                    skipped_count += 1
-                    continue
-                
-                # Fetch pronunciation data from Cambridge Dictionary
-                print(f"  Fetching pronunciation for '{word_data['word']}'...")
-                pronunciation_data = {'ipa_us': None, 'ipa_uk': None, 'audio_us': None, 'audio_uk': None}
-                
-                try:
-                    pronunciation_data = fetch_pronunciation_data(word_data['word'])
-                    if pronunciation_data and any(pronunciation_data.values()):
-                        ipa_info = []
-                        if pronunciation_data.get('ipa_uk'):
-                            ipa_info.append(f"UK: /{pronunciation_data.get('ipa_uk')}/")
-                        if pronunciation_data.get('ipa_us'):
-                            ipa_info.append(f"US: /{pronunciation_data.get('ipa_us')}/")
-                        if ipa_info:
-                            print(f"    {', '.join(ipa_info)}")
-                except Exception as e:
-                    print(f"    ⚠ Could not fetch pronunciation: {str(e)[:50]}")
-                
-                # Create new vocabulary entry with random created date (past 60 days)
-                new_word = Vocabulary(
-                    word=word_data['word'].lower(),
-                    definition=word_data['definition'],
-                    example=word_data['example'],
-                    translation=word_data.get('translation', ''),
-                    ipa_us=pronunciation_data.get('ipa_us'),
-                    ipa_uk=pronunciation_data.get('ipa_uk'),
-                    audio_us=pronunciation_data.get('audio_us'),
-                    audio_uk=pronunciation_data.get('audio_uk'),
-                    status='learning',
-                    created_at=datetime.now() - timedelta(days=random.randint(0, 60))
-                )
-                
-                db.session.add(new_word)
-                print(f"  ✓ Added: '{word_data['word']}'")
-                added_count += 1
-                
-                # Add delay between requests to be polite to the server
-                time.sleep(1)
+            # Create new vocabulary entry with random created date (past 60 days)
+            new_word = Vocabulary(
+                word=word_data['word'].lower(),
+                definition=word_data['definition'],
+                example=word_data['example'],
+                translation=word_data.get('translation', ''),
+                ipa_us=pronunciation_data.get('ipa_us'),
+                ipa_uk=pronunciation_data.get('ipa_uk'),
+                audio_us=pronunciation_data.get('audio_us'),
+                audio_uk=pronunciation_data.get('audio_uk'),
+                status='learning',
+                created_at=datetime.now() - timedelta(days=random.randint(0, 60))
+            )
+            
+            db.session.add(new_word)
+            added_words.append(new_word)
+            print(f"  ✓ Added: '{word_data['word']}' {', '.join(ipa_info)}")
+            added_count += 1
+            
+            # Commit in chunks rather than per word
+            if added_count % COMMIT_EVERY == 0:
+                db.session.commit()
+        
+        # Words Cambridge had no audio for get offline TTS, rendered as one batch
+        without_audio = [word for word in added_words if not word.audio_us]
+        if without_audio:
+            print(f"\nSynthesizing offline audio for {len(without_audio)} words...")
+            audio = generate_audio_urls([word.word for word in without_audio])
+            for word in without_audio:
+                if audio.get(word.word):
+                    word.audio_us = audio[word.word]
+                    word.audio_uk = word.audio_uk or audio[word.word]
         
-        # Commit all changes
+        # Commit remaining changes
         db.session.commit()
+        if os.path.exists(PROGRESS_FILE):
+            os.remove(PROGRESS_FILE)
         
         print("\n" + "=" * 70)
         print(f"✓ Successfully added {added_count} words")
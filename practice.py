@@ -0,0 +1,265 @@
+"""
+Practice result recording with a write-behind queue
+Game answers are queued in memory and written by a single writer thread.
+Whatever is waiting when the writer wakes goes into one transaction: an
+atomic times_practiced = times_practiced + n per word, the SM-2
+rescheduling, one multi-row insert into learning_history and a single
+commit. Callers that need the outcome (the single-answer endpoints) wait for
+the commit that includes their events; batch submissions return right away.
+"""
+
+import atexit
+from collections import Counter
+from datetime import datetime, timedelta
+import threading
+import time
+
+from sqlalchemy import bindparam, func, insert, update
+
+from models import db, current_shard, use_shard, Vocabulary, LearningHistory
+from scheduler import quality_from_answer, schedule_review
+
+ACTIVITY_TYPES = ('flashcard', 'fill_blank', 'multiple_choice')
+MAX_BATCH_EVENTS = 1000  # Events accepted per batch request
+MAX_EVENT_AGE = 86400  # seconds; older answers are recorded as this old
+WRITE_ATTEMPTS = 3  # a failed group commit is retried before events are dropped
+WAIT_TIMEOUT = 30  # seconds a waiting caller gives the writer
+
+
+class PracticeEventError(ValueError):
+    """A submitted practice event can't be recorded"""
+
+
+def parse_event(data, activity_type=None, now=None):
+    """
+    Validate one practice event from a request
+    Events carry vocabulary_id and either correct (flashcard) or answer
+    (fill_blank and multiple_choice, checked against the word when written). age is how many
+    seconds ago the answer was given, so buffered answers keep their time
+    without trusting the client's clock.
+    """
+    if not isinstance(data, dict):
+        raise PracticeEventError('Expected a JSON object')
+
+    try:
+        vocabulary_id = int(data.get('vocabulary_id'))
+    except (TypeError, ValueError):
+        raise PracticeEventError('vocabulary_id must be an integer')
+
+    activity_type = activity_type or data.get('activity_type', 'flashcard')
+    if activity_type not in ACTIVITY_TYPES:
+        raise PracticeEventError(f"Unknown activity_type '{activity_type}' (use {', '.join(ACTIVITY_TYPES)})")
+
+    answer = data.get('answer')
+    if answer is not None and not isinstance(answer, str):
+        raise PracticeEventError('answer must be a string')
+
+    correct = data.get('correct', activity_type == 'flashcard')
+    if not isinstance(correct, bool):
+        raise PracticeEventError('correct must be true or false')
+
+    quality = data.get('quality')
+    if quality is not None:
+        try:
+            quality = int(quality)
+        except (TypeError, ValueError):
+            raise PracticeEventError('quality must be an integer 0-5')
+
+    try:
+        age = float(data.get('age') or 0)
+    except (TypeError, ValueError):
+        raise PracticeEventError('age must be a number of seconds')
+
+    now = now or datetime.utcnow()
+    return {
+        'vocabulary_id': vocabulary_id,
+        'activity_type': activity_type,
+        'answer': answer,
+        'correct': correct,
+        'quality': quality,
+        'practiced_at': now - timedelta(seconds=max(0, min(age, MAX_EVENT_AGE))),
+    }
+
+
+def write_events(events):
+    """
+    Record practice events in one transaction; returns one result per event
+    The increment is issued first, so SQLite's write lock is held before the
+    scheduling state is read and no other writer can interleave with it.
+    """
+    counts = Counter(event['vocabulary_id'] for event in events)
+    vocabulary = Vocabulary.__table__
+    db.session.connection().execute(
+        update(vocabulary).where(vocabulary.c.id == bindparam('target_id')).values(
+            times_practiced=func.coalesce(vocabulary.c.times_practiced, 0) + bindparam('practices')
+        ),
+        [{'target_id': vocabulary_id, 'practices': n} for vocabulary_id, n in counts.items()]
+    )
+
+    words = {
+        word.id: word for word in Vocabulary.query.filter(Vocabulary.id.in_(list(counts)))
+        .execution_options(populate_existing=True)
+    }
+    # Count up from the value before this transaction, one answer at a time
+    practiced = {vocabulary_id: word.times_practiced - counts[vocabulary_id] for vocabulary_id, word in words.items()}
+
+    results = []
+    history = []
+    for event in events:
+        word = words.get(event['vocabulary_id'])
+        if word is None:
+            results.append({'vocabulary_id': event['vocabulary_id'], 'error': 'Word not found'})
+            continue
+
+        correct = event['correct']
+        if event['answer'] is not None:
+            answer = event['answer'].strip().lower()
+            correct = answer == word.word.lower()
+            if event['activity_type'] == 'fill_blank':
+                # The form the sentence was blanked at counts too
+                correct = correct or answer == (word.blank_answer or '').lower()
+        schedule_review(word, quality_from_answer(correct, event['quality']), now=event['practiced_at'])
+        practiced[word.id] += 1
+
+        history.append({
+            'vocabulary_id': word.id,
+            'activity_type': event['activity_type'],
+            'correct': correct,
+            'practiced_at': event['practiced_at']
+        })
+        results.append({
+            'vocabulary_id': word.id,
+            'correct': correct,
+            'correct_answer': word.word,
+            'times_practiced': practiced[word.id],
+            'interval_days': word.interval_days,
+            'due_at': word.due_at.isoformat()
+        })
+
+    if history:
+        db.session.execute(insert(LearningHistory), history)
+    db.session.commit()
+    return results
+
+
+class PracticeWriter:
+    """
+    Single writer thread that group-commits queued practice events
+    Until start() is called (scripts, or after stop()) events are written
+    directly in the caller's app context.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._queue = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def start(self, app):
+        self.app = app
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name='practice-writer', daemon=True)
+        self._thread.start()
+        print("[Practice] Started write-behind writer")
+
+    def submit(self, events, wait=False):
+        """
+        Queue practice events (from parse_event)
+        With wait=True, blocks until they are committed and returns one
+        result per event; otherwise returns None once they are queued.
+        """
+        if not events:
+            return [] if wait else None
+
+        if self._thread is None or not self._thread.is_alive():
+            results = write_events(events)
+            return results if wait else None
+
+        batch = {'events': events, 'shard': current_shard.get(), 'done': threading.Event(), 'results': None}
+        if batch['shard'] is not None:
+            # The request's hold ends before a batch it doesn't wait for is written
+            batch['shard'].hold()
+        with self._condition:
+            self._queue.append(batch)
+            self._condition.notify()
+        if not wait:
+            return None
+
+        if not batch['done'].wait(WAIT_TIMEOUT):
+            return [{'vocabulary_id': event['vocabulary_id'], 'error': 'Timed out recording practice'}
+                    for event in events]
+        return batch['results']
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._stopping:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                # Everything that queued up during the last commit goes in this one
+                batches, self._queue = self._queue, []
+            self._write(batches)
+
+    def _write(self, batches):
+        # One transaction per learner database (multi-user mode)
+        by_shard = {}
+        for batch in batches:
+            by_shard.setdefault(batch['shard'], []).append(batch)
+
+        for shard, shard_batches in by_shard.items():
+            try:
+                with self.app.app_context(), use_shard(shard):
+                    if len(shard_batches) > 1 and self._write_together(shard_batches, attempts=1):
+                        continue
+                    # One submission at a time, so a bad event only fails its own request
+                    for batch in shard_batches:
+                        self._write_together([batch], attempts=WRITE_ATTEMPTS)
+            finally:
+                if shard is not None:
+                    for _ in shard_batches:
+                        shard.release()
+
+    def _write_together(self, batches, attempts):
+        """Commit batches in one transaction; returns False if it failed"""
+        events = [event for batch in batches for event in batch['events']]
+        results = None
+        for attempt in range(1, attempts + 1):
+            try:
+                results = write_events(events)
+                break
+            except Exception as e:
+                db.session.rollback()
+                print(f"[Practice] Attempt {attempt} to record {len(events)} event(s) failed: {str(e)}")
+                if attempt < attempts:
+                    time.sleep(0.1 * attempt)
+
+        if results is None:
+            if len(batches) > 1:
+                return False
+            print(f"[Practice] Dropped {len(events)} practice event(s)")
+            results = [{'vocabulary_id': event['vocabulary_id'], 'error': 'Could not record practice'}
+                       for event in events]
+
+        start = 0
+        for batch in batches:
+            batch['results'] = results[start:start + len(batch['events'])]
+            start += len(batch['events'])
+            batch['done'].set()
+        return True
+
+    def stop(self):
+        """Write whatever is still queued and stop the writer"""
+        thread = self._thread
+        if thread is None:
+            return
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        thread.join(WAIT_TIMEOUT)
+        self._thread = None
+
+
+practice_writer = PracticeWriter()
+atexit.register(practice_writer.stop)
@@ -0,0 +1,156 @@
+"""
+In-process cache of read endpoint responses
+Responses are keyed by endpoint, query string and the data version (the
+newest change_log id, which every add, update, delete and practice bumps,
+from this process or any other). A write therefore invalidates every cached
+response at once without touching the cache: later requests simply look up
+a new key, and entries for old versions age out of the LRU. The same
+version is sent as the ETag, so a client that already has the current
+response gets a 304 without the cache or the query running at all.
+Bodies are stored compressed with the encoding the client negotiated,
+which is part of the key, so a hit is sent without compressing it again.
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+import os
+import threading
+
+from flask import Response, make_response, request
+
+from changes import current_data_version
+from compression import compress_response, negotiate_encoding
+from models import current_shard
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_ENTRIES', '1024'))
+DEFAULT_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_BYTES', str(32 * 1024 * 1024)))
+
+
+class ResponseCache:
+    """Thread-safe LRU of response bodies, bounded by entry count and total size"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = os.environ.get('RESPONSE_CACHE', '1') == '1'
+        self.counters = {}  # Per endpoint
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _count(self, endpoint, counter):
+        counters = self.counters.setdefault(endpoint, {'hits': 0, 'misses': 0, 'not_modified': 0})
+        counters[counter] += 1
+
+    def get(self, endpoint, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._count(endpoint, 'misses')
+                return None
+            self._entries.move_to_end(key)
+            self._count(endpoint, 'hits')
+            return entry
+
+    def put(self, key, body, mimetype, encoding=None):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._entries[key] = (body, mimetype, encoding)
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (evicted, _, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def not_modified(self, endpoint):
+        with self._lock:
+            self._count(endpoint, 'not_modified')
+
+    def stats(self):
+        """Hit rates per endpoint and overall, plus the cache's size"""
+        with self._lock:
+            endpoints = {}
+            totals = {'hits': 0, 'misses': 0, 'not_modified': 0}
+            for endpoint, counters in self.counters.items():
+                endpoints[endpoint] = dict(counters, hit_rate=_hit_rate(counters))
+                for name in totals:
+                    totals[name] += counters[name]
+            return dict(
+                totals,
+                hit_rate=_hit_rate(totals),
+                evictions=self.evictions,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                max_entries=self.max_entries,
+                max_bytes=self.max_bytes,
+                enabled=self.enabled,
+                endpoints=endpoints
+            )
+
+
+def _hit_rate(counters):
+    """Requests answered without running the endpoint (cache hit or 304)"""
+    served = counters['hits'] + counters['not_modified']
+    total = served + counters['misses']
+    return round(served / total, 4) if total else None
+
+
+response_cache = ResponseCache()
+
+
+def data_generation():
+    """
+    Tag of the data a response was built from
+    The date is part of it because the statistics count "this month".
+    """
+    shard = current_shard.get()
+    learner = f'u{shard.user_id}-' if shard is not None else ''
+    return f"{learner}v{current_data_version()}-{datetime.utcnow():%Y%m%d}"
+
+
+def cached_response(view):
+    """
+    Serve a GET endpoint from the response cache
+    The view must return a 200 JSON response that depends only on the query
+    string and the data; other responses pass through uncached.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        generation = data_generation()
+        endpoint = request.endpoint
+
+        # Compressed responses carry the tag as a weak ETag
+        if request.if_none_match.contains_weak(generation):
+            response_cache.not_modified(endpoint)
+            response = Response(status=304)
+        else:
+            encoding = negotiate_encoding(request.accept_encodings)
+            key = (endpoint, request.query_string, generation, encoding)
+            entry = response_cache.get(endpoint, key) if response_cache.enabled else None
+            if entry is not None:
+                body, mimetype, content_encoding = entry
+                response = Response(body, mimetype=mimetype)
+                if content_encoding:
+                    response.headers['Content-Encoding'] = content_encoding
+                    response.vary.add('Accept-Encoding')
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                # Compressed here rather than after the request, so the cache keeps the compressed bytes
+                compress_response(response)
+                if response_cache.enabled:
+                    response_cache.put(key, response.get_data(), response.mimetype,
+                                       response.headers.get('Content-Encoding'))
+
+        response.set_etag(generation, weak='Content-Encoding' in response.headers)
+        # Browsers revalidate every time; the 304 makes that cheap
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return wrapper
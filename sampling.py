@@ -0,0 +1,220 @@
+"""
+Card sampling engine for the game endpoints
+Keeps a compact in-memory pool of vocabulary ids per filter so picking a
+random card never loads the whole table - only the chosen row is fetched.
+Pools follow this process's writes through ORM events, and other
+processes' writes (import scripts, other workers) through the change log:
+before each draw, words added, changed or deleted since the pools' data
+version are applied to them.
+"""
+
+from array import array
+import random
+import threading
+
+from sqlalchemy import event
+
+from changes import current_data_version
+from models import db, current_shard, Vocabulary
+
+# Random draws per wanted card before sample() filters a copy of the pool instead
+DRAWS_PER_CARD = 8
+
+
+def _has_example(example):
+    return example is not None and example != ''
+
+
+class CardSampler:
+    """
+    Per-filter pools of vocabulary ids
+
+    A pool is keyed by (status, require_example) where status is 'learning',
+    'learned' or 'all'. Pools are loaded lazily with a single id-only query and
+    kept current by ORM events on add, update and delete, and by the change
+    log for writes from other processes.
+    """
+
+    def __init__(self):
+        self._pools = {}
+        self._version = None  # Data version the pools include every change up to
+        self._lock = threading.Lock()
+
+    def _load_pool(self, status, require_example):
+        query = db.session.query(Vocabulary.id)
+        if status != 'all':
+            query = query.filter(Vocabulary.status == status)
+        if require_example:
+            query = query.filter(Vocabulary.example.isnot(None), Vocabulary.example != '')
+        return array('q', (row[0] for row in query))
+
+    def _sync(self):
+        """Apply words added, changed or deleted by other processes since the pools' version"""
+        with self._lock:
+            since = self._version
+        if since is None:
+            return
+        version = current_data_version()
+        if version <= since:
+            return
+
+        oldest = db.session.execute(db.text("SELECT MIN(id) FROM change_log")).scalar()
+        if oldest is None or oldest > since + 1:
+            # Pruned past our version: reload from scratch
+            self.reset()
+            return
+        changes = db.session.execute(
+            db.text(
+                "SELECT entity_id, action FROM change_log "
+                "WHERE id > :since AND id <= :version AND action != 'practice'"
+            ),
+            {'since': since, 'version': version}
+        ).all()
+        changed = {entity_id for entity_id, action in changes if action != 'delete'}
+        for entity_id, action in changes:
+            if action == 'delete':
+                self.discard(entity_id)
+        if changed:
+            rows = db.session.query(Vocabulary.id, Vocabulary.status, Vocabulary.example).filter(
+                Vocabulary.id.in_(list(changed))
+            ).all()
+            for vocabulary_id, status, example in rows:
+                self.add(vocabulary_id, status, example)
+                changed.discard(vocabulary_id)
+            for vocabulary_id in changed:
+                self.discard(vocabulary_id)
+        with self._lock:
+            if self._version == since:
+                self._version = version
+
+    def _get_pool(self, status, require_example):
+        key = (status, require_example)
+        self._sync()
+        with self._lock:
+            pool = self._pools.get(key)
+        if pool is None:
+            # The version is read first, so changes during the load are applied again, not missed
+            version = current_data_version()
+            pool = self._load_pool(status, require_example)
+            with self._lock:
+                if self._version is None:
+                    self._version = version
+                pool = self._pools.setdefault(key, pool)
+        return pool
+
+    def _matches(self, key, status, example):
+        pool_status, require_example = key
+        if pool_status != 'all' and pool_status != status:
+            return False
+        if require_example and not _has_example(example):
+            return False
+        return True
+
+    def add(self, vocabulary_id, status, example):
+        """Record a new or changed word in every loaded pool it belongs to"""
+        with self._lock:
+            for key, pool in self._pools.items():
+                member = vocabulary_id in pool
+                wanted = self._matches(key, status, example)
+                if wanted and not member:
+                    pool.append(vocabulary_id)
+                elif member and not wanted:
+                    pool.remove(vocabulary_id)
+
+    def discard(self, vocabulary_id):
+        """Remove a word from every loaded pool"""
+        with self._lock:
+            for pool in self._pools.values():
+                if vocabulary_id in pool:
+                    pool.remove(vocabulary_id)
+
+    def reset(self):
+        """Drop all pools so they are reloaded on next use"""
+        with self._lock:
+            self._pools.clear()
+            self._version = None
+
+    def choice(self, status='learning', require_example=False):
+        """
+        Return one random Vocabulary row matching the filter, or None
+        Ids whose row has disappeared (e.g. deleted by another process)
+        are discarded and another id is drawn.
+        """
+        pool = self._get_pool(status, require_example)
+        while True:
+            with self._lock:
+                if not pool:
+                    return None
+                vocabulary_id = pool[random.randrange(len(pool))]
+            word = db.session.get(Vocabulary, vocabulary_id)
+            if word is not None and self._matches((status, require_example), word.status, word.example):
+                return word
+            self.discard(vocabulary_id)
+            if word is not None:
+                self.add(word.id, word.status, word.example)
+
+    def _draw(self, pool, count, skip):
+        """
+        Up to count distinct ids from the pool that aren't in skip
+        Ids are drawn at random and rejected if skipped, a bounded number of
+        times; only when skip and the draw are a large share of the pool (or
+        the draws run out) is the pool copied without the skipped ids.
+        """
+        ids = []
+        with self._lock:
+            if (len(skip) + count) * 2 <= len(pool):
+                for _ in range(count * DRAWS_PER_CARD):
+                    vocabulary_id = pool[random.randrange(len(pool))]
+                    if vocabulary_id not in skip:
+                        skip.add(vocabulary_id)
+                        ids.append(vocabulary_id)
+                        if len(ids) == count:
+                            return ids
+            candidates = [vocabulary_id for vocabulary_id in pool if vocabulary_id not in skip]
+        drawn = random.sample(candidates, min(count - len(ids), len(candidates)))
+        skip.update(drawn)
+        return ids + drawn
+
+    def sample(self, status='learning', require_example=False, size=1, exclude_ids=()):
+        """
+        Return up to size distinct random Vocabulary rows matching the filter
+        Ids are drawn from the pool without replacement and the rows are
+        fetched with one query; stale ids are discarded and redrawn.
+        """
+        pool = self._get_pool(status, require_example)
+        skip = set(exclude_ids)
+        words = []
+        while len(words) < size:
+            ids = self._draw(pool, size - len(words), skip)
+            if not ids:
+                break
+            found = {word.id: word for word in Vocabulary.query.filter(Vocabulary.id.in_(ids))}
+            for vocabulary_id in ids:
+                word = found.get(vocabulary_id)
+                if word is not None and self._matches((status, require_example), word.status, word.example):
+                    words.append(word)
+                    continue
+                self.discard(vocabulary_id)
+                if word is not None:
+                    self.add(word.id, word.status, word.example)
+        return words
+
+
+card_sampler = CardSampler()
+
+
+def current_sampler():
+    """The sampler for the current shard, or the main database's"""
+    shard = current_shard.get()
+    return shard.sampler if shard is not None else card_sampler
+
+
+@event.listens_for(Vocabulary, 'after_insert')
+@event.listens_for(Vocabulary, 'after_update')
+def _track_vocabulary_change(mapper, connection, target):
+    current_sampler().add(target.id, target.status, target.example)
+
+
+@event.listens_for(Vocabulary, 'after_delete')
+def _track_vocabulary_delete(mapper, connection, target):
+    current_sampler().discard(target.id)
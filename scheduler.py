@@ -0,0 +1,80 @@
+"""
+Spaced repetition scheduler (SM-2)
+Keeps per-word ease, interval and due date, and serves the next card
+from the indexed "due soonest" queue
+"""
+
+from datetime import datetime, timedelta
+
+from models import Vocabulary
+
+MIN_EASE_FACTOR = 1.3
+DEFAULT_EASE_FACTOR = 2.5
+MAX_INTERVAL_DAYS = 36500  # Keeps due_at within datetime range however often a word is reviewed
+
+# Quality grades used when the game only reports right/wrong
+QUALITY_CORRECT = 4
+QUALITY_INCORRECT = 1
+
+
+def quality_from_answer(correct, quality=None):
+    """Map a game answer to an SM-2 quality grade (0-5)"""
+    if quality is not None:
+        return max(0, min(5, int(quality)))
+    return QUALITY_CORRECT if correct else QUALITY_INCORRECT
+
+
+def schedule_review(word, quality, now=None):
+    """
+    Apply one SM-2 review to a word and set its next due date
+    Does not commit - the caller owns the transaction
+    """
+    now = now or datetime.utcnow()
+    ease = word.ease_factor or DEFAULT_EASE_FACTOR
+    repetitions = word.repetitions or 0
+    interval = word.interval_days or 0
+
+    if quality >= 3:
+        if repetitions == 0:
+            interval = 1
+        elif repetitions == 1:
+            interval = 6
+        else:
+            interval = min(MAX_INTERVAL_DAYS, int(round(interval * ease)))
+        repetitions += 1
+    else:
+        # Lapse - start the word over
+        repetitions = 0
+        interval = 1
+
+    ease = ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+
+    word.ease_factor = max(MIN_EASE_FACTOR, ease)
+    word.repetitions = repetitions
+    word.interval_days = interval
+    word.due_at = now + timedelta(days=interval)
+    return word
+
+
+def next_due_card(status='learning', require_example=False, exclude_ids=None):
+    """
+    Return the word that is due soonest, or None
+    Served by the (status, due_at) index so it is a single index seek.
+    Words never scheduled (due_at NULL) sort first. exclude_ids skips cards
+    the client is showing or has answers for that are not recorded yet.
+    """
+    cards = due_cards(status, require_example, 1, exclude_ids)
+    return cards[0] if cards else None
+
+
+def due_cards(status='learning', require_example=False, limit=1, exclude_ids=None):
+    """The limit words due soonest, in due order - one range read of the same index"""
+    query = Vocabulary.query
+    if status != 'all':
+        query = query.filter(Vocabulary.status == status)
+    if require_example:
+        query = query.filter(Vocabulary.example.isnot(None), Vocabulary.example != '')
+    if exclude_ids:
+        query = query.filter(Vocabulary.id.notin_(exclude_ids))
+
+    return query.order_by(Vocabulary.due_at.asc(), Vocabulary.id.asc()).limit(limit).all()
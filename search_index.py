@@ -0,0 +1,116 @@
+"""
+SQLite FTS5 full-text search index for the vocabulary list
+The vocabulary_fts table mirrors word, definition, translation and example
+and is kept in sync with the vocabulary table by triggers
+"""
+
+import re
+
+from models import db, current_engine, Vocabulary
+
+FTS_TABLE = 'vocabulary_fts'
+
+
+# Vietnamese 'đ' is its own letter rather than 'd' plus a diacritic, so
+# unicode61's remove_diacritics does not fold it - do it explicitly
+def _fold_sql(column):
+    return f"replace(replace({column}, 'đ', 'd'), 'Đ', 'D')"
+
+
+_INDEXED_COLUMNS = ('word', 'definition', 'translation', 'example')
+
+# bm25 weights, in the same order as _INDEXED_COLUMNS
+_RANK_WEIGHTS = (10.0, 2.0, 2.0, 1.0)
+
+
+def _values(prefix):
+    return ', '.join(_fold_sql(f'{prefix}.{column}') for column in _INDEXED_COLUMNS)
+
+
+# The table and triggers as migration 3 creates them, for building test databases
+SCHEMA_STATEMENTS = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {', '.join(_INDEXED_COLUMNS)},
+        tokenize = "unicode61 remove_diacritics 2"
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS vocabulary_fts_ai AFTER INSERT ON vocabulary BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {', '.join(_INDEXED_COLUMNS)})
+        VALUES (new.id, {_values('new')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS vocabulary_fts_ad AFTER DELETE ON vocabulary BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS vocabulary_fts_au
+    AFTER UPDATE OF {', '.join(_INDEXED_COLUMNS)} ON vocabulary BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE}(rowid, {', '.join(_INDEXED_COLUMNS)})
+        VALUES (new.id, {_values('new')});
+    END
+    """,
+]
+
+fts_available = False
+
+
+def init_search_index():
+    """Enable full-text search if the FTS5 index exists in this database"""
+    global fts_available
+
+    with current_engine().connect() as conn:
+        fts_available = conn.execute(
+            db.text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"),
+            {'name': FTS_TABLE}
+        ).first() is not None
+
+
+def build_match_query(search):
+    """
+    Turn free text into an FTS5 MATCH expression
+    Every term must match, and each term matches as a prefix so results
+    update while the user is still typing. Returns None if there are no terms.
+    """
+    search = search.replace('đ', 'd').replace('Đ', 'D')
+    terms = re.findall(r'\w+', search)
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def apply_search(query, search):
+    """
+    Restrict a Vocabulary query to rows matching the search text
+    Returns (query, ranked) - ranked is True when the query is already
+    ordered by relevance.
+    """
+    if not fts_available:
+        search_pattern = f"%{search}%"
+        return query.filter(
+            db.or_(
+                Vocabulary.word.ilike(search_pattern),
+                Vocabulary.definition.ilike(search_pattern),
+                Vocabulary.translation.ilike(search_pattern),
+                Vocabulary.example.ilike(search_pattern)
+            )
+        ), False
+
+    match = build_match_query(search)
+    if match is None:
+        return query, False
+
+    weights = ', '.join(str(weight) for weight in _RANK_WEIGHTS)
+    matches = db.select(
+        db.literal_column('rowid').label('rowid'),
+        db.literal_column(f'bm25({FTS_TABLE}, {weights})').label('rank')
+    ).select_from(db.table(FTS_TABLE)).where(
+        db.text(f'{FTS_TABLE} MATCH :match').bindparams(match=match)
+    ).subquery()
+
+    query = query.join(matches, matches.c.rowid == Vocabulary.id)
+    return query.order_by(matches.c.rank, Vocabulary.id), True
@@ -0,0 +1,96 @@
+"""
+Sparse fieldsets and fast JSON responses for vocabulary
+?fields=word,definition,... picks the fields a client needs; list queries
+then select only those columns, and rows are turned into JSON objects
+straight from the column tuples instead of through model instances and
+to_dict(). Responses are encoded with orjson when it is installed
+(pip install orjson), otherwise with the standard library encoder.
+"""
+
+from datetime import datetime
+import json
+
+from flask import Response
+
+from models import Vocabulary
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Every field of Vocabulary.to_dict(), in the same order
+VOCABULARY_FIELDS = (
+    'id', 'word', 'definition', 'example', 'translation', 'ipa_us', 'ipa_uk', 'audio_us', 'audio_uk',
+    'pronunciation_status', 'status', 'created_at', 'updated_at', 'learned_at', 'times_practiced', 'due_at',
+)
+_DATETIME_FIELDS = {'created_at', 'updated_at', 'learned_at', 'due_at'}
+
+
+class FieldsError(ValueError):
+    """Unknown names in ?fields="""
+
+
+def parse_fields(value):
+    """
+    The fields named in a ?fields= value, in VOCABULARY_FIELDS order
+    id is always included; an empty or missing value means every field.
+    """
+    if not value:
+        return VOCABULARY_FIELDS
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = names.difference(VOCABULARY_FIELDS)
+    if unknown:
+        raise FieldsError(f"Unknown field(s): {', '.join(sorted(unknown))} (use {', '.join(VOCABULARY_FIELDS)})")
+    names.add('id')
+    return tuple(name for name in VOCABULARY_FIELDS if name in names)
+
+
+def select_fields(query, fields, extra=()):
+    """
+    Restrict a Vocabulary query to the columns for these fields
+    extra names columns needed besides the fields (e.g. pagination keys);
+    rows then start with the fields in order.
+    """
+    names = list(fields) + [name for name in extra if name not in fields]
+    return query.with_entities(*(getattr(Vocabulary, name) for name in names))
+
+
+def rows_to_dicts(rows, fields):
+    """JSON-ready dicts from column tuples that start with the given fields"""
+    if orjson is not None:
+        # orjson writes datetimes as isoformat() itself
+        return [dict(zip(fields, row)) for row in rows]
+
+    dates = [index for index, name in enumerate(fields) if name in _DATETIME_FIELDS]
+    result = []
+    for row in rows:
+        item = dict(zip(fields, row))
+        for index in dates:
+            value = row[index]
+            if value is not None:
+                item[fields[index]] = value.isoformat()
+        result.append(item)
+    return result
+
+
+def word_to_dict(word, fields=VOCABULARY_FIELDS):
+    """The requested fields of one loaded Vocabulary"""
+    if fields is VOCABULARY_FIELDS:
+        return word.to_dict()
+    return rows_to_dicts([tuple(getattr(word, name) for name in fields)], fields)[0]
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def json_response(payload, status=200):
+    """Encode a response body with orjson if available"""
+    if orjson is not None:
+        body = orjson.dumps(payload)
+    else:
+        body = json.dumps(payload, separators=(',', ':'), ensure_ascii=False, default=_default)
+    return Response(body, status=status, mimetype='application/json')
@@ -0,0 +1,258 @@
+"""
+Per-user database shards (multi-user mode)
+With MULTI_USER=1 each learner has an account in instance/accounts.db and
+an SQLite file of their own under instance/users/, with the same tables as
+the single-user database. A request or background job selects its
+learner's shard with use_shard() and the session routes every query there,
+so endpoints, triggers and background services work unchanged and one
+learner's writes never wait on another's. Open shards are kept in an LRU
+pool, which bounds open engines (and file handles) however many learners
+there are.
+
+    python shards.py status              # accounts, shard files, open shards
+    python shards.py migrate             # create or upgrade every learner's shard
+    python shards.py seed-catalog        # copy words from the single-user database into the catalog
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import os
+import sys
+import threading
+
+from sqlalchemy import create_engine
+
+from changes import ChangeFeed
+from migrations import run_migrations
+from models import db, use_shard
+from sampling import CardSampler
+from similarity import SimilarityIndex
+from sqlite_profile import init_engine_profile
+
+SHARDS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'users')
+SHARD_ENGINES = int(os.environ.get('SHARD_ENGINES', '64'))  # Shards kept open
+SHARD_CONNECTIONS = 1  # Idle connections kept per open shard
+SHARD_MAX_OVERFLOW = 4  # Extra connections for concurrent requests of one learner
+SHARD_FANOUT = 100  # Subdirectories, so no directory holds more than 1/100th of the files
+
+# A worker draining a shard's pronunciation jobs holds it this long
+PRONUNCIATION_LEASE_SECONDS = 300
+
+
+def shard_path(user_id, root=SHARDS_DIR):
+    return os.path.join(root, f'{user_id % SHARD_FANOUT:02d}', f'{user_id}.db')
+
+
+class Shard:
+    """
+    An open learner database with its per-learner in-memory services
+    users counts the requests, jobs and queued writes holding the shard; the
+    pool doesn't close a shard in use, so they all see the same change feed,
+    sampler and similarity index as whoever opens it next.
+    """
+
+    def __init__(self, user_id, engine, app):
+        self.user_id = user_id
+        self.engine = engine
+        self.sampler = CardSampler()
+        self.similarity = SimilarityIndex()
+        self.feed = ChangeFeed(shard=self)
+        self.feed.init_app(app)
+        self.users = 0
+        self._users_lock = threading.Lock()
+
+    def hold(self):
+        """Keep the shard open until release(); call while it's held already (or from the pool)"""
+        with self._users_lock:
+            self.users += 1
+
+    def release(self):
+        with self._users_lock:
+            self.users -= 1
+
+
+class ShardPool:
+    """
+    LRU pool of open shards
+    A shard is opened (and created or migrated) on first use; beyond
+    capacity the least recently used shard that nobody holds (see
+    acquire) and without open event streams is closed. Also tracks which learners have pronunciation jobs due, in the
+    accounts database, so workers don't have to open every shard to look.
+    """
+
+    def __init__(self, root=SHARDS_DIR, capacity=SHARD_ENGINES):
+        self.root = root
+        self.capacity = capacity
+        self.app = None
+        self.counters = {'opened': 0, 'created': 0, 'closed': 0}
+        self._open = OrderedDict()
+        self._opening = {}  # user_id -> Event set when that learner's open finishes
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+
+    def acquire(self, user_id):
+        """The learner's shard, held until shard.release() so it isn't closed while in use"""
+        return self.get(user_id, hold=True)
+
+    def get(self, user_id, hold=False):
+        """
+        The open shard for a learner, opening it if needed
+        Opening (file creation, DDL, migrations) runs outside the pool's lock,
+        so it doesn't hold up other learners; concurrent requests for the
+        same learner wait for the one opening it.
+        """
+        while True:
+            with self._lock:
+                shard = self._open.get(user_id)
+                if shard is not None:
+                    self._open.move_to_end(user_id)
+                    if hold:
+                        shard.hold()
+                    return shard
+                opening = self._opening.get(user_id)
+                if opening is None:
+                    opening = self._opening[user_id] = threading.Event()
+                    break
+            # If that open fails, the next waiter through tries again
+            opening.wait()
+
+        try:
+            shard, created = self._open_shard(user_id)
+            with self._lock:
+                if hold:
+                    shard.hold()
+                self._open[user_id] = shard
+                self.counters['opened'] += 1
+                self.counters['created'] += 1 if created else 0
+                self._close_idle()
+            return shard
+        finally:
+            with self._lock:
+                del self._opening[user_id]
+            opening.set()
+
+    def _open_shard(self, user_id):
+        """Returns (shard, whether its file was created)"""
+        path = shard_path(user_id, self.root)
+        created = not os.path.exists(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        engine = create_engine(
+            'sqlite:///' + path, pool_size=SHARD_CONNECTIONS, max_overflow=SHARD_MAX_OVERFLOW
+        )
+        init_engine_profile(engine)
+        shard = Shard(user_id, engine, self.app)
+        with use_shard(shard):
+            db.metadata.create_all(engine)
+            run_migrations()
+        return shard, created
+
+    def _close_idle(self):
+        for user_id in list(self._open):
+            if len(self._open) <= self.capacity:
+                return
+            shard = self._open[user_id]
+            if shard.users or shard.feed.listeners:
+                continue
+            del self._open[user_id]
+            # Connections still checked out finish normally and are then closed
+            shard.engine.dispose()
+            self.counters['closed'] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, open=len(self._open), capacity=self.capacity)
+
+    # ==================== PRONUNCIATION SCHEDULE ====================
+
+    def _accounts(self):
+        return db.engines['accounts']
+
+    def mark_pronunciation_due(self, user_id):
+        """Record that a learner has new pronunciation jobs (after commit)"""
+        now = datetime.utcnow()
+        with self._accounts().begin() as conn:
+            conn.execute(
+                db.text(
+                    "UPDATE users SET pronunciation_due_at = :now WHERE id = :id "
+                    "AND (pronunciation_due_at IS NULL OR pronunciation_due_at > :now)"
+                ),
+                {'now': now, 'id': user_id}
+            )
+
+    def claim_pronunciation_due(self):
+        """
+        Pick a learner whose jobs are due; returns (user_id, lease) or None
+        The learner is leased so other workers pick someone else meanwhile.
+        """
+        now = datetime.utcnow()
+        lease = now + timedelta(seconds=PRONUNCIATION_LEASE_SECONDS)
+        with self._accounts().begin() as conn:
+            row = conn.execute(
+                db.text("""
+                    UPDATE users SET pronunciation_due_at = :lease
+                    WHERE id = (
+                        SELECT id FROM users WHERE pronunciation_due_at <= :now
+                        ORDER BY pronunciation_due_at LIMIT 1
+                    )
+                    RETURNING id
+                """),
+                {'now': now, 'lease': lease}
+            ).first()
+        return (row[0], lease) if row else None
+
+    def release_pronunciation_due(self, user_id, lease, next_due):
+        """Store when the learner's next job is due, unless new jobs arrived meanwhile"""
+        with self._accounts().begin() as conn:
+            conn.execute(
+                db.text(
+                    "UPDATE users SET pronunciation_due_at = :next_due "
+                    "WHERE id = :id AND pronunciation_due_at = :lease"
+                ),
+                {'next_due': next_due, 'id': user_id, 'lease': lease}
+            )
+
+
+shard_pool = ShardPool()
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+    if command not in ('status', 'migrate', 'seed-catalog'):
+        print(__doc__)
+        sys.exit(2)
+
+    os.environ.setdefault('AUTO_MIGRATE', '0')
+    os.environ.setdefault('PRONUNCIATION_WORKERS', '0')
+    from app import app
+    from catalog import Catalog
+    from models import User, Vocabulary
+
+    shard_pool.init_app(app)
+    with app.app_context():
+        user_ids = [user_id for (user_id,) in db.session.query(User.id).order_by(User.id)]
+
+        if command == 'status':
+            files = sum(1 for user_id in user_ids if os.path.exists(shard_path(user_id)))
+            print(f"Accounts: {len(user_ids)}")
+            print(f"Shard files: {files} in {SHARDS_DIR}")
+            print(f"Catalog words: {Catalog().count()}")
+        elif command == 'migrate':
+            for user_id in user_ids:
+                shard_pool.get(user_id)
+            stats = shard_pool.stats()
+            print(f"✓ {len(user_ids)} shard(s) up to date ({stats['created']} created)")
+        else:
+            entries = [
+                (word.word, {
+                    'definition': word.definition, 'example': word.example,
+                    'ipa_us': word.ipa_us, 'ipa_uk': word.ipa_uk,
+                    'audio_us': word.audio_us, 'audio_uk': word.audio_uk,
+                })
+                for word in Vocabulary.query.yield_per(1000)
+            ]
+            catalog = Catalog()
+            catalog.store(entries)
+            print(f"✓ Catalog has {catalog.count()} word(s)")
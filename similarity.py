@@ -0,0 +1,250 @@
+"""
+Similarity index for multiple-choice distractors
+Finds the words most easily confused with a given word - by spelling, by
+sound (IPA) and by translation - without comparing it against every word.
+Each field has an n-gram inverted index (n-gram -> ids) kept in memory per
+database. Candidates come from the word's rarest n-grams, so a lookup reads
+a bounded number of ids however large the vocabulary; they are ranked by
+shared n-grams, and spelling neighbours are re-ranked by edit distance.
+The index is loaded with one query on first use and kept current by ORM
+events as words are added, changed and deleted, like the card sampler.
+
+Usage: python similarity.py <word> [k]   (prints the word's neighbours)
+"""
+
+from collections import defaultdict
+import heapq
+from itertools import islice
+import re
+import sys
+import threading
+import time
+import unicodedata
+
+from sqlalchemy import event
+
+from models import db, current_shard, Vocabulary
+
+# Share of the combined score per field
+WEIGHTS = {'spelling': 0.5, 'sound': 0.3, 'translation': 0.2}
+SHORTLIST = 30  # Neighbours taken from each field before combining
+# Ids gathered per field and lookup; the rarest n-grams are read first, so
+# common ones (e.g. "ing", "sự") are only read for small vocabularies
+MAX_CANDIDATES = 1000
+
+_IPA_MARKS = re.compile(r"[ˈˌ.ː\s/]")
+_TOKEN = re.compile(r'\w+')
+
+
+def spelling_grams(word):
+    """Letter trigrams of the padded word, so short words and word edges count"""
+    padded = f'^{word.lower()}$'
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def sound_grams(ipa):
+    """Phone trigrams of an IPA transcription without stress, syllable and length marks"""
+    phones = unicodedata.normalize('NFD', ipa)
+    phones = ''.join(char for char in phones if not unicodedata.combining(char))
+    phones = f'^{_IPA_MARKS.sub("", phones)}$'
+    return frozenset(phones[i:i + 3] for i in range(len(phones) - 2))
+
+
+def translation_grams(translation):
+    """Lower-cased words (Vietnamese syllables) of the translation"""
+    return frozenset(_TOKEN.findall(translation.lower()))
+
+
+def edit_distance(a, b):
+    """Levenshtein distance"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+class NgramIndex:
+    """Inverted index from n-grams to ids for one field"""
+
+    def __init__(self, grams):
+        self.grams = grams
+        self.keys = {}
+        self.postings = defaultdict(set)
+
+    def add(self, vocabulary_id, text):
+        self.discard(vocabulary_id)
+        keys = self.grams(text) if text else None
+        if not keys:
+            return
+        self.keys[vocabulary_id] = keys
+        for gram in keys:
+            self.postings[gram].add(vocabulary_id)
+
+    def discard(self, vocabulary_id):
+        for gram in self.keys.pop(vocabulary_id, ()):
+            posting = self.postings[gram]
+            posting.discard(vocabulary_id)
+            if not posting:
+                del self.postings[gram]
+
+    def neighbours(self, vocabulary_id, limit):
+        """
+        Up to limit (score, id) pairs, most similar first
+        The score is the Dice coefficient of the n-gram sets, computed for
+        the words found under the rarest n-grams (up to MAX_CANDIDATES).
+        """
+        keys = self.keys.get(vocabulary_id)
+        if not keys:
+            return []
+        candidates = set()
+        for gram in sorted(keys, key=lambda gram: len(self.postings[gram])):
+            posting = self.postings[gram]
+            room = MAX_CANDIDATES + 1 - len(candidates)
+            if len(posting) >= room:
+                # Too common to read whole: part of it fills the budget
+                candidates.update(islice(posting, room))
+                break
+            candidates.update(posting)
+        candidates.discard(vocabulary_id)
+        return heapq.nlargest(limit, (
+            (2 * len(keys & self.keys[other]) / (len(keys) + len(self.keys[other])), other) for other in candidates
+        ))
+
+
+class SimilarityIndex:
+    """
+    Per-database spelling, sound and translation indexes
+    All three are loaded together on first use and updated by ORM events.
+    """
+
+    def __init__(self):
+        self._fields = None
+        self._words = {}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        fields = {
+            'spelling': NgramIndex(spelling_grams),
+            'sound': NgramIndex(sound_grams),
+            'translation': NgramIndex(translation_grams),
+        }
+        words = {}
+        rows = db.session.query(Vocabulary.id, Vocabulary.word, Vocabulary.ipa_us, Vocabulary.ipa_uk,
+                                Vocabulary.translation)
+        for vocabulary_id, word, ipa_us, ipa_uk, translation in rows:
+            words[vocabulary_id] = word
+            fields['spelling'].add(vocabulary_id, word)
+            fields['sound'].add(vocabulary_id, ipa_us or ipa_uk)
+            fields['translation'].add(vocabulary_id, translation)
+        return fields, words
+
+    def _ensure_loaded(self):
+        if self._fields is not None:
+            return
+        fields, words = self._load()
+        with self._lock:
+            if self._fields is None:
+                self._fields, self._words = fields, words
+
+    def add(self, vocabulary_id, word, ipa, translation):
+        """Index a new or changed word; ignored until the index is loaded"""
+        with self._lock:
+            if self._fields is None:
+                return
+            self._words[vocabulary_id] = word
+            self._fields['spelling'].add(vocabulary_id, word)
+            self._fields['sound'].add(vocabulary_id, ipa)
+            self._fields['translation'].add(vocabulary_id, translation)
+
+    def discard(self, vocabulary_id):
+        with self._lock:
+            if self._fields is None:
+                return
+            self._words.pop(vocabulary_id, None)
+            for index in self._fields.values():
+                index.discard(vocabulary_id)
+
+    def reset(self):
+        """Drop the index so it is reloaded on next use"""
+        with self._lock:
+            self._fields = None
+            self._words = {}
+
+    def neighbours(self, vocabulary_id, k=3):
+        """
+        The k words most similar to a word, as (score, id) pairs
+        Each field contributes its Dice score times its weight; for spelling
+        the shortlist is re-scored as 1 - edit distance / longer length.
+        """
+        self._ensure_loaded()
+        scores = defaultdict(float)
+        with self._lock:
+            word = self._words.get(vocabulary_id)
+            if word is None:
+                return []
+            for name, index in self._fields.items():
+                for score, other in index.neighbours(vocabulary_id, SHORTLIST):
+                    if name == 'spelling':
+                        other_word = self._words[other]
+                        score = 1 - edit_distance(word, other_word) / max(len(word), len(other_word))
+                    scores[other] += WEIGHTS[name] * score
+        return heapq.nlargest(k, ((round(score, 4), other) for other, score in scores.items()))
+
+    def stats(self):
+        with self._lock:
+            if self._fields is None:
+                return {'loaded': False}
+            return {
+                'loaded': True,
+                'words': len(self._words),
+                'fields': {name: {'words': len(index.keys), 'ngrams': len(index.postings)}
+                           for name, index in self._fields.items()},
+            }
+
+
+similarity_index = SimilarityIndex()
+
+
+def current_similarity():
+    """The similarity index for the current shard, or the main database's"""
+    shard = current_shard.get()
+    return shard.similarity if shard is not None else similarity_index
+
+
+@event.listens_for(Vocabulary, 'after_insert')
+@event.listens_for(Vocabulary, 'after_update')
+def _track_vocabulary_change(mapper, connection, target):
+    current_similarity().add(target.id, target.word, target.ipa_us or target.ipa_uk, target.translation)
+
+
+@event.listens_for(Vocabulary, 'after_delete')
+def _track_vocabulary_delete(mapper, connection, target):
+    current_similarity().discard(target.id)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+    from app import app
+
+    with app.app_context():
+        target = Vocabulary.query.filter_by(word=sys.argv[1].strip().lower()).first()
+        if target is None:
+            print(f"✗ '{sys.argv[1]}' is not in the vocabulary")
+            sys.exit(1)
+        start = time.perf_counter()
+        similarity_index.neighbours(target.id)
+        print(f"Index built in {(time.perf_counter() - start) * 1000:.0f} ms: {similarity_index.stats()}")
+
+        start = time.perf_counter()
+        neighbours = similarity_index.neighbours(target.id, int(sys.argv[2]) if len(sys.argv) > 2 else 10)
+        print(f"Neighbours of '{target.word}' ({(time.perf_counter() - start) * 1000:.2f} ms):")
+        for score, vocabulary_id in neighbours:
+            word = db.session.get(Vocabulary, vocabulary_id)
+            print(f"  {score:.3f}  {word.word:<20} /{word.ipa_us or word.ipa_uk or ''}/  {word.translation or ''}")
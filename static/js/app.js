@@ -2,9 +2,26 @@
 const API_URL = window.location.origin + '/api';
 let currentFlashcard = null;
 let currentFillBlank = null;
-let lastKnownTimestamp = null;
-let lastKnownCount = 0;
+let currentMultipleChoice = null;
+let lastKnownVersion = null;
+let lastKnownEtag = null;
 let pollingInterval = null;
+let eventSource = null;
+let reloadTimeout = null;
+let practiceBuffer = [];
+let practiceInFlight = [];
+let practiceFlushTimeout = null;
+
+// Practice answers are sent in batches: after PRACTICE_FLUSH_MS, once
+// PRACTICE_FLUSH_SIZE answers are waiting, or when the page is hidden
+const PRACTICE_FLUSH_MS = 10000;
+const PRACTICE_FLUSH_SIZE = 20;
+
+// Games draw cards from a session deck of SESSION_SIZE cards; answers are
+// kept until the deck runs out and then sent in one batch
+const SESSION_SIZE = 20;
+const gameSessions = {};
+let preloadedAudio = [];
 
 // ==================== UTILITY FUNCTIONS ====================
 
@@ -50,6 +67,68 @@ function showSection(sectionName) {
     }
 }
 
+// ==================== ACCOUNTS ====================
+
+// In multi-user mode, show the login form until someone is logged in.
+// Returns whether the app can load.
+async function checkAccount() {
+    try {
+        const response = await fetch(`${API_URL}/auth/me`);
+        const data = await response.json();
+        if (!data.multi_user) {
+            return true;
+        }
+        if (data.user) {
+            document.getElementById('account-name').textContent = data.user.username;
+            document.getElementById('account-links').style.display = '';
+            return true;
+        }
+    } catch (error) {
+        console.error('Error checking account:', error);
+        return true;
+    }
+    
+    showSection('account');
+    return false;
+}
+
+async function submitAccount(action) {
+    const username = document.getElementById('account-username').value.trim();
+    const password = document.getElementById('account-password').value;
+    
+    try {
+        const response = await fetch(`${API_URL}/auth/${action}`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ username, password })
+        });
+        const data = await response.json();
+        if (response.ok) {
+            window.location.reload();
+        } else {
+            showNotification(data.error, 'error');
+        }
+    } catch (error) {
+        console.error(`Error during ${action}:`, error);
+        showNotification('Failed to connect to server', 'error');
+    }
+}
+
+document.getElementById('account-form').addEventListener('submit', (e) => {
+    e.preventDefault();
+    submitAccount('login');
+});
+
+function register() {
+    submitAccount('register');
+}
+
+async function logout() {
+    await flushPractice(true);
+    await fetch(`${API_URL}/auth/logout`, { method: 'POST' });
+    window.location.reload();
+}
+
 // ==================== VOCABULARY MANAGEMENT ====================
 
 // Add new word
@@ -88,48 +167,37 @@ document.getElementById('add-word-form').addEventListener('submit', async (e) =>
     }
 });
 
-// Pagination state
-let currentPage = 1;
+// Infinite list state: pages are fetched by cursor as the list scrolls
 const perPage = 20;
+// Only the fields each view shows are requested
+const LIST_FIELDS = 'word,definition,example,translation,ipa_us,ipa_uk,audio_us,audio_uk,pronunciation_status,status,times_practiced';
+const FLASHCARD_FIELDS = 'word,definition,example,translation,ipa_us,ipa_uk,audio_us,audio_uk';
+let nextCursor = null;
+let loadedWords = 0;
+let listRequest = 0;
+let listObserver = null;
 let searchTimeout = null;
 
 // Handle search with debounce
 function handleSearch() {
     clearTimeout(searchTimeout);
     searchTimeout = setTimeout(() => {
-        currentPage = 1; // Reset to first page on new search
         loadVocabulary();
     }, 500); // Wait 500ms after user stops typing
 }
 
-// Load vocabulary list
-async function loadVocabulary(page = 1) {
+function vocabularyFilters() {
     const status = document.getElementById('status-filter').value;
     const search = document.getElementById('search-input').value;
-    currentPage = page;
-    
-    try {
-        let url = `${API_URL}/vocabulary?status=${status}&page=${page}&per_page=${perPage}`;
-        if (search) {
-            url += `&search=${encodeURIComponent(search)}`;
-        }
-        
-        const response = await fetch(url);
-        const data = await response.json();
-        
-        const listContainer = document.getElementById('vocabulary-list');
-        
-        if (data.words.length === 0) {
-            const searchValue = document.getElementById('search-input').value;
-            if (searchValue) {
-                listContainer.innerHTML = `<p class="instruction">No words found matching "${searchValue}"</p>`;
-            } else {
-                listContainer.innerHTML = '<p class="instruction">No words found. Add some vocabulary!</p>';
-            }
-            return;
-        }
-        
-        listContainer.innerHTML = data.words.map(word => `
+    let query = `status=${status}`;
+    if (search) {
+        query += `&search=${encodeURIComponent(search)}`;
+    }
+    return query;
+}
+
+function renderWord(word) {
+    return `
             <div class="vocab-item">
                 <div class="vocab-header">
                     <span class="vocab-word">${word.word || ''}</span>
@@ -153,6 +221,11 @@ async function loadVocabulary(page = 1) {
                         ` : ''}
                     </div>
                 ` : ''}
+                ${word.pronunciation_status === 'pending' ? `
+                    <div class="vocab-pronunciation">
+                        <span class="pronunciation-pending">⏳ Fetching pronunciation...</span>
+                    </div>
+                ` : ''}
                 <div class="vocab-definition"><strong>Definition:</strong> ${word.definition || ''}</div>
                 ${word.example ? `<div class="vocab-example"><strong>Example:</strong> ${word.example}</div>` : ''}
                 ${word.translation ? `<div class="vocab-translation"><strong>Translation:</strong> ${word.translation}</div>` : ''}
@@ -167,26 +240,117 @@ async function loadVocabulary(page = 1) {
                     <button onclick="deleteWord(${word.id}); return false;" class="btn btn-danger">Delete</button>
                 </div>
             </div>
-        `).join('');
+        `;
+}
+
+// Load the vocabulary list from the top. With keepLoaded, reloads at least
+// as many words as are showing, so the list doesn't shrink under the reader.
+async function loadVocabulary(keepLoaded = false) {
+    const request = ++listRequest;
+    const wanted = keepLoaded ? Math.max(loadedWords, perPage) : perPage;
+    const filters = vocabularyFilters();
+    
+    try {
+        let html = '';
+        let count = 0;
+        let cursor = null;
+        do {
+            const data = await fetchVocabularyPage(filters, cursor);
+            html += data.words.map(renderWord).join('');
+            count += data.words.length;
+            cursor = data.next_cursor;
+        } while (cursor && count < wanted && request === listRequest);
         
-        // Add pagination controls
-        if (data.pages > 1) {
-            listContainer.innerHTML += `
-                <div class="pagination">
-                    <button onclick="loadVocabulary(${page - 1})" class="btn btn-secondary" ${!data.has_prev ? 'disabled' : ''}>
-                        ← Previous
-                    </button>
-                    <span class="pagination-info">
-                        Page ${data.current_page} of ${data.pages} (${data.total} words)
-                    </span>
-                    <button onclick="loadVocabulary(${page + 1})" class="btn btn-secondary" ${!data.has_next ? 'disabled' : ''}>
-                        Next →
-                    </button>
-                </div>
-            `;
+        if (request !== listRequest) {
+            return; // A newer reload started meanwhile
+        }
+        
+        nextCursor = cursor;
+        loadedWords = count;
+        const listContainer = document.getElementById('vocabulary-list');
+        
+        if (count === 0) {
+            const searchValue = document.getElementById('search-input').value;
+            if (searchValue) {
+                listContainer.innerHTML = `<p class="instruction">No words found matching "${searchValue}"</p>`;
+            } else {
+                listContainer.innerHTML = '<p class="instruction">No words found. Add some vocabulary!</p>';
+            }
+            return;
+        }
+        
+        listContainer.innerHTML = `
+            <div class="pagination-info" id="vocabulary-total"></div>
+            <div id="vocabulary-items">${html}</div>
+            <div class="pagination" id="vocabulary-more" ${nextCursor ? '' : 'style="display: none;"'}>
+                <span class="pagination-info">Loading more words...</span>
+            </div>
+        `;
+        observeListEnd();
+        loadVocabularyTotal(filters, request);
+    } catch (error) {
+        console.error('Error:', error);
+    }
+}
+
+async function fetchVocabularyPage(filters, cursor) {
+    let url = `${API_URL}/vocabulary?${filters}&per_page=${perPage}&fields=${LIST_FIELDS}`;
+    if (cursor) {
+        url += `&cursor=${encodeURIComponent(cursor)}`;
+    }
+    const response = await fetch(url);
+    return response.json();
+}
+
+// Append the next page once the end of the list scrolls into view
+async function loadMoreVocabulary() {
+    if (!nextCursor) {
+        return;
+    }
+    const request = listRequest;
+    const cursor = nextCursor;
+    nextCursor = null; // Not again until this page is in
+    
+    try {
+        const data = await fetchVocabularyPage(vocabularyFilters(), cursor);
+        if (request !== listRequest) {
+            return;
+        }
+        document.getElementById('vocabulary-items').insertAdjacentHTML('beforeend', data.words.map(renderWord).join(''));
+        loadedWords += data.words.length;
+        nextCursor = data.next_cursor;
+        if (!nextCursor) {
+            document.getElementById('vocabulary-more').style.display = 'none';
         }
     } catch (error) {
         console.error('Error:', error);
+        nextCursor = cursor;
+    }
+}
+
+function observeListEnd() {
+    if (!listObserver) {
+        listObserver = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadMoreVocabulary();
+            }
+        }, { rootMargin: '400px' });
+    }
+    listObserver.disconnect();
+    listObserver.observe(document.getElementById('vocabulary-more'));
+}
+
+// The total is a separate (cached) request, so paging never waits for a count
+async function loadVocabularyTotal(filters, request) {
+    try {
+        const response = await fetch(`${API_URL}/vocabulary/count?${filters}`);
+        const data = await response.json();
+        const totalInfo = document.getElementById('vocabulary-total');
+        if (request === listRequest && totalInfo) {
+            totalInfo.textContent = `${data.total} word${data.total === 1 ? '' : 's'}`;
+        }
+    } catch (error) {
+        console.error('Error loading total:', error);
     }
 }
 
@@ -201,7 +365,7 @@ async function markAsLearned(id) {
         
         if (response.ok) {
             showNotification('Word marked as learned!', 'success');
-            loadVocabulary(currentPage);
+            loadVocabulary(true);
         } else {
             showNotification('Failed to update word status', 'error');
         }
@@ -222,7 +386,7 @@ async function markAsLearning(id) {
         
         if (response.ok) {
             showNotification('Word marked as learning', 'info');
-            loadVocabulary(currentPage);
+            loadVocabulary(true);
         } else {
             showNotification('Failed to update word status', 'error');
         }
@@ -253,7 +417,7 @@ async function deleteWord(id) {
         
         if (response.ok) {
             showNotification('Word deleted successfully', 'success');
-            loadVocabulary(currentPage);
+            loadVocabulary(true);
         } else {
             const errorData = await response.json().catch(() => ({}));
             console.error('Delete failed:', errorData);
@@ -271,14 +435,14 @@ async function loadFlashcard() {
     const status = document.getElementById('flashcard-filter').value;
     
     try {
-        const response = await fetch(`${API_URL}/games/flashcard/random?status=${status}`);
+        const card = await nextSessionCard('flashcard', status, currentFlashcard);
         
-        if (!response.ok) {
+        if (!card) {
             alert('No words available for practice!');
             return;
         }
         
-        currentFlashcard = await response.json();
+        currentFlashcard = card;
         
         // Reset card to front
         document.getElementById('flashcard').classList.remove('flipped');
@@ -336,21 +500,14 @@ async function markFlashcard(correct) {
         return;
     }
     
-    try {
-        await fetch(`${API_URL}/games/flashcard/practice`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                vocabulary_id: currentFlashcard.id,
-                correct: correct
-            })
-        });
-        
-        // Load next card
-        loadFlashcard();
-    } catch (error) {
-        console.error('Error:', error);
-    }
+    recordPractice({
+        vocabulary_id: currentFlashcard.id,
+        activity_type: 'flashcard',
+        correct: correct
+    }, true);
+    
+    // Load next card
+    loadFlashcard();
 }
 
 // ==================== FILL IN THE BLANK GAME ====================
@@ -359,14 +516,14 @@ async function loadFillBlank() {
     const status = document.getElementById('fill-blank-filter').value;
     
     try {
-        const response = await fetch(`${API_URL}/games/fill-blank/question?status=${status}`);
+        const card = await nextSessionCard('fill-blank', status, currentFillBlank);
         
-        if (!response.ok) {
+        if (!card) {
             alert('No words with examples available for practice!');
             return;
         }
         
-        currentFillBlank = await response.json();
+        currentFillBlank = card;
         
         const gameContainer = document.getElementById('fill-blank-game');
         gameContainer.innerHTML = `
@@ -403,39 +560,230 @@ async function checkFillBlank() {
         return;
     }
     
+    // The question carries the word, so the answer is checked here; the
+    // server checks it again when the buffered answer is recorded
+    // Either the word or the form the sentence needs (e.g. "went" for "go")
+    const correct = [currentFillBlank.word, currentFillBlank.answer]
+        .some(expected => expected && answer.toLowerCase() === expected.toLowerCase());
+    recordPractice({
+        vocabulary_id: currentFillBlank.id,
+        activity_type: 'fill_blank',
+        answer: answer
+    }, true);
+    
+    const resultDiv = document.getElementById('fill-blank-result');
+    
+    const audioUrl = currentFillBlank.audio_uk || currentFillBlank.audio_us;
+    const listen = audioUrl ? ` <button class="btn-audio-small" onclick="playAudio('${audioUrl}', event)">🔊</button>` : '';
+    
+    if (correct) {
+        resultDiv.innerHTML = `
+            <div class="fill-blank-result result-correct">
+                ✓ Correct! Great job!${listen}
+            </div>
+        `;
+    } else {
+        resultDiv.innerHTML = `
+            <div class="fill-blank-result result-incorrect">
+                ✗ Incorrect. The correct answer is: <strong>${currentFillBlank.answer || currentFillBlank.word}</strong>${listen}
+            </div>
+        `;
+    }
+    
+    // Auto-load next question after 2 seconds
+    setTimeout(() => {
+        loadFillBlank();
+    }, 2000);
+}
+
+// ==================== MULTIPLE CHOICE GAME ====================
+
+async function loadMultipleChoice() {
+    const status = document.getElementById('multiple-choice-filter').value;
+    
+    try {
+        const card = await nextSessionCard('multiple-choice', status, currentMultipleChoice);
+        
+        if (!card) {
+            alert('No words available for practice!');
+            return;
+        }
+        
+        currentMultipleChoice = card;
+        
+        const gameContainer = document.getElementById('multiple-choice-game');
+        gameContainer.innerHTML = `
+            <div class="fill-blank-question">
+                <strong>Which word means:</strong><br><br>
+                ${currentMultipleChoice.question}
+            </div>
+            <div class="multiple-choice-options">
+                ${currentMultipleChoice.choices.map((choice, index) => `
+                    <button class="choice-button" onclick="checkMultipleChoice(${index})">${choice}</button>
+                `).join('')}
+            </div>
+            <div id="multiple-choice-result"></div>
+        `;
+    } catch (error) {
+        console.error('Error:', error);
+        alert('Failed to load question');
+    }
+}
+
+function checkMultipleChoice(index) {
+    if (!currentMultipleChoice) {
+        return;
+    }
+    
+    const answer = currentMultipleChoice.choices[index];
+    const correct = answer === currentMultipleChoice.answer;
+    recordPractice({
+        vocabulary_id: currentMultipleChoice.id,
+        activity_type: 'multiple_choice',
+        answer: answer
+    }, true);
+    
+    // Show the right choice, and the wrong one if it was picked
+    document.querySelectorAll('#multiple-choice-game .choice-button').forEach((button, buttonIndex) => {
+        button.disabled = true;
+        if (currentMultipleChoice.choices[buttonIndex] === currentMultipleChoice.answer) {
+            button.classList.add('result-correct');
+        } else if (buttonIndex === index) {
+            button.classList.add('result-incorrect');
+        }
+    });
+    
+    const audioUrl = currentMultipleChoice.audio_uk || currentMultipleChoice.audio_us;
+    const listen = audioUrl ? ` <button class="btn-audio-small" onclick="playAudio('${audioUrl}', event)">🔊</button>` : '';
+    document.getElementById('multiple-choice-result').innerHTML = correct ? `
+        <div class="fill-blank-result result-correct">
+            ✓ Correct! Great job!${listen}
+        </div>
+    ` : `
+        <div class="fill-blank-result result-incorrect">
+            ✗ Incorrect. The correct answer is: <strong>${currentMultipleChoice.answer}</strong>${listen}
+        </div>
+    `;
+    
+    // Auto-load next question after 2 seconds
+    setTimeout(() => {
+        loadMultipleChoice();
+    }, 2000);
+}
+
+// ==================== GAME SESSIONS ====================
+
+// The next card of the game's session deck. When the deck is used up (or
+// the filter changed) the session ends: its answers are recorded, then the
+// next deck is fetched and its pronunciations preloaded.
+async function nextSessionCard(game, status, current) {
+    let session = gameSessions[game];
+    
+    if (!session || session.status !== status || session.cards.length === 0) {
+        await flushPractice(true);
+        
+        let url = `${API_URL}/games/${game}/session?size=${SESSION_SIZE}&status=${status}`;
+        if (game === 'flashcard') {
+            url += `&fields=${FLASHCARD_FIELDS}`;
+        }
+        const exclude = pendingPracticeIds(current);
+        if (exclude.length) {
+            url += `&exclude=${exclude.join(',')}`;
+        }
+        const response = await fetch(url);
+        
+        if (!response.ok) {
+            delete gameSessions[game];
+            return null;
+        }
+        
+        const deck = await response.json();
+        session = gameSessions[game] = { status, cards: deck.cards };
+        preloadAudio(deck.audio);
+    }
+    
+    return session.cards.shift();
+}
+
+// Start fetching the session's audio so the play buttons respond at once
+function preloadAudio(urls) {
+    preloadedAudio = urls.map(url => {
+        const audio = new Audio();
+        audio.preload = 'auto';
+        audio.src = url;
+        return audio;
+    });
+}
+
+// ==================== PRACTICE BUFFER ====================
+
+// Session answers (inSession) wait for the end of the session, or for the
+// page being hidden; others are flushed on the timer and size limit
+function recordPractice(practice, inSession = false) {
+    practiceBuffer.push({ ...practice, answeredAt: Date.now() });
+    
+    if (inSession) {
+        return;
+    }
+    if (practiceBuffer.length >= PRACTICE_FLUSH_SIZE) {
+        flushPractice();
+    } else if (!practiceFlushTimeout) {
+        practiceFlushTimeout = setTimeout(flushPractice, PRACTICE_FLUSH_MS);
+    }
+}
+
+// Cards on screen or with answers not recorded yet - the server would
+// otherwise still see them as due
+function pendingPracticeIds(current) {
+    const ids = new Set(practiceBuffer.concat(practiceInFlight).map(practice => practice.vocabulary_id));
+    if (current) {
+        ids.add(current.id);
+    }
+    return [...ids];
+}
+
+// Send buffered answers; wait=true resolves once they are committed
+async function flushPractice(wait = false) {
+    clearTimeout(practiceFlushTimeout);
+    practiceFlushTimeout = null;
+    
+    if (practiceBuffer.length === 0) {
+        return;
+    }
+    
+    const batch = practiceBuffer;
+    practiceBuffer = [];
+    practiceInFlight = practiceInFlight.concat(batch);
+    
+    // age instead of a timestamp, so the client's clock doesn't matter
+    const sentAt = Date.now();
+    const events = batch.map(({ answeredAt, ...practice }) => ({ ...practice, age: (sentAt - answeredAt) / 1000 }));
+    
     try {
-        const response = await fetch(`${API_URL}/games/fill-blank/check`, {
+        // keepalive lets the request finish if the page is being closed
+        const response = await fetch(`${API_URL}/games/practice/batch${wait ? '?wait=1' : ''}`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                vocabulary_id: currentFillBlank.id,
-                answer: answer
-            })
+            body: JSON.stringify({ events }),
+            keepalive: true
         });
         
+        if (response.status >= 500) {
+            throw new Error(`HTTP ${response.status}`);
+        }
         const result = await response.json();
-        const resultDiv = document.getElementById('fill-blank-result');
-        
-        if (result.correct) {
-            resultDiv.innerHTML = `
-                <div class="fill-blank-result result-correct">
-                    ✓ Correct! Great job!
-                </div>
-            `;
-        } else {
-            resultDiv.innerHTML = `
-                <div class="fill-blank-result result-incorrect">
-                    ✗ Incorrect. The correct answer is: <strong>${result.correct_answer}</strong>
-                </div>
-            `;
+        if (result.rejected && result.rejected.length) {
+            console.error('Practice events rejected:', result.rejected);
         }
-        
-        // Auto-load next question after 2 seconds
-        setTimeout(() => {
-            loadFillBlank();
-        }, 2000);
     } catch (error) {
-        console.error('Error:', error);
+        // Keep the answers and try again with the next flush
+        console.error('Error sending practice results:', error);
+        practiceBuffer = batch.concat(practiceBuffer);
+        if (!practiceFlushTimeout) {
+            practiceFlushTimeout = setTimeout(flushPractice, PRACTICE_FLUSH_MS);
+        }
+    } finally {
+        practiceInFlight = practiceInFlight.filter(practice => !batch.includes(practice));
     }
 }
 
@@ -443,6 +791,9 @@ async function checkFillBlank() {
 
 async function loadStatistics() {
     try {
+        // Include answers still in the buffer
+        await flushPractice(true);
+        
         // Load summary stats
         const summaryResponse = await fetch(`${API_URL}/stats/summary`);
         const summary = await summaryResponse.json();
@@ -455,7 +806,8 @@ async function loadStatistics() {
         document.getElementById('stat-month-practice').textContent = summary.practices_this_month;
         
         // Load monthly stats
-        const monthlyResponse = await fetch(`${API_URL}/stats/monthly`);
+        const months = document.getElementById('months-filter').value;
+        const monthlyResponse = await fetch(`${API_URL}/stats/monthly?months=${months}`);
         const monthly = await monthlyResponse.json();
         
         const monthlyContainer = document.getElementById('monthly-stats');
@@ -524,41 +876,75 @@ function playAudio(audioUrl, event) {
     });
 }
 
-// ==================== POLLING FOR UPDATES ====================
+// ==================== LIVE UPDATES ====================
+
+function handleDataChange(version) {
+    // Initialize on first check
+    if (lastKnownVersion === null) {
+        lastKnownVersion = version;
+        return;
+    }
+    
+    if (version === lastKnownVersion) {
+        return;
+    }
+    lastKnownVersion = version;
+    
+    const vocabSection = document.getElementById('vocabulary-section');
+    
+    // Only reload if on vocabulary section
+    if (vocabSection && vocabSection.classList.contains('active')) {
+        // Coalesce bursts of changes (e.g. a bulk import) into one reload
+        clearTimeout(reloadTimeout);
+        reloadTimeout = setTimeout(() => {
+            console.log('New vocabulary changes detected, reloading...');
+            showNotification('Vocabulary updated', 'info');
+            loadVocabulary(true);
+        }, 500);
+    }
+}
 
+// Fallback for browsers without EventSource: conditional polling with ETag
 async function checkForUpdates() {
     try {
-        const response = await fetch(`${API_URL}/vocabulary/latest`);
-        const data = await response.json();
+        const headers = lastKnownEtag ? { 'If-None-Match': lastKnownEtag } : {};
+        const response = await fetch(`${API_URL}/vocabulary/latest`, { headers });
         
-        // Initialize on first check
-        if (lastKnownTimestamp === null) {
-            lastKnownTimestamp = data.latest_timestamp;
-            lastKnownCount = data.total_count;
+        // 304 Not Modified - nothing changed since the last check
+        if (response.status === 304) {
             return;
         }
         
-        // Check if there are new changes
-        if (data.latest_timestamp !== lastKnownTimestamp || data.total_count !== lastKnownCount) {
-            const vocabSection = document.getElementById('vocabulary-section');
-            
-            // Only reload if on vocabulary section
-            if (vocabSection && vocabSection.classList.contains('active')) {
-                console.log('New vocabulary changes detected, reloading...');
-                showNotification('Vocabulary updated by another user', 'info');
-                loadVocabulary(currentPage);
-            }
-            
-            // Update tracking variables
-            lastKnownTimestamp = data.latest_timestamp;
-            lastKnownCount = data.total_count;
-        }
+        lastKnownEtag = response.headers.get('ETag');
+        const data = await response.json();
+        handleDataChange(data.version);
     } catch (error) {
         console.error('Error checking for updates:', error);
     }
 }
 
 function startPolling() {
+    if (window.EventSource) {
+        if (!eventSource) {
+            // The browser reconnects on its own and resumes from the last event id
+            eventSource = new EventSource(`${API_URL}/vocabulary/events`);
+            eventSource.addEventListener('hello', (e) => {
+                handleDataChange(JSON.parse(e.data).version);
+            });
+            eventSource.addEventListener('change', (e) => {
+                const change = JSON.parse(e.data);
+                // Practice results don't change the list contents
+                if (change.action !== 'practice') {
+                    handleDataChange(change.version);
+                } else {
+                    lastKnownVersion = change.version;
+                }
+            });
+            console.log('Subscribed to vocabulary updates');
+        }
+        return;
+    }
+    
     // Poll every 5 seconds
     if (!pollingInterval) {
         pollingInterval = setInterval(checkForUpdates, 5000);
@@ -567,6 +953,11 @@ function startPolling() {
 }
 
 function stopPolling() {
+    if (eventSource) {
+        eventSource.close();
+        eventSource = null;
+        console.log('Unsubscribed from vocabulary updates');
+    }
     if (pollingInterval) {
         clearInterval(pollingInterval);
         pollingInterval = null;
@@ -577,7 +968,10 @@ function stopPolling() {
 // ==================== INITIALIZATION ====================
 
 // Load vocabulary on page load
-document.addEventListener('DOMContentLoaded', () => {
+document.addEventListener('DOMContentLoaded', async () => {
+    if (!await checkAccount()) {
+        return;
+    }
     loadVocabulary();
     startPolling();
 });
@@ -586,7 +980,13 @@ document.addEventListener('DOMContentLoaded', () => {
 document.addEventListener('visibilitychange', () => {
     if (document.hidden) {
         stopPolling();
+        flushPractice();
     } else {
         startPolling();
     }
 });
+
+// Send buffered answers before the page goes away
+window.addEventListener('pagehide', () => {
+    flushPractice();
+});
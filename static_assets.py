@@ -0,0 +1,123 @@
+"""
+Fingerprinted, precompressed static assets
+At startup every text asset under static/ (not the audio store) is read,
+hashed and compressed once per encoding. Templates link to assets with
+asset_url(), which adds the content hash, and a request carrying the
+current hash is cached by the browser for a year as immutable; a changed
+file gets a new URL. Responses pick the precompressed copy the client
+accepts. Other static files - generated audio - are served from disk with
+HTTP Range support, so the browser can stream and seek.
+"""
+
+import hashlib
+import mimetypes
+import os
+import threading
+
+from flask import Response, request, send_from_directory, url_for
+
+from compression import COMPRESSIBLE_TYPES, STATIC_LEVELS, available_encodings, compress, negotiate_encoding
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Generated audio is content-addressed: a file's name changes when its content would
+AUDIO_PREFIX = 'audio/'
+AUDIO_MAX_AGE = 31536000
+
+
+class Asset:
+    """One static file with its hash and compressed copies"""
+
+    def __init__(self, path, mtime, body):
+        self.path = path
+        self.mtime = mtime
+        self.digest = hashlib.sha256(body).hexdigest()[:12]
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.bodies = {None: body}
+        if self.mimetype in COMPRESSIBLE_TYPES:
+            for encoding in available_encodings():
+                compressed = compress(body, encoding, STATIC_LEVELS)
+                if len(compressed) < len(body):
+                    self.bodies[encoding] = compressed
+
+
+class StaticAssets:
+    """Manifest of text assets; replaces Flask's static view"""
+
+    def __init__(self):
+        self.folder = None
+        self._assets = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.folder = app.static_folder
+        for root, dirs, files in os.walk(self.folder):
+            dirs[:] = [name for name in dirs if os.path.relpath(os.path.join(root, name), self.folder) != 'audio']
+            for name in files:
+                self._load(os.path.relpath(os.path.join(root, name), self.folder).replace(os.sep, '/'))
+        app.view_functions['static'] = self.serve
+        app.add_template_global(self.url, 'asset_url')
+
+        sizes = [(len(asset.bodies[None]), len(asset.bodies.get('gzip', asset.bodies[None])))
+                 for asset in self._assets.values()]
+        print(f"[Assets] {len(self._assets)} static file(s) fingerprinted and precompressed "
+              f"({', '.join(available_encodings())}): "
+              f"{sum(size for size, _ in sizes) // 1024} KiB -> {sum(gz for _, gz in sizes) // 1024} KiB gzip")
+
+    def _load(self, filename):
+        path = os.path.join(self.folder, filename)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            with open(path, 'rb') as f:
+                body = f.read()
+        except OSError:
+            return None
+        asset = Asset(path, mtime, body)
+        with self._lock:
+            self._assets[filename] = asset
+        return asset
+
+    def get(self, filename):
+        """The asset for a static filename, re-read if the file changed"""
+        with self._lock:
+            asset = self._assets.get(filename)
+        if asset is None:
+            return None
+        try:
+            if os.stat(asset.path).st_mtime_ns == asset.mtime:
+                return asset
+        except OSError:
+            return None
+        return self._load(filename)
+
+    def url(self, filename):
+        """URL of a static file with its content hash, for templates"""
+        asset = self.get(filename)
+        if asset is None:
+            return url_for('static', filename=filename)
+        return url_for('static', filename=filename, v=asset.digest)
+
+    def serve(self, filename):
+        asset = self.get(filename)
+        if asset is None:
+            response = send_from_directory(self.folder, filename)
+            if filename.startswith(AUDIO_PREFIX):
+                response.cache_control.no_cache = None
+                response.cache_control.public = True
+                response.cache_control.max_age = AUDIO_MAX_AGE
+            return response
+
+        encoding = negotiate_encoding(request.accept_encodings, [name for name in asset.bodies if name])
+        response = Response(asset.bodies[encoding], mimetype=asset.mimetype)
+        response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.set_etag(f'{asset.digest}-{encoding or "identity"}')
+        if request.args.get('v') == asset.digest:
+            response.headers['Cache-Control'] = IMMUTABLE
+        else:
+            # Unversioned (or outdated) URL: revalidate, which the ETag makes cheap
+            response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+
+
+static_assets = StaticAssets()
@@ -0,0 +1,119 @@
+"""
+Learning statistics backed by maintained counters
+stats_monthly and stats_status are rollup tables kept current by triggers on
+every insert, status change, delete and practice, so the stats endpoints
+read O(months) rows instead of counting the whole vocabulary and history
+"""
+
+from datetime import datetime
+
+from dateutil.relativedelta import relativedelta
+
+from models import db, current_engine
+
+MONTH_SQL = "strftime('%Y-%m', {column})"
+
+
+# Recompute the rollups from scratch in one GROUP BY pass per table
+REBUILD_STATEMENTS = [
+    "DELETE FROM stats_monthly",
+    "DELETE FROM stats_status",
+    f"""
+    INSERT INTO stats_monthly (month, words_added, words_learned, practices)
+    SELECT month, SUM(added), SUM(learned), SUM(practiced) FROM (
+        SELECT {MONTH_SQL.format(column='created_at')} AS month, 1 AS added, 0 AS learned, 0 AS practiced
+        FROM vocabulary WHERE created_at IS NOT NULL
+        UNION ALL
+        SELECT {MONTH_SQL.format(column='learned_at')}, 0, 1, 0
+        FROM vocabulary WHERE learned_at IS NOT NULL
+        UNION ALL
+        SELECT {MONTH_SQL.format(column='practiced_at')}, 0, 0, 1
+        FROM learning_history WHERE practiced_at IS NOT NULL
+    ) GROUP BY month
+    """,
+    """
+    INSERT INTO stats_status (status, words)
+    SELECT IFNULL(status, ''), COUNT(*) FROM vocabulary GROUP BY IFNULL(status, '')
+    """,
+]
+
+DEFAULT_MONTHS = 6
+MAX_MONTHS = 120
+
+
+def rebuild_stats():
+    """Recompute the rollup tables from the source tables"""
+    with current_engine().begin() as conn:
+        for statement in REBUILD_STATEMENTS:
+            conn.execute(db.text(statement))
+
+
+def _month_start(now):
+    return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def get_total_words():
+    """Total vocabulary size from the rollup"""
+    return db.session.execute(db.text("SELECT IFNULL(SUM(words), 0) FROM stats_status")).scalar()
+
+
+def get_word_count(status=None):
+    """Number of words, optionally with one status, from the rollup"""
+    if not status or status == 'all':
+        return get_total_words()
+    return db.session.execute(
+        db.text("SELECT IFNULL(SUM(words), 0) FROM stats_status WHERE status = :status"), {'status': status}
+    ).scalar()
+
+
+def get_summary(now=None):
+    """Totals by status plus this month's activity"""
+    now = now or datetime.utcnow()
+    month = _month_start(now).strftime('%Y-%m')
+
+    status_counts = dict(db.session.execute(db.text("SELECT status, words FROM stats_status")).all())
+    this_month = db.session.execute(
+        db.text("SELECT words_added, words_learned, practices FROM stats_monthly WHERE month = :month"),
+        {'month': month}
+    ).first() or (0, 0, 0)
+
+    return {
+        'total_words': sum(status_counts.values()),
+        'learning_words': status_counts.get('learning', 0),
+        'learned_words': status_counts.get('learned', 0),
+        'words_added_this_month': this_month[0],
+        'words_learned_this_month': this_month[1],
+        'practices_this_month': this_month[2]
+    }
+
+
+def get_monthly(months=DEFAULT_MONTHS, now=None):
+    """Per-month activity for the last `months` months, newest first"""
+    now = now or datetime.utcnow()
+    months = max(1, min(months, MAX_MONTHS))
+    current = _month_start(now)
+    oldest = current - relativedelta(months=months - 1)
+
+    rows = db.session.execute(
+        db.text(
+            "SELECT month, words_added, words_learned, practices FROM stats_monthly "
+            "WHERE month BETWEEN :oldest AND :newest"
+        ),
+        {'oldest': oldest.strftime('%Y-%m'), 'newest': current.strftime('%Y-%m')}
+    ).all()
+    by_month = {row[0]: row for row in rows}
+
+    stats = []
+    for i in range(months):
+        month_start = current - relativedelta(months=i)
+        key = month_start.strftime('%Y-%m')
+        row = by_month.get(key)
+        stats.append({
+            'month': key,
+            'month_name': month_start.strftime('%B %Y'),
+            'words_added': row[1] if row else 0,
+            'words_learned': row[2] if row else 0,
+            'practices': row[3] if row else 0
+        })
+
+    return stats
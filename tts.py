@@ -0,0 +1,265 @@
+"""
+Offline text-to-speech in a dedicated worker process
+pyttsx3 is slow to start and not safe to drive from several threads, so a
+single long-lived process owns one engine with the voice already chosen.
+Callers on any thread send batches of words; the worker merges whatever is
+queued, hands every word to the engine with save_to_file and renders them
+all with one runAndWait(). Clips go to the content-addressed audio store, so
+words that were already rendered are skipped.
+
+Requests and replies are JSON lines over the worker's stdin/stdout.
+"""
+
+import atexit
+import itertools
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+
+from audio_store import AudioStore, AUDIO_DIR, audio_key
+
+VOICE_RATE = 150  # Speed of speech
+VOICE_VOLUME = 1.0  # Volume (0.0 to 1.0)
+
+MAX_BATCH_WORDS = 50  # Words rendered per runAndWait()
+STARTUP_TIMEOUT = 30  # seconds to wait for the engine to initialize
+REQUEST_TIMEOUT = 30  # seconds per request, plus PER_WORD_TIMEOUT per word
+PER_WORD_TIMEOUT = 5
+
+
+# ==================== WORKER PROCESS ====================
+
+def _init_engine():
+    """Start the engine; returns (engine, voice id) for the audio key"""
+    import pyttsx3
+
+    engine = pyttsx3.init()
+    engine.setProperty('rate', VOICE_RATE)
+    engine.setProperty('volume', VOICE_VOLUME)
+
+    # Try to set US English voice if available
+    for voice in engine.getProperty('voices'):
+        if 'english' in voice.name.lower() and 'us' in voice.name.lower():
+            engine.setProperty('voice', voice.id)
+            return engine, voice.id
+    return engine, str(engine.getProperty('voice'))
+
+
+def _render(engine, voice, words, store):
+    """Synthesize a list of words; returns {word: url or None}"""
+    audio = {}
+    queued = {}
+    for word in words:
+        key = audio_key(word, voice, VOICE_RATE)
+        if key in queued:
+            queued[key].append(word)
+            continue
+        url = store.find(key)
+        if url:
+            audio[word] = url
+        else:
+            engine.save_to_file(word, store.scratch_path(key))
+            queued[key] = [word]
+
+    if queued:
+        engine.runAndWait()
+
+    for key, same_clip in queued.items():
+        url = store.commit(key)
+        for word in same_clip:
+            audio[word] = url
+    return audio
+
+
+def _serve(audio_dir=AUDIO_DIR):
+    """Worker process main loop"""
+    # Replies go to the real stdout; anything else printed goes to stderr
+    out = sys.stdout
+    sys.stdout = sys.stderr
+
+    def reply(message):
+        out.write(json.dumps(message, ensure_ascii=False) + '\n')
+        out.flush()
+
+    store = AudioStore(audio_dir)
+    try:
+        engine, voice = _init_engine()
+    except Exception as e:
+        reply({'error': f'{type(e).__name__}: {str(e)}'})
+        return
+    reply({'ready': True})
+
+    requests = queue.Queue()
+
+    def read_requests():
+        for line in sys.stdin:
+            if line.strip():
+                requests.put(json.loads(line))
+        requests.put(None)  # Parent closed the pipe
+
+    threading.Thread(target=read_requests, daemon=True).start()
+
+    while True:
+        request = requests.get()
+        if request is None:
+            return
+
+        # Merge everything already waiting into one bulk render
+        batch = [request]
+        while sum(len(r['words']) for r in batch) < MAX_BATCH_WORDS:
+            try:
+                request = requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                requests.put(None)
+                break
+            batch.append(request)
+
+        words = list(dict.fromkeys(word for r in batch for word in r['words']))
+        audio = {}
+        for start in range(0, len(words), MAX_BATCH_WORDS):
+            chunk = words[start:start + MAX_BATCH_WORDS]
+            try:
+                audio.update(_render(engine, voice, chunk, store))
+            except Exception as e:
+                print(f"[TTS] Error synthesizing {len(chunk)} word(s): {str(e)}")
+                try:
+                    engine, voice = _init_engine()
+                except Exception as e:
+                    print(f"[TTS] Could not restart engine: {str(e)}")
+                    for r in batch:
+                        reply({'id': r['id'], 'audio': {word: audio.get(word) for word in r['words']}})
+                    return
+
+        for r in batch:
+            reply({'id': r['id'], 'audio': {word: audio.get(word) for word in r['words']}})
+
+
+# ==================== CLIENT ====================
+
+class SynthesisWorker:
+    """
+    Handle to the TTS worker process, shared by all threads
+    The process is started on first use and restarted if it exits. If the
+    engine cannot be initialized (no TTS backend installed) the worker is
+    marked unavailable and synthesize() returns None for every word.
+    """
+
+    def __init__(self, audio_dir=AUDIO_DIR):
+        self.audio_dir = audio_dir
+        self.available = True
+        self._process = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._pending = {}
+
+    def _start(self):
+        process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), self.audio_dir],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            bufsize=1
+        )
+
+        # Wait for the engine to come up (or fail) before sending work
+        status = {}
+
+        def read_status():
+            line = process.stdout.readline()
+            status.update(json.loads(line) if line else {'error': 'worker exited'})
+
+        reader = threading.Thread(target=read_status, daemon=True)
+        reader.start()
+        reader.join(STARTUP_TIMEOUT)
+
+        if not status.get('ready'):
+            process.kill()
+            self.available = False
+            print(f"[TTS] Synthesis unavailable: {status.get('error', 'engine did not start in time')}")
+            return None
+
+        threading.Thread(target=self._read_replies, args=(process,), name='tts-replies', daemon=True).start()
+        print(f"[TTS] Synthesis worker started (pid {process.pid})")
+        return process
+
+    def _ensure_started(self):
+        with self._lock:
+            if not self.available:
+                return None
+            if self._process is None or self._process.poll() is not None:
+                self._process = self._start()
+            return self._process
+
+    def _read_replies(self, process):
+        for line in process.stdout:
+            message = json.loads(line)
+            with self._lock:
+                entry = self._pending.pop(message.get('id'), None)
+            if entry is not None:
+                entry['audio'] = message['audio']
+                entry['done'].set()
+
+        # Worker exited - release anyone still waiting on it
+        with self._lock:
+            stranded = [self._pending.pop(request_id) for request_id, entry in list(self._pending.items())
+                        if entry['process'] is process]
+        for entry in stranded:
+            entry['done'].set()
+
+    def synthesize(self, words):
+        """
+        Synthesize a batch of words
+        Returns {word: audio URL or None}; words already in the audio store
+        are not rendered again.
+        """
+        words = list(dict.fromkeys(word for word in words if word and word.strip()))
+        if not words:
+            return {}
+
+        process = self._ensure_started()
+        if process is None:
+            return {word: None for word in words}
+
+        request_id = next(self._ids)
+        entry = {'done': threading.Event(), 'audio': {}, 'process': process}
+        try:
+            with self._lock:
+                self._pending[request_id] = entry
+                process.stdin.write(json.dumps({'id': request_id, 'words': words}, ensure_ascii=False) + '\n')
+                process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            print(f"[TTS] Worker unreachable: {str(e)}")
+            return {word: None for word in words}
+
+        if not entry['done'].wait(REQUEST_TIMEOUT + PER_WORD_TIMEOUT * len(words)):
+            with self._lock:
+                self._pending.pop(request_id, None)
+            print(f"[TTS] Timed out synthesizing {len(words)} word(s)")
+
+        return {word: entry['audio'].get(word) for word in words}
+
+    def stop(self):
+        with self._lock:
+            process, self._process = self._process, None
+        if process is not None and process.poll() is None:
+            process.stdin.close()
+            try:
+                process.wait(5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+synthesis_worker = SynthesisWorker()
+atexit.register(synthesis_worker.stop)
+
+
+if __name__ == '__main__':
+    _serve(sys.argv[1] if len(sys.argv) > 1 else AUDIO_DIR)
@@ -5,68 +5,16 @@ Run this script to add pronunciation data to words that don't have it yet
 
 from app import app, db
 from models import Vocabulary
-from cambridge_api import fetch_pronunciation_data
-import time
-import sqlite3
+from cambridge_api import fetch_batch, get_cache
+from migrations import run_migrations
+from offline_pronunciation import generate_audio_urls, get_ipa_pronunciations
+import os
 
-def migrate_database():
-    """Add pronunciation columns if they don't exist"""
-    db_path = 'instance/vocabulary.db'
-    
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # Check if vocabulary table exists
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='vocabulary'")
-    if not cursor.fetchone():
-        print("Database table doesn't exist yet. It will be created when you run the app.")
-        conn.close()
-        return True
-    
-    # Check if columns already exist
-    cursor.execute("PRAGMA table_info(vocabulary)")
-    columns = [column[1] for column in cursor.fetchall()]
-    
-    columns_to_add = []
-    
-    if 'ipa_us' not in columns:
-        columns_to_add.append('ipa_us')
-    if 'ipa_uk' not in columns:
-        columns_to_add.append('ipa_uk')
-    if 'audio_us' not in columns:
-        columns_to_add.append('audio_us')
-    if 'audio_uk' not in columns:
-        columns_to_add.append('audio_uk')
-    
-    if columns_to_add:
-        print("Adding missing pronunciation columns to database...")
-        try:
-            if 'ipa_us' in columns_to_add:
-                cursor.execute("ALTER TABLE vocabulary ADD COLUMN ipa_us VARCHAR(100)")
-                print("  ✓ Added column: ipa_us")
-            
-            if 'ipa_uk' in columns_to_add:
-                cursor.execute("ALTER TABLE vocabulary ADD COLUMN ipa_uk VARCHAR(100)")
-                print("  ✓ Added column: ipa_uk")
-            
-            if 'audio_us' in columns_to_add:
-                cursor.execute("ALTER TABLE vocabulary ADD COLUMN audio_us VARCHAR(500)")
-                print("  ✓ Added column: audio_us")
-            
-            if 'audio_uk' in columns_to_add:
-                cursor.execute("ALTER TABLE vocabulary ADD COLUMN audio_uk VARCHAR(500)")
-                print("  ✓ Added column: audio_uk")
-            
-            conn.commit()
-            print("✓ Database schema updated successfully!\n")
-        except Exception as e:
-            conn.rollback()
-            print(f"✗ Error updating database: {str(e)}")
-            conn.close()
-            return False
-    
-    conn.close()
-    return True
+# Batch fetch settings - stay polite to the server
+CONCURRENCY = 4  # Requests in flight at once
+RATE_PER_SECOND = 2.0  # New requests started per second
+COMMIT_EVERY = 50  # Words per database commit
+PROGRESS_FILE = os.path.join(app.instance_path, 'update_pronunciations.progress.jsonl')
 
 def update_pronunciations():
     with app.app_context():
@@ -82,18 +30,26 @@ def update_pronunciations():
             return
         
         print(f"Found {total} words without pronunciation data")
-        print("Fetching data from Cambridge Dictionary...")
+        print(f"Fetching data from Cambridge Dictionary ({CONCURRENCY} at a time, {RATE_PER_SECOND}/s)...")
+        if os.path.exists(PROGRESS_FILE):
+            print("Resuming from previous run")
         print("=" * 70)
         
+        words_by_text = {word.word: word for word in words_without_pronunciation}
         updated_count = 0
         failed_count = 0
+        uncommitted = 0
+        interrupted = False
         
-        for i, word in enumerate(words_without_pronunciation, 1):
-            print(f"\n[{i}/{total}] Processing: '{word.word}'")
-            
-            try:
-                # Fetch pronunciation data
-                pronunciation_data = fetch_pronunciation_data(word.word)
+        try:
+            results = fetch_batch(
+                list(words_by_text),
+                concurrency=CONCURRENCY,
+                rate=RATE_PER_SECOND,
+                progress_path=PROGRESS_FILE
+            )
+            for i, (word_text, pronunciation_data) in enumerate(results, 1):
+                word = words_by_text[word_text]
                 
                 if pronunciation_data and any(pronunciation_data.values()):
                     # Update the word
@@ -101,51 +57,66 @@ def update_pronunciations():
                     word.ipa_uk = pronunciation_data.get('ipa_uk')
                     word.audio_us = pronunciation_data.get('audio_us')
                     word.audio_uk = pronunciation_data.get('audio_uk')
-                    
-                    db.session.commit()
-                    
-                    print(f"  ✓ Updated")
-                    if pronunciation_data.get('ipa_uk'):
-                        print(f"    UK: /{pronunciation_data.get('ipa_uk')}/")
-                    if pronunciation_data.get('ipa_us'):
-                        print(f"    US: /{pronunciation_data.get('ipa_us')}/")
-                    
+                    uncommitted += 1
                     updated_count += 1
+                    print(f"[{i}/{total}] ✓ {word_text}: /{pronunciation_data.get('ipa_uk') or pronunciation_data.get('ipa_us')}/")
                 else:
-                    print(f"  ⊘ No data found")
                     failed_count += 1
+                    print(f"[{i}/{total}] ⊘ {word_text}: no data found")
                 
-                # Be polite to the server - add delay between requests
-                if i < total:
-                    time.sleep(1)  # 1 second delay between requests
-                    
-            except KeyboardInterrupt:
-                print("\n\nOperation cancelled by user.")
-                db.session.rollback()
-                break
-            except Exception as e:
-                print(f"  ✗ Error: {str(e)[:100]}")
-                failed_count += 1
-                # Continue with next word
-                continue
+                # Commit in chunks rather than per word
+                if uncommitted >= COMMIT_EVERY:
+                    db.session.commit()
+                    uncommitted = 0
+        except KeyboardInterrupt:
+            print("\n\nOperation cancelled by user. Run again to resume.")
+            interrupted = True
+        
+        # Words Cambridge had no IPA for get offline IPA, converted as one batch
+        without_ipa = [word for word in words_by_text.values() if not word.ipa_us and not word.ipa_uk]
+        if without_ipa and not interrupted:
+            print(f"\nConverting offline IPA for {len(without_ipa)} words...")
+            offline_ipa = get_ipa_pronunciations([word.word for word in without_ipa])
+            for word in without_ipa:
+                if offline_ipa.get(word.word):
+                    word.ipa_us = word.ipa_uk = offline_ipa[word.word]
+            print(f"✓ Converted IPA for {sum(1 for value in offline_ipa.values() if value)} words")
+        
+        # Words Cambridge had no audio for get offline TTS, rendered as one batch
+        without_audio = [word for word in words_by_text.values() if not word.audio_us]
+        if without_audio and not interrupted:
+            print(f"\nSynthesizing offline audio for {len(without_audio)} words...")
+            audio = generate_audio_urls([word.word for word in without_audio])
+            for word in without_audio:
+                if audio.get(word.word):
+                    word.audio_us = audio[word.word]
+                    word.audio_uk = word.audio_uk or audio[word.word]
+            print(f"✓ Generated audio for {sum(1 for url in audio.values() if url)} words")
+        
+        db.session.commit()
+        if not interrupted and os.path.exists(PROGRESS_FILE):
+            os.remove(PROGRESS_FILE)
         
         print("\n" + "=" * 70)
         print(f"✓ Successfully updated {updated_count} words")
         if failed_count > 0:
             print(f"⊘ Failed to fetch data for {failed_count} words")
+        cache = get_cache()
+        if cache:
+            stats = cache.stats()
+            print(f"Lookup cache: {stats['hits'] + stats['negative_hits']} hits, {stats['misses']} misses ({stats['entries']} entries)")
         print(f"\nTotal words with pronunciation: {Vocabulary.query.filter(Vocabulary.ipa_uk.isnot(None) | Vocabulary.ipa_us.isnot(None)).count()}")
 
 if __name__ == '__main__':
     print("Cambridge Dictionary Pronunciation Updater")
     print("=" * 70)
     print("This will fetch IPA pronunciation and audio URLs for existing words")
-    print("Note: This process may take several minutes depending on word count")
+    print("Note: Progress is saved as it goes - an interrupted run resumes where it stopped")
     print()
     
     # First, migrate database if needed
-    if not migrate_database():
-        print("Failed to update database schema. Please check the error above.")
-        exit(1)
+    with app.app_context():
+        run_migrations()
     
     response = input("Do you want to continue? (yes/no): ")
     if response.lower() in ['yes', 'y']: